@@ -0,0 +1,91 @@
+import os
+import hmac
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, Request, WebSocket
+
+from metrics import registry
+
+# Who may watch or drive this machine. CORS only keeps a page from reading
+# responses: a WebSocket or a form POST from any site the user visits still
+# reaches the daemon. Browsers attach an Origin to those, so endpoints that
+# stream the screen or run commands check it; clients without one (the app,
+# scripts) are let through unless a token is set.
+#   $REMOTEPILOT_ALLOWED_ORIGINS  comma-separated; "http://localhost" allows any port
+#   $REMOTEPILOT_TOKEN            when set, required from every caller as
+#                                 "Authorization: Bearer <token>", an X-RemotePilot-Token
+#                                 header, or ?token= (browsers can't set WebSocket headers)
+#   $REMOTEPILOT_FLEET_TOKEN      shared by a coordinator and its workers, sent the same
+#                                 ways; the /fleet endpoints refuse everyone without it
+
+DEFAULT_ORIGINS = "http://localhost,http://127.0.0.1,http://[::1]"
+
+REFUSED = registry.counter(
+    "remotepilot_access_refused_total", "Requests refused for their Origin or token", ("reason",))
+
+def origin_allowed(origin: str) -> bool:
+    allowed = {o.strip().rstrip("/").lower()
+               for o in os.environ.get("REMOTEPILOT_ALLOWED_ORIGINS", DEFAULT_ORIGINS).split(",") if o.strip()}
+    origin = origin.rstrip("/").lower()
+    if origin in allowed:
+        return True
+    try:
+        parts = urlsplit(origin)
+        host = f"[{parts.hostname}]" if ":" in (parts.hostname or "") else parts.hostname
+        parts.port # raises on a malformed port
+    except ValueError:
+        return False
+    return f"{parts.scheme}://{host}" in allowed
+
+def _given_token(connection) -> Optional[str]:
+    auth = connection.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        return auth[7:].strip()
+    return connection.headers.get("x-remotepilot-token") or connection.query_params.get("token")
+
+def fleet_headers() -> Dict[str, str]:
+    """What a coordinator or worker sends to the other side's /fleet endpoints."""
+    token = os.environ.get("REMOTEPILOT_FLEET_TOKEN")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+def refusal(connection, fleet: bool = False) -> Optional[str]:
+    """
+    Why `connection` (a Request or WebSocket) may not go on; None if it may.
+    `fleet` checks the fleet token instead, which must be configured.
+    """
+    origin = connection.headers.get("origin")
+    if origin is not None and not origin_allowed(origin):
+        REFUSED.inc(reason="origin")
+        return f"Origin {origin} is not allowed"
+    token = os.environ.get("REMOTEPILOT_FLEET_TOKEN" if fleet else "REMOTEPILOT_TOKEN")
+    if fleet and not token:
+        REFUSED.inc(reason="token")
+        return "Fleet endpoints are disabled: $REMOTEPILOT_FLEET_TOKEN is not set"
+    if token:
+        given = _given_token(connection)
+        if not given or not hmac.compare_digest(given.encode(), token.encode()):
+            REFUSED.inc(reason="token")
+            return "Missing or wrong token"
+    return None
+
+async def require_caller(request: Request):
+    """FastAPI dependency for HTTP endpoints."""
+    reason = refusal(request)
+    if reason:
+        raise HTTPException(status_code=403, detail=reason)
+
+async def require_fleet(request: Request):
+    """FastAPI dependency for the /fleet endpoints."""
+    reason = refusal(request, fleet=True)
+    if reason:
+        raise HTTPException(status_code=403, detail=reason)
+
+async def admit(websocket: WebSocket, fleet: bool = False) -> bool:
+    """Checks a WebSocket before it is accepted; closes it (1008) and returns False if refused."""
+    reason = refusal(websocket, fleet)
+    if reason:
+        print(f"[Access] Refused {websocket.url.path}: {reason}")
+        await websocket.close(code=1008)
+        return False
+    return True
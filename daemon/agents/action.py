@@ -1,29 +1,89 @@
-import pyautogui
 import platform
 import asyncio
-from typing import Dict, Any
+import functools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
 from .base import Agent
+from input_backend.base import InputBackend
+from sandbox.local import NEW_GROUP, kill_tree
+from watchdog import current_task_id
 
 class ActionAgent(Agent):
-    def __init__(self):
+    def __init__(self, backend: Optional[InputBackend] = None, type_interval: float = 0.0,
+                 paste_threshold: int = 32, headless_browser: bool = False):
         super().__init__(name="Action")
-        # Safety: Fail-safe corner active
-        pyautogui.FAILSAFE = True
-        self.screen_width, self.screen_height = pyautogui.size()
+        if backend is None:
+            from display.desktop import DesktopDisplay
+            backend = DesktopDisplay()
+        self.input = backend
+        self.type_interval = type_interval # Default per-key delay; 0 types as fast as the OS accepts
+        self.paste_threshold = paste_threshold # Longer text goes through the clipboard
+        # One thread for all synthetic input: keeps events in order and the loop free
+        self._input_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="action-input")
+        self.screen_width, self.screen_height = backend.size()
+        self.headless_browser = headless_browser
         self.browser = None
         self.context = None
         self.page = None
+        self._browser_lock = asyncio.Lock() # prepare() may be launching it when a step needs it
+        self._commands: Dict[Optional[str], list] = {} # task id -> COMMAND processes it started
+
+    async def _input(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._input_executor, functools.partial(fn, *args, **kwargs))
+
+    async def _type(self, text: str, task: Dict[str, Any]) -> str:
+        mode = task.get("mode")
+        # pyautogui can only type keys it knows; anything else must be pasted
+        needs_paste = not text.isascii()
+        if mode != "type" and self.input.can_paste() and (
+                mode == "paste" or needs_paste or len(text) >= self.paste_threshold):
+            await self._input(self.input.paste, text)
+            return "pasted"
+        await self._input(self.input.write, text, float(task.get("interval", self.type_interval)))
+        return "typed"
+
+    def _env(self) -> Optional[Dict[str, str]]:
+        # Apps started for a task open on the display this agent drives
+        env = getattr(self.input, "env", None)
+        return env() if env else None
 
     async def _ensure_browser(self):
-        if not self.browser:
-            pw = await async_playwright().start()
-            self.browser = await pw.chromium.launch(headless=False)
-            self.context = await self.browser.new_context()
-            self.page = await self.context.new_page()
+        async with self._browser_lock:
+            if not self.browser:
+                from playwright.async_api import async_playwright
+                pw = await async_playwright().start()
+                # Headed, on the same display as native input (a private Xvfb when headless)
+                self.browser = await pw.chromium.launch(headless=self.headless_browser, env=self._env())
+                self.context = await self.browser.new_context()
+            if not self.page:
+                self.page = await self.context.new_page()
+
+    async def prepare(self, step: Dict[str, Any]):
+        """Setup for `step` that has no visible effect: a browser step gets the browser launched."""
+        from observation import is_browser_step
+        if is_browser_step(step):
+            try:
+                await self._ensure_browser()
+            except Exception as e:
+                self.log(f"Browser prefetch failed: {e}")
+
+    async def _discard_page(self):
+        # A cancelled goto/click keeps running inside the browser; closing the
+        # page stops it, and the next browser action opens a fresh one.
+        page, self.page = self.page, None
+        if page:
+            try:
+                await page.close()
+            except Exception:
+                pass
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
         Input: {"action": "TYPE", "value": "hello"} or {"action": "BROWSE", "url": "..."}
+        or {"action": "FILL_BROWSER", "selector": "#to", "value": "bob@example.com"}
+        TYPE also takes "mode" ("type" | "paste") and "interval" (seconds per key).
         """
         action_type = task.get("action", "").upper()
         value = task.get("value", "")
@@ -48,6 +108,12 @@ class ActionAgent(Agent):
                 await self.page.click(selector)
                 return {"status": "success", "detail": f"Clicked browser element: {selector}"}
 
+            elif action_type == "FILL_BROWSER":
+                await self._ensure_browser()
+                selector = task.get("selector")
+                await self.page.fill(selector, value)
+                return {"status": "success", "detail": f"Filled browser element: {selector}"}
+
             # --- Native OS Actions ---
             elif action_type == "CLICK":
                 # Expects "x y" or task has x,y
@@ -59,33 +125,82 @@ class ActionAgent(Agent):
                         x, y = int(coords[0]), int(coords[1])
                 
                 if x is not None and y is not None:
-                    pyautogui.click(x, y)
+                    await self._input(self.input.click, x, y)
                     return {"status": "success", "detail": f"Clicked at {x}, {y}"}
                 return {"status": "error", "error": "Missing coordinates"}
 
             elif action_type == "TYPE":
-                pyautogui.write(value, interval=0.05)
-                return {"status": "success", "detail": f"Typed: {value}"}
+                how = await self._type(value, task)
+                return {"status": "success", "detail": f"Typed: {value}", "method": how}
 
             elif action_type == "HOTKEY":
                 keys = value.split('+')
-                pyautogui.hotkey(*keys)
+                await self._input(self.input.hotkey, *keys)
                 return {"status": "success", "detail": f"Pressed: {value}"}
 
             elif action_type == "WAIT":
-                time.sleep(float(value))
+                await asyncio.sleep(float(value))
                 return {"status": "success", "detail": f"Waited {value}s"}
 
             elif action_type == "COMMAND":
-                # Legacy shell execution (un-sandboxed in this poC, should use SandboxAgent)
-                process = subprocess.Popen(value, shell=True)
+                # Usually launches an app the next steps use, so it isn't waited
+                # for; own process group, so cancelling the task can kill it all
+                process = subprocess.Popen(value, shell=True, env=self._env(), **NEW_GROUP)
+                self._commands.setdefault(current_task_id.get(), []).append(process)
                 return {"status": "success", "detail": f"Command started: {value}"}
 
             return {"status": "error", "error": f"Unknown action: {action_type}"}
 
+        except asyncio.CancelledError:
+            if action_type in ("BROWSE", "CLICK_BROWSER"):
+                await self._discard_page()
+            raise
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    def release_commands(self, task_id: Optional[str], kill: bool = False):
+        """Forgets the COMMAND processes a task started; `kill` ends those still running."""
+        for process in self._commands.pop(task_id, []):
+            if kill and process.poll() is None:
+                self.log(f"Killing '{process.args}' (pid {process.pid})")
+                kill_tree(process)
+
+    async def check_dom(self, expect: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Checks the current page against a recipe step's expectation, waiting
+        up to expect["timeout"] seconds: "selector" visible, "gone" hidden,
+        "text" contained in the page (or in "selector"), "url" contained in
+        the page URL.
+        """
+        if not self.page:
+            return {"verified": False, "details": "No browser page open"}
+        timeout_ms = float(expect.get("timeout", 5)) * 1000
+        try:
+            if expect.get("selector"):
+                await self.page.wait_for_selector(expect["selector"], state="visible", timeout=timeout_ms)
+            if expect.get("gone"):
+                await self.page.wait_for_selector(expect["gone"], state="hidden", timeout=timeout_ms)
+            if expect.get("text"):
+                scope = self.page.locator(expect.get("selector") or "body").first
+                await scope.get_by_text(expect["text"]).first.wait_for(state="visible", timeout=timeout_ms)
+            if expect.get("url") and expect["url"] not in self.page.url:
+                await self.page.wait_for_url(f"**{expect['url']}**", timeout=timeout_ms)
+        except Exception as e:
+            return {"verified": False, "details": f"DOM check failed ({expect}): {str(e).splitlines()[0]}"}
+        return {"verified": True, "details": f"DOM matched {expect}"}
+
+    async def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Interactive elements of the current page (observation.SNAPSHOT_JS); None without a page."""
+        if not self.page:
+            return None
+        from observation import SNAPSHOT_JS
+        try:
+            return await self.page.evaluate(SNAPSHOT_JS)
+        except Exception as e:
+            self.log(f"Page snapshot failed: {e}")
+            return None
+
     async def cleanup(self):
         if self.browser:
             await self.browser.close()
+        self._input_executor.shutdown(wait=False)
@@ -1,10 +1,46 @@
+import time
+import functools
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
+from metrics import registry
+from tracing import tracer
+from watchdog import report_progress
+
+AGENT_LATENCY = registry.histogram(
+    "remotepilot_agent_execute_seconds", "Agent.execute latency", ("agent",))
+AGENT_ERRORS = registry.counter(
+    "remotepilot_agent_errors_total", "Agent.execute calls that raised or returned status=error", ("agent",))
+
+def _instrumented(execute):
+    @functools.wraps(execute)
+    async def wrapper(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        failed = True
+        report_progress()
+        try:
+            with tracer.span(f"{self.name}.execute", "agent"):
+                result = await execute(self, task)
+            failed = isinstance(result, dict) and result.get("status") == "error"
+            return result
+        finally:
+            report_progress()
+            AGENT_LATENCY.observe(time.perf_counter() - start, agent=self.name)
+            if failed:
+                AGENT_ERRORS.inc(agent=self.name)
+    wrapper._instrumented = True
+    return wrapper
 
 class Agent(ABC):
     def __init__(self, name: str):
         self.name = name
 
+    def __init_subclass__(cls, **kwargs):
+        # Time every concrete execute() without touching each agent
+        super().__init_subclass__(**kwargs)
+        execute = cls.__dict__.get("execute")
+        if execute and not getattr(execute, "_instrumented", False):
+            cls.execute = _instrumented(execute)
+
     @abstractmethod
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the agent's specific task."""
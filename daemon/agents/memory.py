@@ -8,9 +8,11 @@ class MemoryAgent(Agent):
     def __init__(self, db_path="memory.db"):
         super().__init__(name="Memory")
         self.db_path = db_path
-        self._init_db()
+        self._db_ready = False # Schema is created on first use, not at startup
 
     def _init_db(self):
+        if self._db_ready:
+            return
         conn = sqlite3.connect(self.db_path)
         conn.execute("""
             CREATE TABLE IF NOT EXISTS history (
@@ -23,6 +25,7 @@ class MemoryAgent(Agent):
         """)
         conn.commit()
         conn.close()
+        self._db_ready = True
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -32,6 +35,7 @@ class MemoryAgent(Agent):
         
         if action == "store":
             data = task.get("data", {})
+            self._init_db()
             conn = sqlite3.connect(self.db_path)
             conn.execute("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?)", (
                 data.get("id"),
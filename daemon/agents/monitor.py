@@ -1,45 +1,58 @@
 import time
 import asyncio
-import psutil
 from typing import Dict, Any, Optional
 from .base import Agent
+from watchdog import watchdog, Watchdog
+from sampler import sampler
 
 class MonitorAgent(Agent):
-    def __init__(self):
+    def __init__(self, dog: Optional[Watchdog] = None):
         super().__init__(name="Monitor")
         self.active_processes = []
         self.start_time = None
-        self._abort_requested = False
+        # Abort/hang state lives per task in the watchdog
+        self.watchdog = dog or watchdog
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Input: {"action": "check_health", "task_id": "..."}
+        Input: {"action": "check_health"} or {"action": "abort", "task_id": "...", "reason": "..."}
         """
         action = task.get("action", "check_health")
         
         if action == "check_health":
-            cpu = psutil.cpu_percent()
-            ram = psutil.virtual_memory().percent
-            print(f"[Monitor] Heartbeat: CPU {cpu}% | RAM {ram}%")
+            # Last background sample; calling psutil here would measure since the previous scrape
+            latest = sampler.latest()
             return {
                 "status": "success",
-                "cpu": cpu,
-                "ram": ram,
-                "abort_status": self._abort_requested
+                "cpu": latest.get("cpu"),
+                "ram": latest.get("ram"),
+                "resources": latest,
+                "saturated": sampler.saturated(),
+                "abort_status": any(w.abort_reason for w in self.watchdog.watches.values()),
+                "tasks": self.watchdog.status()
             }
         
         elif action == "abort":
-            self._abort_requested = True
-            return {"status": "abort_triggered"}
+            task_id = task.get("task_id")
+            if not self.request_abort(task_id, task.get("reason", "abort requested")):
+                return {"status": "error", "error": f"Task {task_id} is not running"}
+            return {"status": "abort_triggered", "task_id": task_id}
 
         return {"status": "idle"}
 
+    def watch(self, task_id: str, aio_task: Optional[asyncio.Task] = None):
+        """Starts tracking `task_id`; the calling asyncio task is cancelled on hang or abort."""
+        self.start_time = time.time()
+        self.watchdog.watch(task_id, aio_task)
+
+    def unwatch(self, task_id: str):
+        self.watchdog.unwatch(task_id)
+
     def is_hung(self, last_update_time: float, threshold: float = 60.0) -> bool:
         return (time.time() - last_update_time) > threshold
 
-    def request_abort(self):
-        self._abort_requested = True
+    def request_abort(self, task_id: str, reason: str = "abort requested") -> bool:
+        return self.watchdog.cancel(task_id, reason)
 
-    def reset(self):
-        self._abort_requested = False
-        self.start_time = time.time()
+    def abort_reason(self, task_id: str) -> Optional[str]:
+        return self.watchdog.abort_reason(task_id)
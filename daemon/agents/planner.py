@@ -1,87 +1,132 @@
-import requests
 import json
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 from .base import Agent
+from ollama_client import ollama_post
+from metrics import registry
+from prompt_builder import PromptBuilder, budget_for, compact_plan, estimate_tokens, truncate
+from model_residency import residency
+
+PROMPT_TOKENS = registry.histogram(
+    "remotepilot_planner_prompt_tokens", "Prompt tokens Ollama evaluated per planner call", ("kind",),
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096))
+PREFILL_LATENCY = registry.histogram(
+    "remotepilot_planner_prefill_seconds", "Ollama prompt evaluation (prefill) time per planner call", ("kind",))
+
+# Identical on every call and sent as Ollama's system prompt, so it leads
+# every formatted prompt and its KV cache entries are reused between calls.
+SYSTEM_PROMPT = """You are an expert system automation planner.
+Your job is to convert the User's Goal into a strict JSON LIST of atomic actions.
+Available Actions:
+- COMMAND: Run a shell command
+- TYPE: Type text
+- HOTKEY: Press key combo
+- CLICK: Click at coordinates
+- WAIT: Wait for seconds
+- BROWSE: Open a website URL
+- CLICK_BROWSER: Click a CSS selector
+
+Output a JSON LIST ONLY."""
 
 class PlannerAgent(Agent):
-    def __init__(self, ollama_url="http://localhost:11434"):
+    def __init__(self, ollama_url="http://localhost:11434", max_contexts: int = 32):
         super().__init__(name="Planner")
         self.ollama_url = ollama_url
+        # task_id -> Ollama context of its last planner call, continued by re_plan
+        self._contexts: "OrderedDict[str, List[int]]" = OrderedDict()
+        self.max_contexts = max_contexts
+        self.system_tokens = estimate_tokens(SYSTEM_PROMPT)
 
-    async def re_plan(self, task: Dict[str, Any]) -> Dict[str, Any]:
-        goal = task.get("goal")
-        failed_step = task.get("failed_step")
-        error = task.get("error")
-        vision = task.get("vision_context", "Unknown UI state")
-
-        prompt = f"""
-RE-PLANNING REQUIRED.
-Original Goal: {goal}
-The step {failed_step} FAILED with error: {error}.
-Current Screen State: {vision}
+    async def preload(self, model: str = "llama3.2") -> bool:
+        """Loads `model` into Ollama so the first plan doesn't pay the cold load."""
+        return await residency.preload(model, self.ollama_url, keep_alive=residency.keep_alive_long)
 
-Generate a NEW plan to achieve the original goal starting from this state. 
-Be creative. If one method failed, try a different approach (e.g., instead of a click, use a hotkey).
+    async def re_plan(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        With the task's context from its previous planner call (task_id),
+        only the failure is sent: Ollama already holds the goal and the
+        earlier plan. Without one, or when it no longer fits, the goal is
+        restated against the system prompt.
+        """
+        model = task.get("model", "llama3.2")
+        budget = budget_for(model)
+        context = self._contexts.get(task.get("task_id"))
+        if context is not None and len(context) > budget // 2:
+            context = None # Leaves too little room; start fresh
 
-Output a JSON LIST ONLY.
-"""
-        return await self._call_ollama(prompt, task.get("model", "llama3.2"))
+        builder = PromptBuilder(budget, reserved=len(context) if context else self.system_tokens)
+        builder.add("RE-PLANNING REQUIRED.", required=True)
+        if context is None:
+            builder.add(f"Original Goal: {task.get('goal')}", required=True)
+        builder.add(f"The step {compact_plan([task.get('failed_step')])} FAILED.", required=True)
+        builder.add(f"Error: {task.get('error')}", priority=2, min_tokens=48)
+        builder.add(f"Current Screen State: {task.get('vision_context', 'Unknown UI state')}", priority=1, min_tokens=96)
+        builder.add("Generate a NEW plan to achieve the original goal starting from this state.\n"
+                    "Be creative. If one method failed, try a different approach (e.g., instead of a click, use a hotkey).\n"
+                    "Output a JSON LIST ONLY.", required=True)
+        return await self._call_ollama(builder, model, "replan", task.get("task_id"), context)
 
-    async def _call_ollama(self, prompt, model):
+    async def _call_ollama(self, builder: PromptBuilder, model: str, kind: str,
+                           task_id: Optional[str] = None, context: Optional[List[int]] = None):
+        prompt, estimated, cuts = builder.build()
+        payload = {"model": model, "prompt": prompt, "stream": False, "format": "json"} # keep_alive: residency
+        if context is not None:
+            payload["context"] = context # The system prompt is part of it already
+        else:
+            payload["system"] = SYSTEM_PROMPT
         try:
-            import asyncio
-            response = await asyncio.to_thread(
-                requests.post,
-                f"{self.ollama_url}/api/generate",
-                json={"model": model, "prompt": prompt, "stream": False, "format": "json"},
-                timeout=30
-            )
+            response = await ollama_post(f"{self.ollama_url}/api/generate", json=payload, timeout=30)
             if response.status_code == 200:
-                content = response.json().get("response", "")
+                result = response.json()
+                usage = self._usage(result, kind, estimated, cuts)
+                if task_id and result.get("context"):
+                    self._contexts[task_id] = result["context"]
+                    self._contexts.move_to_end(task_id)
+                    while len(self._contexts) > self.max_contexts:
+                        self._contexts.popitem(last=False)
+                content = result.get("response", "")
                 try:
                     data = json.loads(content)
                     if isinstance(data, dict) and "plan" in data:
                         data = data["plan"]
                     if not isinstance(data, list):
                         data = [data]
-                    return {"status": "success", "plan": data}
+                    return {"status": "success", "plan": data, "usage": usage}
                 except json.JSONDecodeError:
                     return {"status": "error", "error": f"Invalid JSON: {content}"}
             return {"status": "error", "error": f"Ollama Error: {response.status_code}"}
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
+    def _usage(self, result: Dict[str, Any], kind: str, estimated: int, cuts: List[str]) -> Dict[str, Any]:
+        # prompt_eval_count excludes tokens Ollama found in its cache
+        usage = {"estimated_tokens": estimated, "prompt_tokens": result.get("prompt_eval_count"),
+                 "prefill_ms": round(result.get("prompt_eval_duration", 0) / 1e6, 1),
+                 "load_ms": round(result.get("load_duration", 0) / 1e6, 1), "cuts": cuts}
+        if usage["prompt_tokens"] is not None:
+            PROMPT_TOKENS.observe(usage["prompt_tokens"], kind=kind)
+            PREFILL_LATENCY.observe(usage["prefill_ms"] / 1000, kind=kind)
+        self.log(f"{kind}: {usage['prompt_tokens']} prompt tokens evaluated (~{estimated} sent), "
+                 f"prefill {usage['prefill_ms']} ms" + (f", {len(cuts)} sections cut" if cuts else ""))
+        return usage
+
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         goal = task.get("goal")
         model = task.get("model", "llama3.2")
-        
-        # 1. SEMANTIC RETRIEVAL
-        history_context = ""
+        builder = PromptBuilder(budget_for(model), reserved=self.system_tokens)
+        residency.prefetch(model, self.ollama_url) # Loads while the goal is embedded
+
+        # 1. SEMANTIC RETRIEVAL: the most relevant plan is the last to be dropped
         try:
             from memory_store import memory_store
             relevant_history = await memory_store.retrieve_relevant(goal)
-            if relevant_history:
-                history_context = "\nSimilar successful plans from history:\n"
-                for item in relevant_history:
-                    history_context += f"- Goal: {item['goal']}\n  Plan: {json.dumps(item['plan'])}\n"
+            for rank, item in enumerate(relevant_history):
+                header = "Similar successful plans from history:\n" if rank == 0 else ""
+                builder.add(f"{header}- Goal: {truncate(str(item['goal']), 200)}\n  Plan: {compact_plan(item['plan'])}",
+                            priority=-rank)
         except Exception as e:
             print(f"[Planner] Memory retrieval skipped: {e}")
 
-        prompt = f"""
-You are an expert system automation planner. 
-Your job is to convert the User's Goal into a strict JSON LIST of atomic actions.
-{history_context}
-Available Actions:
-- COMMAND: Run a shell command
-- TYPE: Type text
-- HOTKEY: Press key combo
-- CLICK: Click at coordinates
-- WAIT: Wait for seconds
-- BROWSE: Open a website URL
-- CLICK_BROWSER: Click a CSS selector
-
-User Goal: {goal}
-
-Output a JSON LIST ONLY.
-"""
-        return await self._call_ollama(prompt, model)
+        builder.add(f"User Goal: {goal}", required=True)
+        builder.add("Output a JSON LIST ONLY.", required=True)
+        return await self._call_ollama(builder, model, "plan", task.get("task_id"))
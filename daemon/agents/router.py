@@ -1,6 +1,6 @@
-import requests
 from typing import Dict, Any, List
 from .base import Agent
+from ollama_client import ollama_get
 
 class ModelRouterAgent(Agent):
     def __init__(self):
@@ -11,15 +11,15 @@ class ModelRouterAgent(Agent):
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         command = task.get("command")
         if command == "list_models":
-            return self.list_models()
+            return await self.list_models()
         elif command == "select_model":
-            return self.select_model(task.get("intent", "general"))
+            return await self.select_model(task.get("intent", "general"))
         return {"error": "Unknown command"}
 
-    def list_models(self) -> Dict[str, Any]:
+    async def list_models(self) -> Dict[str, Any]:
         print(f"[ModelRouter] Fetching models from {self.ollama_url}...")
         try:
-            response = requests.get(f"{self.ollama_url}/api/tags")
+            response = await ollama_get(f"{self.ollama_url}/api/tags")
             print(f"[ModelRouter] Response: {response.status_code}")
             if response.status_code == 200:
                 data = response.json()
@@ -33,9 +33,9 @@ class ModelRouterAgent(Agent):
             print(f"[ModelRouter] Exception: {e}")
             return {"error": f"Ollama connection error: {str(e)}"}
 
-    def select_model(self, intent: str) -> Dict[str, Any]:
+    async def select_model(self, intent: str) -> Dict[str, Any]:
         # Simple heuristic for now
-        self.list_models() # Refresh
+        await self.list_models() # Refresh
         
         # Priority mapping
         priorities = {
@@ -1,13 +1,12 @@
 from typing import Dict, Any, List
 from .base import Agent
+from policy import policy_engine
 
 class SafetyAgent(Agent):
     def __init__(self):
         super().__init__(name="Safety")
-        self.forbidden_keywords = [
-            "rm -rf", "format", "mkfs", "dd if=", ":(){ :|:& };:", # Fork bomb
-            "shutdown", "reboot", "del /s /q", "rd /s /q"
-        ]
+        # Forbidden keywords live in policy_rules.json ("safety" group)
+        self.policy = policy_engine
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -16,19 +15,13 @@ class SafetyAgent(Agent):
         """
         plan = task.get("plan", [])
         
-        for step in plan:
-            action_type = step.get("action", "").upper()
-            value = step.get("value", "").lower()
-            
-            # Check for generic forbidden keywords in any command/value
-            for keyword in self.forbidden_keywords:
-                if keyword in value:
-                    return {
-                        "status": "UNSAFE", 
-                        "reason": f"Forbidden keyword detected: {keyword} in step {step}"
-                    }
-                    
-            # Specific heuristic: Command length limits?
-            # if len(value) > 1000: return {"status": "UNSAFE", "reason": "Command too long"}
+        # Check for generic forbidden keywords in any command/value
+        hit = self.policy.scan_plan(plan, "safety")
+        if hit:
+            step, keyword = hit
+            return {
+                "status": "UNSAFE", 
+                "reason": f"Forbidden keyword detected: {keyword} in step {step}"
+            }
 
         return {"status": "SAFE", "reason": "No threats detected"}
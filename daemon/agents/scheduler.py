@@ -1,39 +1,158 @@
+import re
+import uuid
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import datetime
-from typing import Dict, Any
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.triggers.cron import CronTrigger
+from typing import Dict, Any, Optional
 from .base import Agent
 
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_WEEKDAYS = ["sun", "mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+_WEEKDAY_PART = re.compile(r"(\*|[0-7])(?:-([0-7]))?(?:/(\d+))?")
+
+def _cron_weekdays(field: str) -> str:
+    """
+    Cron day-of-week numbers as APScheduler names. APScheduler orders the
+    week mon..sun, so a range starting at Sunday (0) is split off and
+    stepped values are listed out.
+    """
+    parts = []
+    for part in field.split(","):
+        match = _WEEKDAY_PART.fullmatch(part)
+        if not match:
+            parts.append(part) # names, "?" ... are left to APScheduler
+            continue
+        start, end, step = match.groups()
+        if step:
+            first = 0 if start == "*" else int(start)
+            last = int(end) if end else 6
+            names = dict.fromkeys(_WEEKDAYS[d] for d in range(first, last + 1, int(step)))
+            parts.extend(names)
+        elif start == "*":
+            parts.append("*")
+        elif not end:
+            parts.append(_WEEKDAYS[int(start)])
+        elif start == "0" and int(end) >= 6:
+            parts.append("*")
+        elif start == "0":
+            parts.extend(["sun"] + ([f"mon-{_WEEKDAYS[int(end)]}"] if end != "0" else []))
+        else:
+            parts.append(f"{_WEEKDAYS[int(start)]}-{_WEEKDAYS[int(end)]}")
+    return ",".join(parts)
+
+def parse_cron(expr: str, jitter: Optional[int] = None) -> CronTrigger:
+    """
+    Standard crontab parsing: 5 fields ("*/5 * * * *"), 6 fields with a
+    leading seconds field, or an @alias. Day-of-week numbers follow cron
+    (0 and 7 = Sunday); APScheduler 3.x would read 0 as Monday, so numbers
+    are rewritten to names first (_cron_weekdays). Raises ValueError on bad input.
+    """
+    expr = CRON_ALIASES.get(expr.strip().lower(), expr)
+    fields = expr.split()
+    second = None
+    if len(fields) == 6:
+        second, fields = fields[0], fields[1:]
+    if len(fields) != 5:
+        raise ValueError(f"Wrong number of cron fields; got {len(expr.split())}, expected 5")
+
+    fields[4] = _cron_weekdays(fields[4])
+    if second is None:
+        trigger = CronTrigger.from_crontab(" ".join(fields))
+    else:
+        trigger = CronTrigger(second=second, minute=fields[0], hour=fields[1], day=fields[2],
+                              month=fields[3], day_of_week=fields[4])
+    trigger.jitter = jitter
+    return trigger
+
+# Persisted jobs reference this module-level function by name, so they
+# survive restarts; SchedulerAgent points it at the live submit callback.
+_submit_callback = None
+
+async def run_scheduled_goal(goal: str):
+    if _submit_callback is None:
+        print(f"[Scheduler] No submit callback registered, dropping: {goal}")
+        return
+    await _submit_callback(goal)
+
 class SchedulerAgent(Agent):
-    def __init__(self, task_submit_callback):
+    def __init__(self, task_submit_callback, db_path="jobs.db", jitter=30, misfire_grace_time=3600):
         super().__init__(name="Scheduler")
-        self.scheduler = AsyncIOScheduler()
+        global _submit_callback
+        _submit_callback = task_submit_callback
         self.submit_callback = task_submit_callback
+        # Spread jobs sharing a cron boundary over `jitter` seconds
+        self.jitter = jitter
+        self.scheduler = AsyncIOScheduler(
+            jobstores={"default": SQLAlchemyJobStore(url=f"sqlite:///{db_path}")},
+            job_defaults={
+                # Catch-up: runs missed while the daemon was down (within the
+                # grace window) fire once on startup instead of once per miss
+                "coalesce": True,
+                "misfire_grace_time": misfire_grace_time,
+                "max_instances": 1,
+            }
+        )
         self.scheduler.start()
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
         Input: {"action": "schedule", "goal": "...", "cron": "0 10 * * *"}
+               {"action": "list"} | {"action": "pause" | "resume" | "delete", "job_id": "..."}
         """
         action = task.get("action", "schedule")
         goal = task.get("goal")
         cron = task.get("cron") # e.g. "*/5 * * * *" for every 5 mins
-        
+        job_id = task.get("job_id")
+
         if action == "schedule" and goal and cron:
-            job_id = f"job_{int(datetime.now().timestamp())}"
-            self.scheduler.add_job(
-                self.submit_callback, 
-                'cron', 
+            try:
+                trigger = parse_cron(cron, jitter=self.jitter)
+            except ValueError as e:
+                return {"status": "error", "error": f"Invalid cron expression: {e}"}
+            job_id = f"job_{uuid.uuid4().hex[:12]}"
+            job = self.scheduler.add_job(
+                run_scheduled_goal,
+                trigger,
                 args=[goal],
-                minute=cron.split()[0],
-                hour=cron.split()[1],
-                day=cron.split()[2],
-                month=cron.split()[3],
-                day_of_week=cron.split()[4],
-                id=job_id
+                id=job_id,
+                name=goal[:100]
             )
+            return {"status": "success", "job_id": job_id, "next_run": str(job.next_run_time)}
+
+        if action == "list":
+            return {"status": "success", "jobs": self.list_jobs()}
+
+        if action in ("pause", "resume", "delete") and job_id:
+            try:
+                if action == "pause":
+                    self.scheduler.pause_job(job_id)
+                elif action == "resume":
+                    self.scheduler.resume_job(job_id)
+                else:
+                    self.scheduler.remove_job(job_id)
+            except JobLookupError:
+                return {"status": "error", "error": f"No such job: {job_id}"}
             return {"status": "success", "job_id": job_id}
 
         return {"status": "error", "error": "Invalid schedule params"}
 
     def list_jobs(self):
-        return [{"id": j.id, "next_run": str(j.next_run_time)} for j in self.scheduler.get_jobs()]
+        return [{
+            "id": j.id,
+            "goal": j.args[0] if j.args else None,
+            "cron": str(j.trigger),
+            "paused": j.next_run_time is None,
+            "next_run": str(j.next_run_time)
+        } for j in self.scheduler.get_jobs()]
+
+    def shutdown(self):
+        self.scheduler.shutdown(wait=False)
@@ -1,16 +1,38 @@
-import re
-import requests
-from typing import Dict, Any
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 from .base import Agent
+from policy import policy_engine, normalize_command
+from ollama_client import ollama_post
 
 class SecurityAgent(Agent):
-    def __init__(self, ollama_url="http://localhost:11434"):
+    def __init__(self, ollama_url="http://localhost:11434", review_mode="tiered",
+                 review_timeout=10.0, verdict_ttl=3600.0, max_cached_verdicts=4096):
         super().__init__(name="Security")
         self.ollama_url = ollama_url
-        self.denylist = [
-            r"rm\s+-rf", r"del\s+/s", r"format\s+", r"mkfs", r"sudo\s+", 
-            r"> /dev/null", r":\(\){ :\|:& };:"
-        ]
+        # Denylist and high-risk patterns live in policy_rules.json
+        # ("security" and "review" groups)
+        self.policy = policy_engine
+        # "tiered": low-risk commands run immediately and are reviewed in the background,
+        #           high-risk ones block on a verdict.
+        # "blocking": every command without a cached verdict blocks.
+        self.review_mode = review_mode
+        self.review_timeout = review_timeout # Budget for all blocking reviews of one plan
+        self.verdict_ttl = verdict_ttl
+        self.max_cached_verdicts = max_cached_verdicts
+        self._verdicts: "OrderedDict[str, tuple]" = OrderedDict() # exact command text -> (expires_at, verdict)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "verdict_cache_hits": 0,
+            "verdict_cache_misses": 0,
+            "reviews": 0,
+            "review_errors": 0,
+            "review_timeouts": 0,
+            "background_reviews": 0,
+            "review_latency_total_ms": 0.0,
+            "review_latency_max_ms": 0.0,
+        }
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -18,43 +40,132 @@ class SecurityAgent(Agent):
         """
         command = str(task.get("command", ""))
         plan = task.get("plan", [])
-        
-        # 1. Heuristic Check
-        for pattern in self.denylist:
-            if re.search(pattern, command, re.I):
-                return {"status": "BLOCKED", "reason": f"Dangerous command pattern: {pattern}"}
-        
-        for step in plan:
-            val = str(step.get("value", ""))
-            for pattern in self.denylist:
-                if re.search(pattern, val, re.I):
-                    return {"status": "BLOCKED", "reason": f"Dangerous step: {val}"}
-
-        # 2. LLM-based intent check (Optional/Async)
-        # For performance, we can skip this for simple UI actions
-        if "COMMAND" in str(task):
-            return await self._check_intent(command if command else str(plan))
 
+        # 1. Heuristic Check (single pass per step over the combined denylist)
+        pattern = self.policy.scan(command, "security")
+        if pattern:
+            return {"status": "BLOCKED", "reason": f"Dangerous command pattern: {pattern}"}
+
+        hit = self.policy.scan_plan(plan, "security")
+        if hit:
+            step, pattern = hit
+            return {"status": "BLOCKED", "reason": f"Dangerous step: {step.get('value')}"}
+
+        # 2. LLM-based intent check, per command step
+        # UI actions are skipped; cached verdicts are reused.
+        commands = [command] if command else []
+        commands += [str(s.get("value", "")) for s in plan if str(s.get("action", "")).upper() == "COMMAND"]
+        return await self._review_commands(commands)
+
+    async def _review_commands(self, commands: List[str]) -> Dict[str, Any]:
+        blocking = {}
+        for cmd in commands:
+            # Keyed on the exact text: quoting changes what the shell runs
+            # ("echo '$(x)'" vs "echo $(x)"); the normalized form is only for rules
+            key = cmd.strip()
+            if not key or key in blocking:
+                continue
+            verdict = self._cached_verdict(key)
+            if verdict:
+                if verdict["status"] == "BLOCKED":
+                    return verdict
+                continue
+
+            if self.review_mode == "tiered" and not self.policy.scan(normalize_command(cmd), "review"):
+                # Low risk: proceed now, verdict lands in the cache for next time
+                self._stats["background_reviews"] += 1
+                self._start_review(key, cmd)
+            else:
+                blocking[key] = self._start_review(key, cmd)
+
+        if not blocking:
+            return {"status": "SAFE"}
+
+        try:
+            verdicts = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.shield(t) for t in blocking.values())),
+                timeout=self.review_timeout
+            )
+        except asyncio.TimeoutError:
+            self._stats["review_timeouts"] += 1
+            return {"status": "BLOCKED", "reason": f"Security review timed out after {self.review_timeout}s"}
+        except Exception as e:
+            return {"status": "BLOCKED", "reason": f"Security review unavailable: {e}"}
+
+        for verdict in verdicts:
+            if verdict["status"] == "BLOCKED":
+                return verdict
         return {"status": "SAFE"}
 
+    def _cached_verdict(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._verdicts.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._verdicts.move_to_end(key)
+            self._stats["verdict_cache_hits"] += 1
+            return entry[1]
+        if entry:
+            del self._verdicts[key]
+        self._stats["verdict_cache_misses"] += 1
+        return None
+
+    def _start_review(self, key: str, command: str) -> asyncio.Task:
+        # Identical commands already under review share the same request
+        if key not in self._in_flight:
+            review = asyncio.create_task(self._review(key, command))
+            self._in_flight[key] = review
+            review.add_done_callback(lambda t: self._review_done(key, t))
+        return self._in_flight[key]
+
+    def _review_done(self, key: str, review: asyncio.Task):
+        self._in_flight.pop(key, None)
+        # Background reviews have no awaiter; consume failures here
+        if not review.cancelled() and review.exception():
+            self.log(f"Review failed: {review.exception()}")
+
+    async def _review(self, key: str, command: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            verdict = await self._check_intent(command)
+        except Exception:
+            self._stats["review_errors"] += 1
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self._stats["reviews"] += 1
+            self._stats["review_latency_total_ms"] += elapsed
+            self._stats["review_latency_max_ms"] = max(self._stats["review_latency_max_ms"], elapsed)
+
+        self._verdicts[key] = (time.monotonic() + self.verdict_ttl, verdict)
+        while len(self._verdicts) > self.max_cached_verdicts:
+            self._verdicts.popitem(last=False)
+        if verdict["status"] == "BLOCKED":
+            self.log(f"Review flagged command: {command}")
+        return verdict
+
     async def _check_intent(self, content: str) -> Dict[str, Any]:
-        import asyncio
         prompt = f"Analyze this automation command for malicious intent or destructive potential: {content}. Return ONLY 'SAFE' or 'MALICIOUS' and a brief reason."
-        try:
-            res = await asyncio.to_thread(
-                requests.post,
-                f"{self.ollama_url}/api/generate", 
-                json={
-                    "model": "llama3.2",
-                    "prompt": prompt,
-                    "stream": False
-                }, 
-                timeout=2
-            )
-            if res.status_code == 200:
-                verdict = res.json().get("response", "").upper()
-                if "MALICIOUS" in verdict:
-                    return {"status": "BLOCKED", "reason": "LLM flagged potential danger."}
-            return {"status": "SAFE"}
-        except:
-            return {"status": "SAFE"} # Fallback to heuristic
+        res = await ollama_post(
+            f"{self.ollama_url}/api/generate",
+            json={
+                "model": "llama3.2",
+                "prompt": prompt,
+                "stream": False
+            },
+            timeout=self.review_timeout
+        )
+        if res.status_code != 200:
+            raise RuntimeError(f"Ollama Error: {res.status_code}")
+        verdict = res.json().get("response", "").upper()
+        if "MALICIOUS" in verdict:
+            return {"status": "BLOCKED", "reason": "LLM flagged potential danger."}
+        return {"status": "SAFE"}
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["verdict_cache_hits"] + self._stats["verdict_cache_misses"]
+        reviews = self._stats["reviews"]
+        return {
+            **self._stats,
+            "verdict_cache_size": len(self._verdicts),
+            "verdict_cache_hit_rate": self._stats["verdict_cache_hits"] / lookups if lookups else 0.0,
+            "review_latency_avg_ms": self._stats["review_latency_total_ms"] / reviews if reviews else 0.0,
+        }
@@ -1,12 +1,53 @@
 from typing import Dict, Any, List
-import requests
+from collections import OrderedDict
+import time
+import asyncio
+import hashlib
 import json
 from .base import Agent
+from ollama_client import ollama_post
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for English text; good enough for budgeting
+    return len(text) // 4 + 1
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Splits text into pieces of at most `max_tokens`, preferring paragraph then sentence breaks."""
+    max_chars = max_tokens * 4
+    chunks = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n\n", 0, max_chars)
+        if cut < max_chars // 2:
+            cut = text.rfind(". ", 0, max_chars) + 1
+        if cut < max_chars // 2:
+            cut = max_chars
+        if text[:cut].strip():
+            chunks.append(text[:cut].strip())
+        text = text[cut:]
+    if text.strip():
+        chunks.append(text.strip())
+    return chunks
 
 class ResearchAgent(Agent):
-    def __init__(self, ollama_url="http://localhost:11434"):
+    """
+    Map-reduce synthesis: every page (split into token-budgeted chunks) is
+    summarized concurrently, then the summaries are folded into the final
+    report. Page summaries are cached by content hash, so repeated research
+    over the same sources only pays for the reduce step.
+    """
+    def __init__(self, ollama_url="http://localhost:11434", model="llama3.2",
+                 context_tokens=4096, max_concurrency=4, summary_cache_size=1024):
         super().__init__(name="Research")
         self.ollama_url = ollama_url
+        self.model = model
+        self.context_tokens = context_tokens
+        # Leave room for the instructions and the model's answer
+        self.input_budget = context_tokens - 1024
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.summary_cache_size = summary_cache_size
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -14,62 +55,149 @@ class ResearchAgent(Agent):
         Output: {"summary": "...", "sources": [...]}
         """
         topic = task.get("topic", "")
-        pages_content = task.get("pages", [])
-        
+        pages_content = [p for p in task.get("pages", []) if p and p.strip()]
+
+        try:
+            # MAP: one summary per page, bounded concurrency
+            results = await asyncio.gather(*(self._summarize_page(p) for p in pages_content), return_exceptions=True)
+            summaries = [r for r in results if isinstance(r, str) and r.strip()]
+            failed = len(results) - len(summaries)
+            if failed:
+                self.log(f"{failed}/{len(results)} page summaries failed")
+            if pages_content and not summaries:
+                return {"status": "error", "error": f"All page summaries failed: {results[0]}"}
+
+            # REDUCE: fold summaries until they fit one prompt, then synthesize
+            while estimate_tokens("\n\n".join(summaries)) > self.input_budget and len(summaries) > 1:
+                summaries = await asyncio.gather(*(
+                    self._summarize(batch, "these partial research notes")
+                    for batch in self._batches(summaries)
+                ))
+
+            data = await self._synthesize(topic, summaries)
+            data["sources_analyzed"] = len(pages_content)
+            return {"status": "success", "data": data}
+        except Exception as e:
+            return {"status": "error", "error": str(e)}
+
+    def _batches(self, summaries: List[str]) -> List[str]:
+        """Greedily packs summaries into groups that fit the input budget (at least two per group)."""
+        batches, current = [], []
+        for s in summaries:
+            if len(current) >= 2 and estimate_tokens("\n\n".join(current + [s])) > self.input_budget:
+                batches.append("\n\n".join(current))
+                current = []
+            current.append(s)
+        if current:
+            batches.append("\n\n".join(current))
+        return batches
+
+    async def _summarize_page(self, page: str) -> str:
+        key = hashlib.sha256(f"{self.model}\0{page}".encode("utf-8")).hexdigest()
+        if key in self._summaries:
+            self._summaries.move_to_end(key)
+            self.cache_hits += 1
+            return self._summaries[key]
+        self.cache_misses += 1
+
+        chunks = chunk_text(page, self.input_budget)
+        parts = await asyncio.gather(*(self._summarize(c, "this web page excerpt") for c in chunks))
+        summary = parts[0] if len(parts) == 1 else await self._summarize("\n\n".join(parts), "these notes on one web page")
+
+        self._summaries[key] = summary
+        while len(self._summaries) > self.summary_cache_size:
+            self._summaries.popitem(last=False)
+        return summary
+
+    async def _summarize(self, text: str, what: str) -> str:
+        prompt = f"""
+Summarize {what}. Keep every concrete fact, number, name and date; drop navigation, ads and boilerplate.
+Answer with plain text notes, at most 200 words.
+
+Content:
+{text}
+"""
+        return await self._generate(prompt)
+
+    async def _synthesize(self, topic: str, summaries: List[str]) -> Dict[str, Any]:
+        notes = "\n\n".join(f"[Source {i + 1}]\n{s}" for i, s in enumerate(summaries))
         prompt = f"""
 You are a Research Analyst. 
 Topic: {topic}
 
-Below is content from multiple web pages. 
+Below are notes taken from multiple web pages. 
 Synthesize a comprehensive summary of the findings. 
 Be concise but thorough.
 
-Content:
-{" ".join(pages_content)[:8000]} 
+Notes:
+{notes}
 
 Output JSON ONLY:
 {{
   "summary": "...",
-  "key_findings": ["...", "..."],
-  "sources_analyzed": {len(pages_content)}
+  "key_findings": ["...", "..."]
 }}
 """
-        try:
-            import asyncio
-            response = await asyncio.to_thread(
-                requests.post,
+        return json.loads(await self._generate(prompt, json_format=True) or "{}")
+
+    async def _generate(self, prompt: str, json_format: bool = False) -> str:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {"num_ctx": self.context_tokens}
+        }
+        if json_format:
+            payload["format"] = "json"
+        async with self._semaphore:
+            response = await ollama_post(
                 f"{self.ollama_url}/api/generate",
-                json={
-                    "model": "llama3.2",
-                    "prompt": prompt,
-                    "stream": False,
-                    "format": "json"
-                }
+                json=payload
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return {"status": "success", "data": json.loads(result.get("response", "{}"))}
-            else:
-                return {"status": "error", "error": f"Ollama Error: {response.text}"}
-        except Exception as e:
-            return {"status": "error", "error": str(e)}
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama Error: {response.text}")
+        return response.json().get("response", "")
 
 class DomainAgent(Agent):
-    def __init__(self, ollama_url="http://localhost:11434"):
+    """
+    Known workflows (Gmail, Outlook, web search, ...) as deterministic
+    recipes: a goal that matches one gets its plan without the planner,
+    and every step is verified against the DOM instead of the VLM.
+    Recipes come from recipes.json and from runs that succeeded repeatedly
+    in memory.db (recompiled every `recompile_interval` seconds).
+    """
+    def __init__(self, ollama_url="http://localhost:11434", library=None, history_db="memory.db",
+                 min_successes=2, recompile_interval=300.0):
         super().__init__(name="Domain")
         self.ollama_url = ollama_url
+        if library is None:
+            from recipes import RecipeLibrary
+            library = RecipeLibrary()
+        self.library = library
+        self.history_db = history_db
+        self.min_successes = min_successes
+        self.recompile_interval = recompile_interval
+        self._next_compile = 0.0
+
+    def compile_history(self) -> int:
+        from recipes import compile_history
+        self.library.compiled = compile_history(self.history_db, self.min_successes)
+        self._next_compile = time.monotonic() + self.recompile_interval
+        return len(self.library.compiled)
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Specialized prompts for Gmail, Outlook, etc.
-        Input: {"domain": "gmail", "goal": "send email to bob", "context": "..."}
+        Input: {"goal": "send email to bob@example.com saying hi", "domain": "gmail" (optional)}
+        Output: {"status": "success", "recipe": ..., "plan": [...]} or {"status": "no_match"}
         """
-        # This agent primarily generates BROWSER selectors or instructions for ActionAgent
-        # by understanding specific web UI patterns.
-        domain = task.get("domain", "")
         goal = task.get("goal", "")
-        
-        # In a real implementation, this would have a library of 'recipes'
-        # or use LLM to map goal -> specific browser actions for known domains.
-        return {"status": "success", "instructions": f"Specialized path for {domain} engaged for {goal}"}
+        if time.monotonic() >= self._next_compile:
+            count = await asyncio.to_thread(self.compile_history)
+            if count:
+                self.log(f"Compiled {count} recipes from task history")
+        hit = self.library.match(goal, task.get("domain", ""))
+        if hit is None:
+            return {"status": "no_match"}
+        recipe, plan = hit
+        return {"status": "success", "recipe": recipe.name, "domain": recipe.domain,
+                "source": recipe.source, "plan": plan}
@@ -5,30 +5,32 @@ from .base import Agent
 # For this phase, we'll assume Coordinator passes it or we import inside method.
 
 class VerifierAgent(Agent):
-    def __init__(self, vision_agent=None):
+    def __init__(self, vision_agent=None, dom_check=None):
         super().__init__(name="Verifier")
         self.vision_agent = vision_agent
+        # async (expect) -> {"verified", "details"}; checks the browser page (ActionAgent.check_dom)
+        self.dom_check = dom_check
 
     def set_vision_agent(self, agent):
         self.vision_agent = agent
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Input: {"expectation": "A success message is visible", "capture": True}
+        Input: {"expectation": "A success message is visible", "step": {...the step just run}}
+        or, for recipe steps, {"expect": {"selector"|"text"|"url"|"gone": ...}, "action_status": "..."}
+        "image" is a screenshot already taken after the action (StepPipeline).
         """
         expectation = task.get("expectation", "")
+        if task.get("expect") is not None and self.dom_check:
+            return await self._verify_dom(task["expect"], task)
         
         if not self.vision_agent:
             return {"status": "error", "error": "Vision Agent not connected"}
             
-        print(f"[Verifier] Verifying visually: {expectation}")
+        print(f"[Verifier] Verifying: {expectation}")
         
-        # 1. Capture screen via VisionAgent setup
-        # VisionAgent.execute with 'describe' or custom prompt
-        res = await self.vision_agent.execute({
-            "command": f"Verify: {expectation}. Return JSON with 'match' (bool) and 'reason' (string).",
-            "model": "llava"
-        })
+        # Browser steps are judged on the page's element list; the rest on a screenshot
+        res = await self.vision_agent.observe(task.get("step"), question=expectation, image=task.get("image"))
         
         if res.get("status") == "success":
             desc = res.get("description", "")
@@ -39,7 +41,19 @@ class VerifierAgent(Agent):
             return {
                 "status": "success", 
                 "verified": match, 
-                "details": desc
+                "details": desc,
+                "source": res.get("source")
             }
         else:
-            return {"status": "error", "error": "Vision verification failed", "detail": res.get("error")}
+            return {"status": "error", "error": f"Verification failed ({res.get('source')})", "detail": res.get("error")}
+
+    async def _verify_dom(self, expect: Dict[str, Any], task: Dict[str, Any]) -> Dict[str, Any]:
+        # Milliseconds against the live page instead of a VLM round trip
+        if task.get("action_status") == "error":
+            return {"status": "success", "verified": False,
+                    "details": f"Action failed: {task.get('action_error', 'unknown error')}"}
+        print(f"[Verifier] Verifying DOM: {expect or 'action succeeded'}")
+        if not expect:
+            return {"status": "success", "verified": True, "details": "Action succeeded"}
+        res = await self.dom_check(expect)
+        return {"status": "success", "verified": res["verified"], "details": res["details"]}
@@ -1,31 +1,50 @@
 import io
+import time
 import base64
-import pyautogui
-from PIL import Image
-import requests
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, Optional
 from .base import Agent
+from ollama_client import ollama_post
+from display.base import DisplayBackend
 
 class VisionAgent(Agent):
-    def __init__(self, ollama_url="http://localhost:11434"):
+    def __init__(self, ollama_url="http://localhost:11434", display: Optional[DisplayBackend] = None,
+                 dom_snapshot=None, text_model: str = "llama3.2", max_snapshot_chars: int = 4000):
         super().__init__(name="Vision")
         self.ollama_url = ollama_url
+        self.display = display
+        # async () -> page snapshot or None (ActionAgent.snapshot); browser steps are observed through it
+        self.dom_snapshot = dom_snapshot
+        self.text_model = text_model
+        self.max_snapshot_chars = max_snapshot_chars
+
+    def capture(self):
+        """Blocking screenshot (PIL image); also the frame source for the /ws/screen stream."""
+        if self.display is None:
+            # Deferred: pyautogui is slow to import and needs a display
+            from display.desktop import DesktopDisplay
+            self.display = DesktopDisplay()
+        return self.display.screenshot()
+
+    def encode_png_b64(self, image) -> str:
+        buffered = io.BytesIO()
+        image.save(buffered, format="PNG")
+        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    def _capture_png_b64(self) -> str:
+        return self.encode_png_b64(self.capture())
 
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
         Input: {"command": "describe screen", "model": "moondream"}
+        and optionally "image", a base64 PNG already captured (StepPipeline).
         """
         command = task.get("command", "")
         model = task.get("model", "moondream") 
         
-        # 1. Capture Screenshot
+        # 1. Capture Screenshot (Base64 PNG), off the event loop
         try:
-            screenshot = pyautogui.screenshot()
-            
-            # Convert to Base64
-            buffered = io.BytesIO()
-            screenshot.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+            img_str = task.get("image") or await asyncio.to_thread(self._capture_png_b64)
             
             # 2. Query Ollama
             print(f"[Vision] Analyzing screen with {model}...")
@@ -34,7 +53,7 @@ class VisionAgent(Agent):
             if "describe" in command:
                 prompt = "Describe the UI elements visible on the screen."
             
-            response = requests.post(
+            response = await ollama_post(
                 f"{self.ollama_url}/api/generate",
                 json={
                     "model": model,
@@ -52,3 +71,50 @@ class VisionAgent(Agent):
                 
         except Exception as e:
             return {"status": "error", "error": str(e)}
+
+    def model_for(self, step: Optional[Dict[str, Any]] = None) -> str:
+        """The model observe(step) will ask, so it can be loaded while the step runs."""
+        from observation import is_browser_step
+        return self.text_model if self.dom_snapshot and is_browser_step(step) else "llava"
+
+    async def observe(self, step: Optional[Dict[str, Any]] = None, question: str = "",
+                      image: Optional[str] = None) -> Dict[str, Any]:
+        """
+        The current state after `step`, as text. Browser steps read the page's
+        interactive elements (milliseconds, ~1k tokens); native desktop state,
+        or a page that can't be read, goes to llava with a screenshot. With a
+        `question`, a model answers it about that state in "description".
+        `image` is a screenshot taken already, used instead of a new one.
+        """
+        from observation import (is_browser_step, format_snapshot, estimate_tokens, LLAVA_IMAGE_TOKENS,
+                                 OBSERVATION_LATENCY, OBSERVATION_TOKENS)
+        start = time.perf_counter()
+        snapshot = await self.dom_snapshot() if self.dom_snapshot and is_browser_step(step) else None
+        if snapshot is None:
+            command = f"Verify: {question}" if question else "Describe detailed UI state"
+            res = await self.execute({"command": command, "model": "llava", "image": image})
+            res.update(source="vlm", tokens=LLAVA_IMAGE_TOKENS + estimate_tokens(command))
+        else:
+            text = format_snapshot(snapshot, self.max_snapshot_chars)
+            res = {"status": "success", "source": "dom", "description": text, "tokens": estimate_tokens(text)}
+            if question:
+                res = await self._ask_about_page(text, question)
+        OBSERVATION_LATENCY.observe(time.perf_counter() - start, source=res["source"])
+        OBSERVATION_TOKENS.inc(res["tokens"], source=res["source"])
+        return res
+
+    async def _ask_about_page(self, page: str, question: str) -> Dict[str, Any]:
+        from observation import estimate_tokens
+        prompt = (f"Interactive elements of the current web page:\n{page}\n\n"
+                  f"Question: {question}\nAnswer YES or NO first, then one sentence why.")
+        try:
+            response = await ollama_post(
+                f"{self.ollama_url}/api/generate",
+                json={"model": self.text_model, "prompt": prompt, "stream": False}
+            )
+            if response.status_code != 200:
+                return {"status": "error", "source": "dom", "tokens": 0, "error": f"Ollama Error: {response.text}"}
+            return {"status": "success", "source": "dom", "tokens": estimate_tokens(prompt),
+                    "description": response.json().get("response", "")}
+        except Exception as e:
+            return {"status": "error", "source": "dom", "tokens": 0, "error": str(e)}
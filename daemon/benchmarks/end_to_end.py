@@ -0,0 +1,306 @@
+"""
+End-to-end load test of the daemon, fully offline, compared against stored baselines.
+
+The FastAPI app runs in-process under uvicorn on a free port. Around it:
+a stub Ollama (planner, VLM, security review and embedding latency set by
+the --*-ms flags, planner output by --plan-file), the fake display backend
+in place of pyautogui, and a local web site for BROWSE steps (used when
+Playwright is installed). Tasks go in through POST /task/submit,
+--concurrency at a time, and are followed on /ws/logs until they finish.
+
+Reported, after --warmup tasks: tasks/s; submit-to-finish latency; time per phase (from the
+state messages on /ws/logs), as p50/p95/p99; RSS growth; event loop lag
+(how late a 20 ms timer fires, server and load generator share the loop).
+Results are compared with benchmarks/end_to_end_baselines.json for the
+--scenario; a metric worse than its baseline by more than --tolerance
+exits non-zero. --save-baseline records this run instead.
+
+Run from the daemon directory:
+    python -m benchmarks.end_to_end --scenario smoke
+    python -m benchmarks.end_to_end --scenario load --tasks 100 --concurrency 16 --save-baseline
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+import importlib.util
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psutil
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "end_to_end_baselines.json")
+# metric -> which way is better; what a baseline comparison checks
+COMPARED = {"tasks_per_s": "higher", "latency_p95_s": "lower", "loop_lag_p99_ms": "lower",
+            "rss_growth_per_task_kb": "lower"}
+DESKTOP_PLAN = [{"action": "CLICK", "value": "200 200"}, {"action": "TYPE", "value": "quarterly report"},
+                {"action": "HOTKEY", "value": "enter"}, {"action": "WAIT", "value": "0.5"}]
+BROWSER_PLAN = [{"action": "BROWSE", "value": "{site}/reports"}]
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def reply(handler, payload, content_type="application/json"):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+def local_site():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            rows = "".join(f"<tr><td>Report {i}</td><td><a href='/reports/{i}'>open</a></td></tr>" for i in range(20))
+            reply(self, f"<html><body><h1>Reports</h1><table>{rows}</table></body></html>".encode(), "text/html")
+
+        def log_message(self, *args):
+            pass
+    return serve(Handler)
+
+def stub_ollama(args, plan, calls):
+    """Answers each kind of daemon request after its configured latency."""
+    def kind(path, body):
+        if path in ("/api/embeddings", "/api/embed"):
+            return "embed"
+        if "prompt" not in body:
+            return "load" # residency preload
+        if body.get("images"):
+            return "vlm"
+        if "malicious intent" in body["prompt"]:
+            return "review"
+        return "plan" if body.get("format") == "json" else "text"
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            reply(self, {"models": [] if self.path == "/api/ps" else [{"name": "llama3.2:latest", "size": 2 << 30}]})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            k = kind(self.path, body)
+            calls[k] += 1
+            time.sleep(getattr(args, f"{k}_ms", 0) / 1000)
+            if k == "embed":
+                digest = hashlib.sha256(body.get("prompt", "").encode()).digest()
+                reply(self, {"embedding": [b / 255 for b in digest * 2]})
+            elif k == "load":
+                reply(self, {"model": body["model"], "done": True})
+            else:
+                text = {"plan": json.dumps(plan), "review": "SAFE", "vlm": args.vlm_answer}.get(k, "YES")
+                reply(self, {"model": body["model"], "response": text, "done": True})
+
+        def log_message(self, *args):
+            pass
+    return serve(Handler)
+
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+async def watch_loop(lags, rss, stop, interval=0.02):
+    proc = psutil.Process()
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+        rss.append(proc.memory_info().rss)
+
+async def run(args, plan, ollama_url):
+    import httpx
+    import uvicorn
+    import websockets
+    import main
+    from coordinator import coordinator
+    from memory_store import memory_store
+    from sampler import sampler
+
+    if not args.admission:
+        sampler.cpu_limit = sampler.ram_limit = float("inf") # measure the pipeline, not deferral
+    coordinator.preload(["Monitor", "Planner", "Security", "Safety", "Memory", "Action", "Vision",
+                         "Verifier", "Research", "Domain", "ModelRouter"])
+    for name in coordinator.agents.loaded():
+        agent = coordinator.agents.get(name)
+        if hasattr(agent, "ollama_url"):
+            agent.ollama_url = ollama_url # agents default to localhost:11434
+    memory_store.ollama_url = ollama_url
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=0, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    lags, rss, stop = [], [], asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(lags, rss, stop))
+    events = defaultdict(list) # task_id -> [(status, t)]
+    finished = defaultdict(asyncio.Event)
+    messages = 0
+
+    async def follow(ws):
+        nonlocal messages
+        async for raw in ws:
+            messages += 1
+            msg = json.loads(raw)
+            if msg.get("type") == "state":
+                status = msg["data"]["status"]
+                events[msg["task_id"]].append((status, time.perf_counter()))
+                if status in ("DONE", "FAILED", "CANCELLED"):
+                    finished[msg["task_id"]].set()
+
+    submitted, gate = {}, asyncio.Semaphore(args.concurrency)
+    async def one(client, i):
+        async with gate:
+            start = time.perf_counter()
+            res = await client.post("/task/submit", json={"goal": f"file quarterly report #{i}"})
+            task_id = res.json()["task_id"]
+            submitted[task_id] = start
+            await asyncio.wait_for(finished[task_id].wait(), args.task_timeout)
+
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/logs", max_size=None) as ws:
+        follower = asyncio.create_task(follow(ws))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            # First tasks pay one-off costs (imports, first frames, the memory index); not measured
+            await asyncio.gather(*(one(client, -i) for i in range(1, args.warmup + 1)))
+            submitted.clear()
+            lags.clear()
+            rss.clear()
+            rss_start = psutil.Process().memory_info().rss
+            start = time.perf_counter()
+            results = await asyncio.gather(*(one(client, i) for i in range(args.tasks)), return_exceptions=True)
+            wall = time.perf_counter() - start
+            rss_end = psutil.Process().memory_info().rss
+        follower.cancel()
+    stop.set()
+    await watcher
+    server.should_exit = True
+    await serving
+
+    latencies, phases, outcomes = [], defaultdict(list), defaultdict(int)
+    for task_id, submitted_at in submitted.items():
+        seen = events[task_id]
+        if not seen:
+            continue
+        outcomes[seen[-1][0]] += 1
+        latencies.append(seen[-1][1] - submitted_at)
+        previous, since = "IDLE", submitted_at # admitted, not yet planning
+        for status, t in seen:
+            phases[previous].append(t - since)
+            previous, since = status, t
+    outcomes["timeout"] = sum(isinstance(r, asyncio.TimeoutError) for r in results)
+    return {
+        "tasks": args.tasks, "concurrency": args.concurrency, "wall_s": round(wall, 2),
+        "tasks_per_s": round(outcomes["DONE"] / wall, 3),
+        "outcomes": {k: v for k, v in outcomes.items() if v},
+        "latency_p50_s": round(percentile(latencies, 50) or 0, 3),
+        "latency_p95_s": round(percentile(latencies, 95) or 0, 3),
+        "latency_p99_s": round(percentile(latencies, 99) or 0, 3),
+        "phases_ms": {phase: {f"p{p}": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}
+                      for phase, values in phases.items()},
+        "ws_messages": messages,
+        "rss_start_mb": round(rss_start / 2 ** 20, 1), "rss_peak_mb": round(max(rss) / 2 ** 20, 1),
+        "rss_growth_per_task_kb": round((rss_end - rss_start) / 1024 / max(args.tasks, 1), 1),
+        "loop_lag_p50_ms": round(percentile(lags, 50), 2), "loop_lag_p99_ms": round(percentile(lags, 99), 2),
+        "loop_lag_max_ms": round(max(lags), 2),
+    }
+
+def report(result):
+    print(f"\n{result['tasks']} tasks, {result['concurrency']} at a time: {result['wall_s']} s, "
+          f"{result['tasks_per_s']} tasks/s, outcomes {result['outcomes']}")
+    print(f"latency p50/p95/p99: {result['latency_p50_s']} / {result['latency_p95_s']} / {result['latency_p99_s']} s")
+    print(f"{'phase':<15}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for phase, p in result["phases_ms"].items():
+        print(f"{phase:<15}{p['p50']:>10.1f}{p['p95']:>10.1f}{p['p99']:>10.1f}")
+    print(f"RSS {result['rss_start_mb']} MB at start, peak {result['rss_peak_mb']} MB, "
+          f"{result['rss_growth_per_task_kb']} KB/task; /ws/logs messages: {result['ws_messages']}")
+    print(f"loop lag p50/p99/max: {result['loop_lag_p50_ms']} / {result['loop_lag_p99_ms']} / {result['loop_lag_max_ms']} ms")
+
+def compare(result, baseline, tolerance):
+    """Regressed metrics as printable lines; empty when within tolerance."""
+    regressions = []
+    print(f"\n{'metric':<26}{'baseline':>10}{'now':>10}{'change':>9}")
+    for metric, better in COMPARED.items():
+        old, new = baseline["result"][metric], result[metric]
+        change = (new - old) / abs(old) if old else 0.0
+        worse = change < -tolerance if better == "higher" else change > tolerance
+        # Growth near zero swings by whole percentages; only flag what's big enough to matter
+        if metric == "rss_growth_per_task_kb" and new < 64:
+            worse = False
+        print(f"{metric:<26}{old:>10}{new:>10}{change:>+9.0%}{'  REGRESSED' if worse else ''}")
+        if worse:
+            regressions.append(f"{metric}: {old} -> {new}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenario", default="smoke", help="Baseline name to compare with or save as")
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="Tasks run first and left out of the results")
+    parser.add_argument("--plan-ms", type=float, default=300, help="Stub planner latency")
+    parser.add_argument("--vlm-ms", type=float, default=150, help="Stub VLM latency per verification")
+    parser.add_argument("--review-ms", type=float, default=50, help="Stub security review latency")
+    parser.add_argument("--embed-ms", type=float, default=20, help="Stub embedding latency")
+    parser.add_argument("--vlm-answer", default="YES, the screen matches.", help="What the VLM says to every check")
+    parser.add_argument("--plan-file", help="JSON plan the stub planner returns ({site} is the local site)")
+    parser.add_argument("--task-timeout", type=float, default=120)
+    parser.add_argument("--admission", action="store_true", help="Keep host-saturation admission control on")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    _, site = local_site()
+    has_browser = importlib.util.find_spec("playwright") is not None
+    if args.plan_file:
+        with open(args.plan_file) as f:
+            plan = json.loads(f.read().replace("{site}", site))
+    else:
+        plan = [dict(s, value=s["value"].format(site=site)) for s in BROWSER_PLAN] * has_browser + DESKTOP_PLAN
+    calls = defaultdict(int)
+    _, ollama_url = stub_ollama(args, plan, calls)
+
+    daemon_dir = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="e2e-bench-")) # memory.db, vector_memory.json, logs
+    os.environ.setdefault("REMOTEPILOT_DISPLAY", "fake")
+    os.environ.setdefault("REMOTEPILOT_WARMUP", "0")
+    os.environ["REMOTEPILOT_TASK_LOG"] = os.path.join(os.getcwd(), "tasks.db")
+    sys.path.insert(0, daemon_dir)
+
+    print(f"scenario {args.scenario}: plan of {len(plan)} steps, browser: "
+          f"{'playwright' if has_browser else 'none (playwright not installed, no BROWSE steps)'}")
+    result = asyncio.run(run(args, plan, ollama_url))
+    result["ollama_calls"] = dict(calls)
+    report(result)
+
+    with open(BASELINES) if os.path.exists(BASELINES) else open(os.devnull) as f:
+        baselines = json.loads(f.read() or "{}")
+    params = {k: getattr(args, k) for k in ("tasks", "concurrency", "plan_ms", "vlm_ms", "review_ms", "embed_ms")}
+    if args.save_baseline:
+        baselines[args.scenario] = {"params": params, "host": f"{psutil.cpu_count()} CPU", "result": result}
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved as baseline '{args.scenario}' in {BASELINES}")
+        return
+    baseline = baselines.get(args.scenario)
+    if baseline is None:
+        print(f"\nNo baseline '{args.scenario}' yet (--save-baseline records one)")
+        return
+    if baseline["params"] != params:
+        print(f"\nNote: baseline '{args.scenario}' was recorded with {baseline['params']}")
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"REGRESSED vs '{args.scenario}': " + "; ".join(regressions))
+        sys.exit(1)
+    print(f"Within {args.tolerance:.0%} of baseline '{args.scenario}'")
+
+if __name__ == "__main__":
+    main()
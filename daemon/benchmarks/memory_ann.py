@@ -0,0 +1,61 @@
+"""
+Recall@k vs. latency for the IVF vector index against the exact scan.
+
+Run from the daemon directory:
+    python -m benchmarks.memory_ann --n 200000 --dim 768 --queries 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vector_index import ExactIndex, IVFIndex
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    # Clustered data resembles real embeddings far better than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def timed_search(index, queries, k):
+    results, start = [], time.perf_counter()
+    for q in queries:
+        results.append([i for _, i in index.search(q, k)])
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=500)
+    args = parser.parse_args()
+
+    data = synthetic_vectors(args.n, args.dim, args.clusters)
+    queries = synthetic_vectors(args.queries, args.dim, args.clusters, seed=1)
+
+    exact = ExactIndex()
+    exact.add_batch(data)
+    truth, exact_ms = timed_search(exact, queries, args.k)
+    print(f"exact      n={args.n} dim={args.dim}  {exact_ms:8.3f} ms/query  recall@{args.k}=1.000")
+
+    start = time.perf_counter()
+    ivf = IVFIndex(train_threshold=args.n)
+    ivf.add_batch(data)
+    print(f"ivf train  nlist={len(ivf.centroids)}  {time.perf_counter() - start:.2f} s")
+
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        ivf.nprobe = nprobe
+        found, ivf_ms = timed_search(ivf, queries, args.k)
+        recall = np.mean([len(set(f) & set(t)) / args.k for f, t in zip(found, truth)])
+        print(f"ivf        nprobe={nprobe:<3}      {ivf_ms:8.3f} ms/query  recall@{args.k}={recall:.3f}"
+              f"  speedup={exact_ms / ivf_ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
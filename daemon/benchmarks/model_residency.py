@@ -0,0 +1,76 @@
+"""
+Time a task spends waiting for Ollama to load models, with and without the residency manager.
+
+Scenario: tasks arrive after the models have been unloaded (idle longer
+than keep_alive). Each plans with the text model, then runs --steps
+actions of --action-ms, each verified by the VLM. Ollama is a stub that
+takes --load-ms to load a model and holds --capacity models at once.
+
+  off   fixed keep_alive, models load when a request needs them
+  on    residency keep_alive; the VLM is loaded while the action runs
+
+Run from the daemon directory:
+    python -m benchmarks.model_residency --tasks 3 --load-ms 2000 --action-ms 1500
+"""
+import time
+import asyncio
+import argparse
+
+import ollama_client
+from model_residency import ModelResidency
+from test_model_residency import StubOllama, GB
+
+
+async def run_task(stub, residency, steps, action_s, prefetch):
+    waits, cold = 0.0, 0
+
+    async def call(model):
+        nonlocal waits, cold
+        start = time.perf_counter()
+        response = await ollama_client.ollama_post(f"{stub.url}/api/generate",
+                                                   json={"model": model, "prompt": "..."}, coalesce=False)
+        waits += time.perf_counter() - start
+        cold += response.json().get("load_duration", 0) > 0
+
+    await call("llama3.2")
+    for _ in range(steps):
+        if prefetch:
+            residency.prefetch("llava", stub.url)
+        await asyncio.sleep(action_s)
+        await call("llava")
+    return waits, cold
+
+def measure(args, prefetch, capacity):
+    stub = StubOllama(load_delay=args.load_ms / 1000, capacity=capacity)
+    residency = ModelResidency(available_ram=lambda: capacity * 6 * GB, cold_threshold=0.05)
+    if not prefetch:
+        residency.apply = lambda url, payload: dict(payload, keep_alive=payload.get("keep_alive", "5m"))
+    ollama_client.residency = residency
+    total_wait, total_cold = 0.0, 0
+    try:
+        for _ in range(args.tasks):
+            stub.loaded.clear() # idle past keep_alive: both views expire
+            residency.loaded.clear()
+            waits, cold = asyncio.run(run_task(stub, residency, args.steps, args.action_ms / 1000, prefetch))
+            total_wait += waits
+            total_cold += cold
+    finally:
+        stub.close()
+    return total_wait / args.tasks, total_cold / args.tasks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--steps", type=int, default=3)
+    parser.add_argument("--load-ms", type=float, default=2000)
+    parser.add_argument("--action-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    print(f"{'residency':<11}{'capacity':>9}{'wait s/task':>13}{'cold loads/task':>17}")
+    for capacity in (1, 2):
+        for prefetch in (False, True):
+            wait, cold = measure(args, prefetch, capacity)
+            print(f"{'on' if prefetch else 'off':<11}{capacity:>9}{wait:>13.2f}{cold:>17.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Cost of one observation: page element snapshot (DOM) vs. screenshot for llava (VLM).
+
+For inbox-like pages of increasing size, the DOM column is the time to
+read and format the snapshot and its estimated prompt tokens. The VLM
+column is the time to capture and PNG-encode a 1920x1080 frame plus,
+with --ollama-url, the llava call itself. Pages are loaded in headless
+Chromium when Playwright is installed; otherwise the snapshot is the
+element list SNAPSHOT_JS would return for the same page, so only
+formatting is timed on the DOM side.
+
+Run from the daemon directory:
+    python -m benchmarks.observation_cost --rows 20 200 1000
+    python -m benchmarks.observation_cost --ollama-url http://localhost:11434
+"""
+import io
+import time
+import base64
+import asyncio
+import argparse
+import importlib.util
+import statistics
+
+import numpy as np
+from PIL import Image
+
+from observation import SNAPSHOT_JS, format_snapshot, estimate_tokens, LLAVA_IMAGE_TOKENS
+
+def inbox_html(rows):
+    items = "".join(
+        f'<tr><td><input type="checkbox" aria-label="Select message {i}"></td>'
+        f'<td><a href="/m/{i}">Quarterly report draft {i} - sender{i}@example.com</a></td>'
+        f'<td><button data-testid="archive-{i}">Archive</button></td></tr>' for i in range(rows))
+    return (f'<html><head><title>Inbox ({rows})</title></head><body><h1>Inbox</h1>'
+            f'<input name="q" placeholder="Search mail"><button id="compose">Compose</button>'
+            f'<table>{items}</table></body></html>')
+
+def inbox_snapshot(rows):
+    """What SNAPSHOT_JS returns for inbox_html(rows) in a 1280x720 viewport (~25 rows visible)."""
+    elements = [{"role": "heading", "name": "Inbox", "selector": "h1:has-text(\"Inbox\")", "in_viewport": True},
+                {"role": "textbox", "name": "Search mail", "selector": "input[name=\"q\"]", "type": "",
+                 "value": "", "in_viewport": True},
+                {"role": "button", "name": "Compose", "selector": "#compose", "in_viewport": True}]
+    for i in range(rows):
+        visible = i < 25
+        elements += [
+            {"role": "checkbox", "name": f"Select message {i}", "type": "checkbox", "checked": False,
+             "selector": f"input[aria-label=\"Select message {i}\"]", "in_viewport": visible},
+            {"role": "link", "name": f"Quarterly report draft {i} - sender{i}@example.com",
+             "selector": f"a:has-text(\"Quarterly report draft {i} - sender{i}@exa\")", "in_viewport": visible},
+            {"role": "button", "name": "Archive", "selector": f"button[data-testid=\"archive-{i}\"]",
+             "in_viewport": visible}]
+    return {"url": "http://mail.local/inbox", "title": f"Inbox ({rows})", "elements": elements}
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+async def dom_with_playwright(rows_list, repeat, max_chars):
+    from playwright.async_api import async_playwright
+    results = {}
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        page = await browser.new_page(viewport={"width": 1280, "height": 720})
+        for rows in rows_list:
+            await page.set_content(inbox_html(rows))
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = format_snapshot(await page.evaluate(SNAPSHOT_JS), max_chars)
+                times.append(time.perf_counter() - start)
+            results[rows] = (statistics.median(times) * 1000, text)
+        await browser.close()
+    return results
+
+def vlm_capture():
+    frame = Image.fromarray(np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)[::8, ::8]
+                            .repeat(8, 0).repeat(8, 1)) # blocky, compresses like a UI more than noise does
+    def capture():
+        buffered = io.BytesIO()
+        frame.save(buffered, format="PNG")
+        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+    return capture
+
+def llava_ms(ollama_url, image, repeat):
+    import requests
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        requests.post(f"{ollama_url}/api/generate", json={
+            "model": "llava", "prompt": "Describe the UI elements visible on the screen.",
+            "images": [image], "stream": False}, timeout=300).raise_for_status()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 200, 1000], help="Inbox rows per page")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-chars", type=int, default=4000, help="Snapshot size bound")
+    parser.add_argument("--ollama-url", help="Also time real llava calls")
+    args = parser.parse_args()
+
+    has_browser = importlib.util.find_spec("playwright") is not None
+    if has_browser:
+        dom = asyncio.run(dom_with_playwright(args.rows, args.repeat, args.max_chars))
+    else:
+        dom = {rows: timed(lambda: format_snapshot(inbox_snapshot(rows), args.max_chars), args.repeat)
+               for rows in args.rows}
+    capture_ms, image = timed(vlm_capture(), args.repeat)
+    model_ms = llava_ms(args.ollama_url, image, args.repeat) if args.ollama_url else None
+    vlm_tokens = LLAVA_IMAGE_TOKENS + estimate_tokens("Describe the UI elements visible on the screen.")
+
+    print(f"DOM: {'headless chromium' if has_browser else 'synthetic snapshot (playwright not installed), format only'}; "
+          f"VLM: 1920x1080 PNG {len(image) * 3 // 4 // 1024} KiB"
+          + (f", llava at {args.ollama_url}" if model_ms else ", no model call"))
+    print(f"{'rows':>6}{'elements':>10}{'dom ms':>9}{'dom tokens':>12}{'vlm ms':>10}{'vlm tokens':>12}")
+    for rows in args.rows:
+        ms, text = dom[rows]
+        elements = 3 + 3 * rows
+        vlm_ms = capture_ms + (model_ms or 0)
+        print(f"{rows:>6}{elements:>10}{ms:>9.2f}{estimate_tokens(text):>12}{vlm_ms:>10.1f}{vlm_tokens:>12}")
+
+if __name__ == "__main__":
+    main()
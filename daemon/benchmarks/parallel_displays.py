@@ -0,0 +1,83 @@
+"""
+Desktop-task throughput with N isolated workers on one host. Each worker
+is a process that owns its display (a private Xvfb, or the in-memory fake
+where Xvfb isn't installed) and runs tasks through ActionAgent and
+VisionAgent: click a field, type a line, press Enter, capture the screen
+and PNG-encode it as the vision step would.
+
+Run from the daemon directory:
+    python -m benchmarks.parallel_displays --workers 1 2 4 8 --tasks 20 --backend xvfb
+"""
+import argparse
+import asyncio
+import multiprocessing
+import shutil
+import time
+
+
+def worker(backend, size, tasks, barrier):
+    import io
+    from agents.action import ActionAgent
+    from agents.vision import VisionAgent
+    from display.base import open_display
+
+    display = open_display(backend, size)
+    action, vision = ActionAgent(backend=display), VisionAgent(display=display)
+
+    def look():
+        buf = io.BytesIO()
+        vision.capture().save(buf, format="PNG")
+        return len(buf.getvalue())
+
+    async def run():
+        latencies = []
+        for i in range(tasks):
+            start = time.perf_counter()
+            await action.execute({"action": "CLICK", "value": f"{40 + i} {60 + i}"})
+            await action.execute({"action": "TYPE", "value": f"invoice {i} approved", "mode": "type"})
+            await action.execute({"action": "HOTKEY", "value": "enter"})
+            await asyncio.to_thread(look)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    try:
+        barrier.wait() # Start together so the wall clock covers the overlap only
+        return asyncio.run(run())
+    finally:
+        display.close()
+
+
+def run_fleet(n, args):
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager:
+        barrier = manager.Barrier(n + 1)
+        with ctx.Pool(n) as pool:
+            pending = [pool.apply_async(worker, (args.backend, args.size, args.tasks, barrier)) for _ in range(n)]
+            barrier.wait()
+            start = time.perf_counter()
+            latencies = [lat for p in pending for lat in p.get()]
+            return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--tasks", type=int, default=20, help="Tasks per worker")
+    parser.add_argument("--backend", choices=["xvfb", "fake"],
+                        default="xvfb" if shutil.which("Xvfb") and shutil.which("xdotool") else "fake")
+    parser.add_argument("--size", default="1920x1080")
+    args = parser.parse_args()
+
+    print(f"backend {args.backend}, {args.size}, {args.tasks} tasks per worker, {multiprocessing.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'tasks/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'scaling':>9}")
+    single = None
+    for n in args.workers:
+        elapsed, lat = run_fleet(n, args)
+        rate = n * args.tasks / elapsed
+        single = single or rate / n
+        print(f"{n:>8}{rate:>10.1f}{lat[len(lat) // 2] * 1000:>9.1f}{lat[int(len(lat) * 0.95)] * 1000:>9.1f}"
+              f"{rate / single:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Planner prompt size and prefill time: the old inline prompts vs. PromptBuilder.
+
+Scenario: a goal with two similar plans retrieved from memory, then a
+replan after a browser step failed, with a 600-element page snapshot as
+the screen state. Prints tokens sent per call (estimated) for the old
+prompts and the budgeted ones, with and without the replan continuing the
+plan call's context. With --ollama-url the calls are made for real and
+Ollama's prompt_eval_count and prefill time are reported as well.
+
+Run from the daemon directory:
+    python -m benchmarks.planner_prompt
+    python -m benchmarks.planner_prompt --ollama-url http://localhost:11434 --model llama3.2
+"""
+import json
+import time
+import asyncio
+import argparse
+
+import agents.planner
+from agents.planner import PlannerAgent, SYSTEM_PROMPT
+from observation import format_snapshot
+from prompt_builder import estimate_tokens
+from benchmarks.observation_cost import inbox_snapshot
+
+GOAL = "archive every newsletter in the inbox older than a week"
+HISTORY = [{"goal": f"archive the newsletters from {sender}",
+            "plan": [{"action": "BROWSE", "value": "https://mail.google.com/mail/u/0/#search/from%3A" + sender}] +
+                    [{"action": "CLICK_BROWSER", "selector": f"tr.zA:nth-child({n}) div[role='checkbox']"}
+                     for n in range(1, 7)] +
+                    [{"action": "CLICK_BROWSER", "selector": "div[aria-label='Archive']"}]}
+           for sender in ("news@shop.example", "digest@forum.example")]
+FAILED_STEP = {"action": "CLICK_BROWSER", "selector": "div[aria-label='Archive']"}
+ERROR = ("DOM check failed: Timeout 5000ms exceeded.\n=========================== logs ===========================\n"
+         + "waiting for locator(\"div[aria-label='Archive']\") to be visible\n" * 12)
+SCREEN = format_snapshot(inbox_snapshot(200), max_chars=20000)
+
+def legacy_plan_prompt():
+    # PlannerAgent.execute before the prompt builder
+    history_context = "\nSimilar successful plans from history:\n"
+    for item in HISTORY:
+        history_context += f"- Goal: {item['goal']}\n  Plan: {json.dumps(item['plan'])}\n"
+    return f"""
+You are an expert system automation planner.
+Your job is to convert the User's Goal into a strict JSON LIST of atomic actions.
+{history_context}
+Available Actions:
+- COMMAND: Run a shell command
+- TYPE: Type text
+- HOTKEY: Press key combo
+- CLICK: Click at coordinates
+- WAIT: Wait for seconds
+- BROWSE: Open a website URL
+- CLICK_BROWSER: Click a CSS selector
+
+User Goal: {GOAL}
+
+Output a JSON LIST ONLY.
+"""
+
+def legacy_replan_prompt():
+    return f"""
+RE-PLANNING REQUIRED.
+Original Goal: {GOAL}
+The step {FAILED_STEP} FAILED with error: {ERROR}.
+Current Screen State: {SCREEN}
+
+Generate a NEW plan to achieve the original goal starting from this state.
+Be creative. If one method failed, try a different approach (e.g., instead of a click, use a hotkey).
+
+Output a JSON LIST ONLY.
+"""
+
+class Recorder:
+    """Stands in for Ollama without --ollama-url: records payloads, returns a plausible context."""
+    def __init__(self):
+        self.payloads = []
+
+    async def post(self, url, json=None, **kwargs):
+        self.payloads.append(json)
+        context = [0] * (estimate_tokens(json.get("system", "")) + estimate_tokens(json["prompt"]) + 60
+                         + len(json.get("context", [])))
+
+        class Response:
+            status_code = 200
+            def json(self):
+                return {"response": "[]", "context": context}
+        return Response()
+
+def sent_tokens(payload):
+    return (estimate_tokens(payload.get("system", "")) + estimate_tokens(payload["prompt"]),
+            len(payload.get("context", [])))
+
+async def legacy_call(ollama_url, model, prompt):
+    from ollama_client import ollama_post
+    response = await ollama_post(f"{ollama_url}/api/generate", json={
+        "model": model, "prompt": prompt, "stream": False, "format": "json"}, timeout=300, coalesce=False)
+    result = response.json()
+    return result.get("prompt_eval_count"), result.get("prompt_eval_duration", 0) / 1e6
+
+async def run(args):
+    from memory_store import memory_store
+    async def history(goal):
+        return HISTORY
+    memory_store.retrieve_relevant = history
+    recorder = Recorder()
+    if args.ollama_url:
+        planner = PlannerAgent(args.ollama_url)
+    else:
+        agents.planner.ollama_post = recorder.post
+        planner = PlannerAgent()
+
+    rows = []
+    for name, prompt in (("plan (old)", legacy_plan_prompt()), ("replan (old)", legacy_replan_prompt())):
+        measured = await legacy_call(args.ollama_url, args.model, prompt) if args.ollama_url else (None, None)
+        rows.append((name, estimate_tokens(prompt), 0) + measured)
+
+    replan = {"goal": GOAL, "failed_step": FAILED_STEP, "error": ERROR, "vision_context": SCREEN, "model": args.model}
+    calls = (("plan", planner.execute, {"goal": GOAL, "task_id": "bench", "model": args.model}),
+             ("replan, context", planner.re_plan, dict(replan, task_id="bench")),
+             ("replan, fresh", planner.re_plan, replan),
+             ("plan, repeated", planner.execute, {"goal": GOAL, "model": args.model}))
+    for name, call, task in calls:
+        before = len(recorder.payloads)
+        res = await call(task)
+        if args.ollama_url:
+            usage = res.get("usage", {})
+            rows.append((name, usage.get("estimated_tokens"), None, usage.get("prompt_tokens"), usage.get("prefill_ms")))
+        else:
+            sent, carried = sent_tokens(recorder.payloads[before])
+            rows.append((name, sent, carried, None, None))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--ollama-url", help="Make the calls against a real Ollama")
+    parser.add_argument("--model", default="llama3.2")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+    print(f"system prompt: {estimate_tokens(SYSTEM_PROMPT)} tokens; screen snapshot: {estimate_tokens(SCREEN)} tokens")
+    print(f"{'call':<18}{'sent':>7}{'context':>9}{'evaluated':>11}{'prefill ms':>12}")
+    for name, sent, carried, evaluated, prefill in rows:
+        fmt = lambda v, spec: "-" if v is None else format(v, spec)
+        print(f"{name:<18}{fmt(sent, 'd'):>7}{fmt(carried, 'd'):>9}{fmt(evaluated, 'd'):>11}{fmt(prefill, '.0f'):>12}")
+
+if __name__ == "__main__":
+    main()
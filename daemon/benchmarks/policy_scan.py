@@ -0,0 +1,72 @@
+"""
+Plan screening throughput: the previous per-pattern nested loop vs. the
+combined single-pass PolicyEngine.
+
+Run from the daemon directory:
+    python -m benchmarks.policy_scan --steps 20000
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from policy import PolicyEngine
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy_corpus.json")
+
+LEGACY_DENYLIST = [
+    r"rm\s+-rf", r"del\s+/s", r"format\s+", r"mkfs", r"sudo\s+",
+    r"> /dev/null", r":\(\){ :\|:& };:"
+]
+
+def legacy_scan(plan):
+    for step in plan:
+        val = str(step.get("value", ""))
+        for pattern in LEGACY_DENYLIST:
+            if re.search(pattern, val, re.I):
+                return step
+    return None
+
+def generate_plan(steps: int, allowed, seed: int = 0):
+    rng = random.Random(seed)
+    actions = ["COMMAND", "TYPE", "HOTKEY", "CLICK", "BROWSE"]
+    plan = []
+    for i in range(steps):
+        value = rng.choice(allowed) + " " + "x" * rng.randint(0, 200)
+        plan.append({"action": rng.choice(actions), "value": value})
+    return plan
+
+def bench(fn, plan, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(plan)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(CORPUS_FILE, "r") as f:
+        corpus = json.load(f)
+    engine = PolicyEngine()
+
+    # Worst case for both: every step is clean, so every rule is tried
+    plan = generate_plan(args.steps, corpus["allowed"])
+    legacy_ms = bench(legacy_scan, plan, args.repeat)
+    engine_ms = bench(lambda p: engine.scan_plan(p, "security"), plan, args.repeat)
+    print(f"clean plan, {args.steps} steps")
+    print(f"  legacy nested loop: {legacy_ms:9.2f} ms")
+    print(f"  policy engine:      {engine_ms:9.2f} ms  ({legacy_ms / engine_ms:.1f}x)")
+
+    blocked = sum(1 for c in corpus["blocked"] if engine.scan(c, "security"))
+    legacy_blocked = sum(1 for c in corpus["blocked"] if legacy_scan([{"value": c}]))
+    allowed = sum(1 for c in corpus["allowed"] if not engine.scan(c, "security"))
+    print(f"corpus: engine blocks {blocked}/{len(corpus['blocked'])} (legacy {legacy_blocked}), "
+          f"allows {allowed}/{len(corpus['allowed'])}")
+
+if __name__ == "__main__":
+    main()
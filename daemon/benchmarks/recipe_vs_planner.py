@@ -0,0 +1,174 @@
+"""
+Task latency for a known workflow ("send an email") on a local test mail
+app, run through main.process_task two ways:
+
+  planner   LLM plan + VLM verification of every step (the generic path)
+  recipe    DomainAgent recipe: no planner call, DOM verification
+
+Ollama is a local stub that answers after --plan-ms (planning) or
+--vlm-ms (each screen verification), so the LLM share of the time is
+whatever you measured on your hardware. Browser steps run in headless
+Chromium when Playwright is installed; without it they are skipped and
+only orchestration and model time is measured.
+
+Run from the daemon directory:
+    python -m benchmarks.recipe_vs_planner --tasks 5 --plan-ms 4000 --vlm-ms 2500
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COMPOSE = """<html><body><form method="post" action="/send">
+<input name="to" value="{to}"><input name="su" value="{su}">
+<div aria-label="Message Body">{body}</div><button id="send" type="submit">Send</button>
+</form></body></html>"""
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def mail_app():
+    class Handler(BaseHTTPRequestHandler):
+        def _html(self, html):
+            body = html.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            self._html(COMPOSE.format(to=q.get("to", ""), su=q.get("su", ""), body=q.get("body", "")))
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._html("<html><body><p>Message sent</p></body></html>")
+
+        def log_message(self, *args):
+            pass
+    return serve(Handler)
+
+
+def stub_ollama(app_url, plan_ms, vlm_ms, calls):
+    plan = [{"action": "BROWSE", "value": f"{app_url}/compose?to=bob%40example.com&su=Lunch&body=12%3A30"},
+            {"action": "CLICK_BROWSER", "selector": "#send"}]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path != "/api/generate":
+                self.send_response(404) # embeddings: no memory for this run
+                self.end_headers()
+                return
+            vision = bool(body.get("images"))
+            calls["vlm" if vision else "plan"] += 1
+            time.sleep((vlm_ms if vision else plan_ms) / 1000)
+            reply = json.dumps({"response": "YES, it matches." if vision else json.dumps(plan)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+
+        def log_message(self, *args):
+            pass
+    return serve(Handler)
+
+
+class NoBrowserAction:
+    """Used when Playwright isn't installed: browser steps cost nothing."""
+    name = "Action"
+
+    async def execute(self, step):
+        return {"status": "success", "detail": step["action"]}
+
+    async def check_dom(self, expect):
+        return {"verified": True, "details": "not checked (no browser)"}
+
+
+async def run_tasks(goal, n):
+    import main
+    from task_manager import task_manager
+    latencies, statuses = [], []
+    for _ in range(n):
+        task = task_manager.create_task(goal)
+        start = time.perf_counter()
+        await main.process_task(task.id)
+        latencies.append(time.perf_counter() - start)
+        statuses.append(task.status.value)
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tasks", type=int, default=5)
+    parser.add_argument("--plan-ms", type=float, default=4000, help="Stub LLM planning latency")
+    parser.add_argument("--vlm-ms", type=float, default=2500, help="Stub VLM latency per verification")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="recipe-bench-")
+    os.chdir(workdir) # memory.db and vector files land here
+    calls = {"plan": 0, "vlm": 0}
+    _, app_url = mail_app()
+    _, ollama_url = stub_ollama(app_url, args.plan_ms, args.vlm_ms, calls)
+
+    from coordinator import coordinator
+    from display.fake import FakeDisplay
+    from memory_store import memory_store
+    from recipes import RecipeLibrary
+    from agents.action import ActionAgent
+    from agents.planner import PlannerAgent
+    from agents.specialist import DomainAgent
+    from agents.verifier import VerifierAgent
+    from agents.vision import VisionAgent
+
+    recipes_file = os.path.join(workdir, "recipes.json")
+    with open(recipes_file, "w") as f:
+        json.dump({"recipes": [{
+            "name": "localmail_send", "domain": "localmail",
+            "intents": ["send (?:an )?email to {to} about {subject} saying {body}"],
+            "steps": [
+                {"action": "BROWSE", "value": app_url + "/compose?to={to|url}&su={subject|url}&body={body|url}",
+                 "expect": {"selector": "div[aria-label='Message Body']"}},
+                {"action": "CLICK_BROWSER", "selector": "#send", "expect": {"text": "Message sent"}},
+            ]}]}, f)
+
+    display = FakeDisplay()
+    has_browser = importlib.util.find_spec("playwright") is not None
+    action = ActionAgent(backend=display, headless_browser=True) if has_browser else NoBrowserAction()
+    vision = VisionAgent(ollama_url, display=display)
+    coordinator.planner = PlannerAgent(ollama_url)
+    coordinator.action = action
+    coordinator.vision = vision
+    coordinator.verifier = VerifierAgent(vision, dom_check=action.check_dom)
+    memory_store.ollama_url = ollama_url
+
+    goal = "send an email to bob@example.com about Lunch saying 12:30"
+    print(f"{args.tasks} tasks per path, plan {args.plan_ms:.0f} ms, VLM {args.vlm_ms:.0f} ms, "
+          f"browser: {'headless chromium' if has_browser else 'none (playwright not installed)'}")
+    print(f"{'path':<9}{'mean s':>9}{'p50 s':>8}{'plan calls':>12}{'VLM calls':>11}  status")
+    results = {}
+    for path, library in (("planner", RecipeLibrary(os.devnull)), ("recipe", RecipeLibrary(recipes_file))):
+        coordinator.domain = DomainAgent(library=library, history_db=os.path.join(workdir, "none.db"))
+        before = dict(calls)
+        latencies, statuses = asyncio.run(run_tasks(goal, args.tasks))
+        mean = sum(latencies) / len(latencies)
+        results[path] = mean
+        print(f"{path:<9}{mean:>9.2f}{sorted(latencies)[len(latencies) // 2]:>8.2f}"
+              f"{calls['plan'] - before['plan']:>12}{calls['vlm'] - before['vlm']:>11}  {','.join(sorted(set(statuses)))}")
+    print(f"recipe speedup: {results['planner'] / results['recipe']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Per-command cost of the remote-control transports over a high-latency link.
+A local TCP proxy delays each direction by half the RTT, emulating a
+Cloudflare tunnel. The same stub handler sits behind every transport:
+
+  http      one POST /execute per command (keep-alive, the best case for it)
+  ws-step   /ws/rpc, waiting for each reply before sending the next request
+  ws-pipe   /ws/rpc, all requests sent up front, replies matched by id
+  batch     one POST /execute/batch, results streamed back as NDJSON
+
+Run from the daemon directory:
+    python -m benchmarks.remote_rtt --rtt-ms 150 --commands 20
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import httpx
+import uvicorn
+import websockets
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import List
+
+import rpc
+
+
+def build_app(work_ms):
+    async def handler(command):
+        await asyncio.sleep(work_ms / 1000)
+        return {"status": "success", "echo": command}
+
+    class ExecuteRequest(BaseModel):
+        command: str
+
+    class BatchExecuteRequest(BaseModel):
+        commands: List[str]
+        parallel: bool = False
+
+    app = FastAPI()
+
+    @app.post("/execute")
+    async def execute(req: ExecuteRequest):
+        return await handler(req.command)
+
+    @app.post("/execute/batch")
+    async def execute_batch(req: BatchExecuteRequest):
+        return StreamingResponse(rpc.ndjson_results(handler, req.commands, req.parallel),
+                                 media_type="application/x-ndjson")
+
+    @app.websocket("/ws/rpc")
+    async def ws_rpc(websocket: WebSocket):
+        await rpc.serve_websocket(websocket, handler)
+
+    return app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def start_latency_proxy(listen_port, target_port, one_way):
+    async def pipe(reader, writer):
+        # Deliver each chunk `one_way` seconds after it was read, in order
+        queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    writer.close()
+                    return
+                await asyncio.sleep(max(0, due - time.monotonic()))
+                writer.write(data)
+                await writer.drain()
+
+        sender = asyncio.create_task(deliver())
+        while True:
+            data = await reader.read(65536)
+            queue.put_nowait((time.monotonic() + one_way, data or None))
+            if not data:
+                break
+        await sender
+
+    async def handle(client_reader, client_writer):
+        try:
+            server_reader, server_writer = await asyncio.open_connection("127.0.0.1", target_port)
+            await asyncio.gather(pipe(client_reader, server_writer), pipe(server_reader, client_writer),
+                                 return_exceptions=True)
+        except asyncio.CancelledError:
+            pass # Connections still open when the benchmark exits
+
+    return await asyncio.start_server(handle, "127.0.0.1", listen_port)
+
+
+async def run_http(base, commands):
+    async with httpx.AsyncClient(base_url=base) as client:
+        await client.get("/docs") # open the keep-alive connection outside the timing
+        start = time.perf_counter()
+        for c in commands:
+            (await client.post("/execute", json={"command": c})).raise_for_status()
+        return time.perf_counter() - start
+
+
+async def run_batch(base, commands):
+    async with httpx.AsyncClient(base_url=base) as client:
+        await client.get("/docs")
+        start = time.perf_counter()
+        received = 0
+        async with client.stream("POST", "/execute/batch", json={"commands": commands}) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    received += 1
+        assert received == len(commands)
+        return time.perf_counter() - start
+
+
+async def run_ws(url, commands, pipelined):
+    async with websockets.connect(url) as ws:
+        start = time.perf_counter()
+        if pipelined:
+            for i, c in enumerate(commands):
+                await ws.send(json.dumps({"id": i, "command": c}))
+            replies = {json.loads(await ws.recv())["id"] for _ in commands}
+            assert replies == set(range(len(commands)))
+        else:
+            for i, c in enumerate(commands):
+                await ws.send(json.dumps({"id": i, "command": c}))
+                assert json.loads(await ws.recv())["id"] == i
+        return time.perf_counter() - start
+
+
+async def main_async(args):
+    server_port, proxy_port = free_port(), free_port()
+    server = start_server(build_app(args.work_ms), server_port)
+    proxy = await start_latency_proxy(proxy_port, server_port, args.rtt_ms / 2000)
+    base, ws_url = f"http://127.0.0.1:{proxy_port}", f"ws://127.0.0.1:{proxy_port}/ws/rpc"
+    commands = [f"list models {i}" for i in range(args.commands)]
+
+    print(f"{args.commands} commands, RTT {args.rtt_ms:.0f} ms, handler {args.work_ms:.0f} ms")
+    print(f"{'transport':<10}{'total ms':>10}{'ms/cmd':>10}{'speedup':>10}")
+    baseline = None
+    for name, run in (("http", lambda: run_http(base, commands)),
+                      ("ws-step", lambda: run_ws(ws_url, commands, False)),
+                      ("ws-pipe", lambda: run_ws(ws_url, commands, True)),
+                      ("batch", lambda: run_batch(base, commands))):
+        elapsed = min([await run() for _ in range(args.repeats)])
+        baseline = baseline or elapsed
+        print(f"{name:<10}{elapsed * 1000:>10.0f}{elapsed * 1000 / len(commands):>10.1f}{baseline / elapsed:>9.1f}x")
+
+    proxy.close()
+    server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rtt-ms", type=float, default=150)
+    parser.add_argument("--commands", type=int, default=20)
+    parser.add_argument("--work-ms", type=float, default=2, help="Simulated handler time per command")
+    parser.add_argument("--repeats", type=int, default=3)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+End-to-end ResearchAgent latency for 10-50 pages against a stubbed model.
+Model latency is simulated as a fixed overhead plus per-token prefill cost.
+
+Run from the daemon directory:
+    python -m benchmarks.research_mapreduce --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from agents.specialist import ResearchAgent, estimate_tokens
+
+
+class StubResearchAgent(ResearchAgent):
+    def __init__(self, base_latency, per_token, **kwargs):
+        super().__init__(**kwargs)
+        self.base_latency = base_latency
+        self.per_token = per_token
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def _generate(self, prompt, json_format=False):
+        async with self._semaphore:
+            self.calls += 1
+            tokens = estimate_tokens(prompt)
+            self.prompt_tokens += tokens
+            await asyncio.sleep(self.base_latency + tokens * self.per_token)
+        if json_format:
+            return json.dumps({"summary": "stub", "key_findings": []})
+        return "stub summary " * 40
+
+
+def make_pages(count, chars=5000, seed=0):
+    rng = random.Random(seed)
+    words = ["model", "latency", "token", "release", "benchmark", "agent", "desktop", "vision"]
+    return [" ".join(rng.choice(words) for _ in range(chars // 7))[:chars] for _ in range(count)]
+
+
+async def run(args):
+    print(f"{'pages':>5} {'cold s':>8} {'warm s':>8} {'calls':>6} {'prompt tok':>11}  coverage(legacy)")
+    for count in (10, 20, 30, 40, 50):
+        pages = make_pages(count)
+        agent = StubResearchAgent(args.base_latency, args.per_token, max_concurrency=args.concurrency)
+
+        start = time.perf_counter()
+        res = await agent.execute({"topic": "bench", "pages": pages})
+        cold = time.perf_counter() - start
+        calls, tokens = agent.calls, agent.prompt_tokens
+        assert res["status"] == "success", res
+
+        start = time.perf_counter()
+        await agent.execute({"topic": "bench", "pages": pages})
+        warm = time.perf_counter() - start
+
+        # The previous implementation only ever saw the first 8000 characters
+        legacy_coverage = min(1.0, 8000 / sum(len(p) for p in pages))
+        print(f"{count:>5} {cold:>8.2f} {warm:>8.2f} {calls:>6} {tokens:>11}  100% ({legacy_coverage:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-latency", type=float, default=0.05, help="seconds per model call")
+    parser.add_argument("--per-token", type=float, default=0.00005, help="seconds per prompt token")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Bytes and encode time per frame for the /ws/screen tile-diff encoder against
+sending a full JPEG every frame, on synthetic 1080p desktop sequences:
+
+  idle      nothing changes
+  typing    a few characters appear in an editor each frame
+  scroll    a window's content scrolls by 24px each frame
+  video     a 640x360 region plays noisy video
+
+Run from the daemon directory:
+    python -m benchmarks.screen_stream --frames 30 --quality 70
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+from screen_stream import TileEncoder, pack_frame
+
+W, H = 1920, 1080
+
+
+def desktop(rng):
+    frame = np.empty((H, W, 3), np.uint8)
+    frame[:] = np.linspace(40, 90, W, dtype=np.uint8)[None, :, None] # wallpaper gradient
+    frame[:40] = 30 # taskbar
+    frame[100:900, 200:1400] = 245 # editor window
+    # "Text": short dark strokes on the editor lines
+    for y in range(120, 880, 20):
+        for x in rng.integers(220, 1360, size=30):
+            frame[y:y + 10, x:x + rng.integers(3, 12)] = 20
+    return frame
+
+
+def sequence(kind, frames, rng):
+    frame = desktop(rng)
+    yield frame
+    cursor = 220
+    for _ in range(frames - 1):
+        frame = frame.copy()
+        if kind == "typing":
+            for _ in range(3):
+                frame[880:890, cursor:cursor + 6] = 20
+                cursor += 9
+        elif kind == "scroll":
+            frame[100:876, 200:1400] = frame[124:900, 200:1400]
+            frame[876:900, 200:1400] = 245
+            frame[880:890, 220 + rng.integers(0, 1100):][:, :8] = 20
+        elif kind == "video":
+            base = np.linspace(0, 255, 640, dtype=np.uint8)[None, :, None]
+            noise = rng.integers(0, 40, size=(360, 640, 3), dtype=np.uint8)
+            frame[500:860, 1250:1890] = base + noise
+        yield frame
+
+
+def full_jpeg(frame, quality):
+    buf = io.BytesIO()
+    Image.fromarray(frame).save(buf, format="JPEG", quality=quality)
+    return len(buf.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--quality", type=int, default=70)
+    parser.add_argument("--tile", type=int, default=64)
+    parser.add_argument("--format", default="jpeg", choices=["jpeg", "webp"])
+    parser.add_argument("--link-mbps", type=float, default=2.0, help="Link speed used for the max-fps column")
+    args = parser.parse_args()
+
+    print(f"1920x1080, {args.frames} frames, quality {args.quality}, tile {args.tile}, {args.format}")
+    print(f"{'sequence':<9}{'full KiB/f':>11}{'full ms/f':>10}{'tiles KiB/f':>12}{'tiles ms/f':>11}"
+          f"{'ratio':>7}{'fps@link':>9}")
+    for kind in ("idle", "typing", "scroll", "video"):
+        rng = np.random.default_rng(0)
+        frames = list(sequence(kind, args.frames, rng))
+
+        start = time.perf_counter()
+        full = sum(full_jpeg(f, args.quality) for f in frames[1:])
+        full_ms = (time.perf_counter() - start) * 1000 / (len(frames) - 1)
+
+        encoder = TileEncoder(args.tile, args.format)
+        encoder.encode(frames[0], args.quality) # keyframe, as the stream would send first
+        start = time.perf_counter()
+        tiled = 0
+        for f in frames[1:]:
+            header, payload = encoder.encode(f, args.quality)
+            tiled += len(pack_frame(header, payload)) if header["rects"] else 0
+        tiled_ms = (time.perf_counter() - start) * 1000 / (len(frames) - 1)
+
+        n = len(frames) - 1
+        per_frame = tiled / n
+        link_fps = (args.link_mbps * 1e6 / 8) / per_frame if per_frame else float("inf")
+        ratio = f"{full / tiled:.0f}x" if tiled else "-"
+        print(f"{kind:<9}{full / n / 1024:>11.1f}{full_ms:>10.1f}{per_frame / 1024:>12.1f}{tiled_ms:>11.1f}"
+              f"{ratio:>7}{min(link_fps, 999):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Daemon import cost from `python -X importtime`: the cumulative time to
+import each target module in a fresh interpreter and the slowest modules
+underneath it. Exits non-zero when `main` goes over the budget, so it can
+gate CI.
+
+  main          everything uvicorn imports before it can bind the port
+  coordinator   the agent registry; should not pull in any agent module
+
+Run from the daemon directory:
+    python -m benchmarks.startup --budget-ms 800 --top 15
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def importtime(module):
+    """[(module, self_us, cumulative_us, depth)] for a cold `import module`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def report(module, top):
+    rows = importtime(module)
+    total = next(cum for name, _, cum, _ in rows if name == module)
+    print(f"import {module}: {total / 1000:.0f} ms cumulative")
+    # Direct-ish children are more useful than leaf modules: show the top
+    # level packages by cumulative time
+    packages = {}
+    for name, _, cum, depth in rows:
+        if depth <= 1 and name != module:
+            root = name.split(".")[0]
+            packages[root] = max(packages.get(root, 0), cum)
+    for name, cum in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {name:<32}{cum / 1000:>8.1f} ms")
+    return total / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--budget-ms", type=float, default=800, help="Budget for `import main`")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--modules", nargs="+", default=["coordinator", "main"])
+    args = parser.parse_args()
+
+    totals = {m: report(m, args.top) for m in args.modules}
+    if "main" in totals:
+        verdict = "OK" if totals["main"] <= args.budget_ms else "OVER BUDGET"
+        print(f"main: {totals['main']:.0f} ms / {args.budget_ms:.0f} ms budget: {verdict}")
+        if totals["main"] > args.budget_ms:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Bytes sent to the UI while it follows a 500-step task. The client polls
+/task/state twice per step: once after the step ran, and once more with
+nothing new (typical of a fixed poll interval). It also receives every
+/ws/logs event. Response bodies only; HTTP headers are ignored.
+
+Run from the daemon directory:
+    python -m benchmarks.state_bytes --steps 500
+"""
+import argparse
+import gzip
+import zlib
+
+import wire
+from task_manager import Task, TaskStatus
+
+GZIP_MIN_SIZE = 1024 # matches the GZipMiddleware setting in main.py
+
+
+def http_body(payload, use_gzip, use_msgpack=False):
+    body = wire.encode(payload, use_msgpack)
+    body = body if isinstance(body, bytes) else body.encode()
+    if use_gzip and len(body) >= GZIP_MIN_SIZE:
+        return len(gzip.compress(body, 9))
+    return len(body)
+
+
+def simulate(steps):
+    task = Task("Research the top 500 items and record each one")
+    task.plan = [{"action": "BROWSE", "value": f"https://example.com/item/{i}"} for i in range(steps)]
+    task.add_log("Planner", f"Generated & Secured {steps} steps.")
+    events = [] # what /ws/logs would push
+    polls = [] # (full state, delta state, changed?) per poll
+
+    last_seq = 0
+    for i in range(steps):
+        for status in (TaskStatus.ACT, TaskStatus.VERIFY):
+            task.status = status
+            task.touch()
+            events.append({"task_id": task.id, "type": "state", "data": {"status": status.value}})
+        log = task.add_log("Action", f"Step {i + 1}: Navigated to https://example.com/item/{i}")
+        events.append({"task_id": task.id, "type": "log", "data": log})
+
+        polls.append((task.state(), task.state(last_seq), True))
+        last_seq = task.seq
+        polls.append((task.state(), task.state(last_seq), False)) # nothing new since
+    return task, events, polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--steps", type=int, default=500)
+    args = parser.parse_args()
+
+    task, events, polls = simulate(args.steps)
+    rows = [
+        ("poll: full JSON (before)", sum(http_body(full, False) for full, _, _ in polls)),
+        ("poll: full + gzip", sum(http_body(full, True) for full, _, _ in polls)),
+        ("poll: full + gzip + ETag", sum(http_body(full, True) for full, _, changed in polls if changed)),
+        ("poll: since_seq delta", sum(http_body(delta, False) for _, delta, _ in polls)),
+        ("poll: delta + gzip + ETag", sum(http_body(delta, True) for _, delta, changed in polls if changed)),
+    ]
+    if wire.msgpack is not None:
+        rows.append(("poll: delta + msgpack + ETag",
+                     sum(http_body(delta, False, True) for _, delta, changed in polls if changed)))
+
+    frames = [wire.encode(e).encode() for e in events]
+    # permessage-deflate with context takeover: one compressor for the connection,
+    # each message sync-flushed and the 4-byte 00 00 ff ff trailer stripped
+    deflate = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated = sum(len(deflate.compress(f) + deflate.flush(zlib.Z_SYNC_FLUSH)) - 4 for f in frames)
+    rows += [("ws: JSON frames (before)", sum(len(f) for f in frames)),
+             ("ws: permessage-deflate", deflated)]
+    if wire.msgpack is not None:
+        rows.append(("ws: msgpack frames", sum(len(wire.encode(e, True)) for e in events)))
+
+    print(f"{args.steps} steps, {len(polls)} polls, {len(events)} WebSocket events")
+    baseline = {"poll": rows[0][1], "ws": next(b for n, b in rows if n.startswith("ws"))}
+    for name, total in rows:
+        base = baseline[name.split(":")[0]]
+        print(f"{name:<30}{total / 1024:>12.1f} KiB{base / max(total, 1):>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-step wall-clock of process_task's execution loop: serial act -> verify vs. the StepPipeline.
+
+Agents are stubs around a fake display whose windows take --paint-ms to
+repaint after a click: the VLM answers after --vlm-ms, the browser takes
+--browser-ms to launch, memory and planning return at once. The plan mixes
+desktop steps, the WAITs a planner typically adds, and browser steps.
+Step times come from the task's trace ("step N" spans).
+
+Run from the daemon directory:
+    python -m benchmarks.step_pipeline --vlm-ms 1500 --paint-ms 400 --browser-ms 1200
+"""
+import os
+import asyncio
+import argparse
+import tempfile
+
+import agents.vision
+from agents.action import ActionAgent
+from observation import is_browser_step
+
+PLAN = [
+    {"action": "CLICK", "value": "50 50"}, # opens a window
+    {"action": "WAIT", "value": "3"},
+    {"action": "TYPE", "value": "quarterly report", "mode": "type"},
+    {"action": "HOTKEY", "value": "enter"},
+    {"action": "WAIT", "value": "2"},
+    {"action": "BROWSE", "value": "http://intranet.local/reports"},
+    {"action": "CLICK_BROWSER", "selector": "#upload"},
+]
+
+class StubBrowserAction(ActionAgent):
+    """Native input on the fake display; browser steps only pay the browser launch."""
+    def __init__(self, backend, browser_ms):
+        super().__init__(backend=backend)
+        self.browser_ms = browser_ms
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if not self.browser:
+                await asyncio.sleep(self.browser_ms / 1000)
+                self.browser = self.context = self.page = object()
+
+    async def execute(self, task):
+        if is_browser_step(task):
+            await self._ensure_browser()
+            return {"status": "success", "detail": f"{task['action']} (stub page)"}
+        return await super().execute(task)
+
+async def run_task(args, pipelined):
+    import main
+    from coordinator import coordinator
+    from task_manager import task_manager
+    from tracing import tracer
+    from agents.verifier import VerifierAgent
+    from agents.vision import VisionAgent
+    from test_pipeline import SlowApp
+
+    class Planner:
+        name = "Planner"
+        async def execute(self, task):
+            return {"status": "success", "plan": [dict(step) for step in PLAN]}
+
+    class Memory:
+        name = "Memory"
+        async def execute(self, task):
+            return {"status": "success"}
+
+    async def vlm(url, json=None, **kwargs):
+        await asyncio.sleep(args.vlm_ms / 1000)
+        class Response:
+            status_code = 200
+            def json(self):
+                return {"response": "YES"}
+        return Response()
+
+    app = SlowApp(paint_ms=args.paint_ms)
+    vision = VisionAgent("http://127.0.0.1:9", display=app)
+    for agent in (Planner(), Memory(), StubBrowserAction(app, args.browser_ms), vision, VerifierAgent(vision)):
+        coordinator.agents._agents[agent.name] = agent
+    agents.vision.ollama_post = vlm
+    os.environ["REMOTEPILOT_PIPELINE"] = "1" if pipelined else "0"
+
+    task = task_manager.create_task("file the quarterly report")
+    tracer.sample_rate = 1.0
+    await main.process_task(task.id)
+    steps = [s for s in tracer.get_trace(task.id).spans if s.category == "step"]
+    return task.status.value, [(s.end_ns - s.start_ns) / 1e9 for s in steps]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--vlm-ms", type=float, default=1500, help="Stub VLM latency per verification")
+    parser.add_argument("--paint-ms", type=float, default=400, help="Repaint time after a click")
+    parser.add_argument("--browser-ms", type=float, default=1200, help="Browser launch time")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="pipeline-bench-")) # memory.db and logs land here
+    from memory_store import memory_store
+    async def no_memory(goal, plan):
+        pass
+    memory_store.add_interaction = no_memory
+
+    results = {mode: asyncio.run(run_task(args, mode == "pipelined")) for mode in ("serial", "pipelined")}
+    print(f"VLM {args.vlm_ms:.0f} ms, repaint {args.paint_ms:.0f} ms, browser launch {args.browser_ms:.0f} ms")
+    print(f"{'step':<32}{'serial s':>10}{'pipelined s':>13}")
+    for step, serial, pipelined in zip(PLAN, results["serial"][1], results["pipelined"][1]):
+        name = f"{step['action']} {step.get('value') or step.get('selector')}"[:30]
+        print(f"{name:<32}{serial:>10.2f}{pipelined:>13.2f}")
+    totals = {mode: sum(times) for mode, (_, times) in results.items()}
+    print(f"{'total':<32}{totals['serial']:>10.2f}{totals['pipelined']:>13.2f}"
+          f"   status: {results['serial'][0]}, {results['pipelined'][0]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Task event log write throughput: group commit vs. one fsync per event.
+
+Simulates --tasks concurrent tasks, each appending --events events (state
+changes, logs, step markers) about the size the daemon writes. For the
+group-committed TaskEventLog, each task also awaits flush() every
+--flush-every events (as /task/submit does) to show the cost of waiting
+for durability. The baseline commits every event on its own, with the
+same WAL + synchronous=FULL settings.
+
+Run from the daemon directory:
+    python -m benchmarks.task_log_throughput --tasks 50 --events 200
+"""
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import tempfile
+
+import task_log
+from task_log import TaskEventLog
+
+def event(i):
+    if i % 10 == 0:
+        return "state", {"status": "ACT"}
+    if i % 10 == 5:
+        return "step", {"next": i // 10}
+    return "log", {"timestamp": "2026-01-01T12:00:00.000000", "agent": "Action",
+                   "message": f"Step {i}: Clicked browser element: button[data-testid=\"archive-{i}\"]",
+                   "level": "INFO"}
+
+def per_event_commit(path, tasks, events):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL, "
+                 "seq INTEGER NOT NULL, type TEXT NOT NULL, data TEXT NOT NULL, ts REAL NOT NULL)")
+    start = time.perf_counter()
+    for i in range(events): # interleaved, like concurrent tasks
+        for t in range(tasks):
+            type_, data = event(i)
+            with conn:
+                conn.execute("INSERT INTO events (task_id, seq, type, data, ts) VALUES (?, ?, ?, ?, ?)",
+                             (f"task-{t}", i, type_, json.dumps(data), time.time()))
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed, tasks * events
+
+async def group_commit(path, tasks, events, flush_every):
+    log = TaskEventLog(path)
+    commits_before = task_log.EVENT_BATCH._series.get((), [0])[-1]
+
+    async def task(t):
+        for i in range(events):
+            type_, data = event(i)
+            log.append(f"task-{t}", i, type_, data)
+            if flush_every and (i + 1) % flush_every == 0:
+                await log.flush()
+            elif i % 8 == 0:
+                await asyncio.sleep(0) # other tasks get to run, as between real steps
+
+    start = time.perf_counter()
+    await asyncio.gather(*(task(t) for t in range(tasks)))
+    await log.flush()
+    elapsed = time.perf_counter() - start
+    log.close()
+    return elapsed, task_log.EVENT_BATCH._series[()][-1] - commits_before
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tasks", type=int, default=50)
+    parser.add_argument("--events", type=int, default=200, help="Events per task")
+    parser.add_argument("--flush-every", type=int, default=50, help="Events between awaited flushes (0: never)")
+    parser.add_argument("--dir", default=None, help="Where to put the databases (default: a temp dir)")
+    args = parser.parse_args()
+
+    total = args.tasks * args.events
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        base_s, commits = per_event_commit(os.path.join(tmp, "baseline.db"), args.tasks, args.events)
+        print(f"{total} events from {args.tasks} tasks")
+        print(f"{'mode':<22}{'seconds':>9}{'events/s':>11}{'commits':>9}{'events/commit':>15}")
+        print(f"{'commit per event':<22}{base_s:>9.2f}{total / base_s:>11.0f}{commits:>9}{1:>15.1f}")
+        for flush_every in sorted({0, args.flush_every}):
+            path = os.path.join(tmp, f"group-{flush_every}.db")
+            elapsed, commits = asyncio.run(group_commit(path, args.tasks, args.events, flush_every))
+            mode = f"group, flush/{flush_every}" if flush_every else "group commit"
+            print(f"{mode:<22}{elapsed:>9.2f}{total / elapsed:>11.0f}{commits:>9}{total / commits:>15.1f}")
+
+if __name__ == "__main__":
+    main()
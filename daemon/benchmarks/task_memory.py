@@ -0,0 +1,93 @@
+"""
+Heap held by task logs: dict-per-line tasks (the old layout) vs. slotted Tasks with columnar LogBuffers.
+
+Builds --tasks tasks of --logs lines each, the agent mix and message shapes
+of a real run, and measures what stays allocated with tracemalloc. Messages
+are the same strings in both layouts; the difference is everything around
+them.
+
+Run from the daemon directory:
+    python -m benchmarks.task_memory --tasks 10000 --logs 200
+"""
+import gc
+import time
+import uuid
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from task_manager import Task, TaskStatus
+
+LINES = [
+    ("Planner", "Generated & Secured {n} steps.", "INFO"),
+    ("Action", "Step {n}: Clicked at ({n}, 240)", "INFO"),
+    ("Action", "Step {n}: Typed 'quarterly report {n}'", "INFO"),
+    ("Monitor", "Verification FAILED. Triggering Re-Plan (Attempt {n}).", "WARNING"),
+    ("Research", "Collected {n} sources for the summary.", "INFO"),
+]
+
+class DictTask:
+    """The Task layout this replaced: a __dict__, a dict and an ISO string per log line."""
+    def __init__(self, goal):
+        self.id = str(uuid.uuid4())
+        self.goal = goal
+        self.idempotency_key = None
+        self.remote = False
+        self.next_step = 0
+        self.journal = None
+        self.status = TaskStatus.IDLE
+        self.logs = []
+        self.created_at = datetime.now().isoformat()
+        self.phase_started_at = time.monotonic()
+        self.seq = 0
+        self._log_seqs = []
+        self.plan_seq = 0
+        self._plan = []
+        self.error = None
+
+    def add_log(self, agent, message, level="INFO"):
+        self.logs.append({"timestamp": datetime.now().isoformat(), "agent": agent,
+                          "message": message, "level": level})
+        self.seq += 1
+        self._log_seqs.append(self.seq)
+
+def build(cls, tasks, logs):
+    held = []
+    for t in range(tasks):
+        task = cls(f"Research item {t} and file the report")
+        for i in range(logs):
+            agent, message, level = LINES[i % len(LINES)]
+            task.add_log(agent, message.format(n=i), level)
+        held.append(task)
+    return held
+
+def measure(cls, tasks, logs):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    held = build(cls, tasks, logs)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return current, peak, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--tasks", type=int, default=10000, help="Tasks kept in memory")
+    parser.add_argument("--logs", type=int, default=200, help="Log lines per task")
+    args = parser.parse_args()
+
+    lines = args.tasks * args.logs
+    print(f"{args.tasks} tasks x {args.logs} log lines")
+    print(f"{'layout':<24}{'held MiB':>10}{'peak MiB':>10}{'B/line':>8}{'build s':>9}")
+    results = {}
+    for name, cls in (("dicts (before)", DictTask), ("slots + columns", Task)):
+        current, peak, elapsed = results[name] = measure(cls, args.tasks, args.logs)
+        print(f"{name:<24}{current / 2**20:>10.1f}{peak / 2**20:>10.1f}{current / lines:>8.0f}{elapsed:>9.1f}")
+    before, after = results["dicts (before)"][0], results["slots + columns"][0]
+    print(f"{before / after:.1f}x less memory held")
+
+if __name__ == "__main__":
+    main()
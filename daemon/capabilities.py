@@ -0,0 +1,17 @@
+from typing import Any, Dict, List, Set
+
+# What each plan action needs from the machine that runs it. Shared by the
+# fleet dispatcher (which worker can take a plan) and observation (which
+# steps look at the page rather than the screen), so neither imports the other.
+
+CAPABILITIES = ("desktop", "browser", "shell")
+# Plan action -> capability a worker needs to run it
+ACTION_CAPABILITIES = {
+    "CLICK": "desktop", "TYPE": "desktop", "HOTKEY": "desktop",
+    "BROWSE": "browser", "CLICK_BROWSER": "browser", "FILL_BROWSER": "browser",
+    "COMMAND": "shell",
+}
+
+def required_capabilities(plan: List[Dict[str, Any]]) -> Set[str]:
+    return {ACTION_CAPABILITIES[a] for a in (str(s.get("action", "")).upper() for s in plan)
+            if a in ACTION_CAPABILITIES}
@@ -1,52 +1,129 @@
-from typing import Dict, Any
+import importlib
+import threading
+from typing import Dict, Any, Callable, Iterable
 from agents.base import Agent
-from agents.router import ModelRouterAgent
-from agents.planner import PlannerAgent
-from agents.vision import VisionAgent
-from agents.action import ActionAgent
-from agents.security import SecurityAgent
-from agents.verifier import VerifierAgent
-from agents.specialist import ResearchAgent, DomainAgent
-from agents.monitor import MonitorAgent
-from agents.memory import MemoryAgent
-from agents.scheduler import SchedulerAgent
 from sandbox.local import ProcessSandbox
 from logger import audit_logger
 
+# Registry name -> (module, class). Agents are imported and built on first
+# use, so importing the coordinator (and binding the port) doesn't wait on
+# pyautogui, PIL, SQLite and friends.
+AGENT_CLASSES = {
+    "ModelRouter": ("agents.router", "ModelRouterAgent"),
+    "Planner": ("agents.planner", "PlannerAgent"),
+    "Action": ("agents.action", "ActionAgent"),
+    "Vision": ("agents.vision", "VisionAgent"),
+    "Security": ("agents.security", "SecurityAgent"),
+    "Safety": ("agents.safety", "SafetyAgent"),
+    "Verifier": ("agents.verifier", "VerifierAgent"),
+    "Monitor": ("agents.monitor", "MonitorAgent"),
+    "Memory": ("agents.memory", "MemoryAgent"),
+    "Research": ("agents.specialist", "ResearchAgent"),
+    "Domain": ("agents.specialist", "DomainAgent"),
+}
+
+def _load_class(name: str):
+    module, cls = AGENT_CLASSES[name]
+    return getattr(importlib.import_module(module), cls)
+
+class AgentRegistry:
+    """Agents by name; registered factories run on the first lookup."""
+    def __init__(self):
+        self._agents: Dict[str, Agent] = {}
+        self._factories: Dict[str, Callable[[], Agent]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def register_factory(self, name: str, factory: Callable[[], Agent]):
+        self._factories[name] = factory
+
+    def add(self, agent: Agent, name: str = None):
+        self._agents[name or agent.name] = agent
+
+    def get(self, name: str) -> Agent:
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        # Per-name lock: warm-up may be building another agent on a thread
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._agents:
+                self._agents[name] = self._factories[name]()
+                print(f"[Coordinator] Initialized agent: {name}")
+            return self._agents[name]
+
+    __getitem__ = get
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._agents or name in self._factories
+
+    def __iter__(self):
+        return iter(sorted(set(self._agents) | set(self._factories)))
+
+    def loaded(self) -> Iterable[str]:
+        return list(self._agents)
+
+def _agent(name: str):
+    return property(lambda self: self.agents.get(name),
+                    lambda self, agent: self.agents.add(agent, name))
+
 class Coordinator:
+    router = _agent("ModelRouter")
+    planner = _agent("Planner")
+    action = _agent("Action")
+    vision = _agent("Vision")
+    security = _agent("Security")
+    safety = _agent("Safety")
+    verifier = _agent("Verifier")
+    monitor = _agent("Monitor")
+    memory = _agent("Memory")
+    research = _agent("Research")
+    domain = _agent("Domain")
+    scheduler = _agent("Scheduler") # Factory registered by main.py at startup
+
     def __init__(self):
-        self.agents: Dict[str, Agent] = {}
-        self.router = ModelRouterAgent()
-        self.planner = PlannerAgent()
-        self.action = ActionAgent()
-        self.vision = VisionAgent()
-        self.security = SecurityAgent()
-        self.verifier = VerifierAgent()
-        self.monitor = MonitorAgent()
-        self.memory = MemoryAgent()
-        self.research = ResearchAgent()
-        self.domain = DomainAgent()
-        self.scheduler = None # Will be set by main.py
-        self.sandbox = ProcessSandbox()
-        
+        self.agents = AgentRegistry()
+        for name in AGENT_CLASSES:
+            self.agents.register_factory(name, lambda name=name: _load_class(name)())
         # Wire dependencies
-        self.verifier.set_vision_agent(self.vision)
-        
-        self.register_agent(self.router)
-        self.register_agent(self.planner)
-        self.register_agent(self.action)
-        self.register_agent(self.vision)
-        self.register_agent(self.security)
-        self.register_agent(self.verifier)
-        self.register_agent(self.monitor)
-        self.register_agent(self.memory)
-        self.register_agent(self.research)
-        self.register_agent(self.domain)
-        
+        self.agents.register_factory("Verifier", lambda: _load_class("Verifier")(
+            self.vision, dom_check=lambda expect: self.action.check_dom(expect)))
+        self.agents.register_factory("Action", lambda: _load_class("Action")(backend=self.display))
+        self.agents.register_factory("Vision", lambda: _load_class("Vision")(
+            display=self.display, dom_snapshot=lambda: self.action.snapshot()))
+        self.sandbox = ProcessSandbox()
+        self._display = None
+        self._display_lock = threading.Lock()
+
+    @property
+    def display(self):
+        """The screen Action drives and Vision captures ($REMOTEPILOT_DISPLAY), opened on first use."""
+        with self._display_lock:
+            if self._display is None:
+                from display.base import open_display
+                self._display = open_display()
+                print(f"[Coordinator] Display: {self._display.kind}")
+            return self._display
+
+    def close_display(self):
+        with self._display_lock:
+            if self._display is not None:
+                self._display.close()
+                self._display = None
+
     def register_agent(self, agent: Agent):
-        self.agents[agent.name] = agent
+        self.agents.add(agent)
         print(f"[Coordinator] Registered agent: {agent.name}")
 
+    def preload(self, names: Iterable[str]):
+        """Builds the named agents now (blocking; run it on a thread)."""
+        for name in names:
+            try:
+                self.agents.get(name)
+            except Exception as e:
+                print(f"[Coordinator] Preloading {name} failed: {e}")
+
     async def user_request(self, command: str):
         print(f"[Coordinator] Received request: {command}")
         audit_logger.log_event("USER_REQUEST", {"command": command})
@@ -68,10 +145,13 @@ class Coordinator:
                 return res
 
             if command.startswith("run "):
-                # Legacy direct run - UNCHECKED for Phase 1/2 compatibility, 
-                # but ideally should go through Safety too.
-                # For Phase 3, let's Audit it.
+                # Legacy direct run. Reachable over /execute and /ws/rpc now,
+                # so it goes through the same Safety check as execute_plan.
                 cmd_to_run = command[4:]
+                safety_res = await self.safety.execute({"plan": [{"action": "COMMAND", "value": cmd_to_run}]})
+                if safety_res["status"] != "SAFE":
+                    audit_logger.log_event("LEGACY_RUN_BLOCKED", safety_res)
+                    return {"status": "blocked", "reason": safety_res["reason"]}
                 audit_logger.log_event("LEGACY_RUN_START", {"cmd": cmd_to_run})
                 res = await self.sandbox.run_command(cmd_to_run)
                 audit_logger.log_event("LEGACY_RUN_END", {"result": res})
@@ -79,7 +159,7 @@ class Coordinator:
                 
             if command.startswith("plan "):
                 goal = command[5:]
-                router_res = self.router.select_model("reasoning")
+                router_res = await self.router.select_model("reasoning")
                 selected_model = router_res.get("selected_model", "llama3")
                 
                 print(f"[Coordinator] Routing to Planner with model {selected_model}")
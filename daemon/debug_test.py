@@ -20,7 +20,7 @@ async def test_flow():
                     print(f"  [LOG] [{log.get('agent')}] {log.get('message')}")
                 elif data.get("type") == "state":
                     print(f"  [STATE] -> {data['data'].get('status')}")
-                    if data["data"].get("status") in ["DONE", "FAILED"]:
+                    if data["data"].get("status") in ["DONE", "FAILED", "CANCELLED"]:
                         break
         except Exception as e:
             print(f"WS Error: {e}")
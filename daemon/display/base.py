@@ -0,0 +1,44 @@
+import os
+from abc import abstractmethod
+from typing import Dict, Optional
+from input_backend.base import InputBackend
+
+class DisplayBackend(InputBackend):
+    """
+    One screen with its keyboard and mouse: what ActionAgent drives and
+    VisionAgent captures. Each worker owns its display, so several can run
+    desktop tasks side by side without seeing each other's input.
+    """
+    kind = "abstract"
+
+    @abstractmethod
+    def screenshot(self):
+        """Current frame as an RGB PIL image."""
+        pass
+
+    def env(self) -> Dict[str, str]:
+        """Environment for processes (apps, the browser) that should open on this display."""
+        return dict(os.environ)
+
+    def close(self):
+        pass
+
+def open_display(kind: Optional[str] = None, size: Optional[str] = None) -> DisplayBackend:
+    """
+    Builds the display named by `kind` or $REMOTEPILOT_DISPLAY:
+    "desktop" (default, the real screen via pyautogui), "xvfb" (a private
+    virtual framebuffer, for headless servers) or "fake" (in memory).
+    `size` / $REMOTEPILOT_DISPLAY_SIZE is "WIDTHxHEIGHT" for the virtual ones.
+    """
+    kind = (kind or os.environ.get("REMOTEPILOT_DISPLAY") or "desktop").lower()
+    width, height = (int(v) for v in (size or os.environ.get("REMOTEPILOT_DISPLAY_SIZE") or "1920x1080").split("x"))
+    if kind == "desktop":
+        from display.desktop import DesktopDisplay
+        return DesktopDisplay()
+    if kind == "xvfb":
+        from display.xvfb import XvfbDisplay
+        return XvfbDisplay(width, height)
+    if kind == "fake":
+        from display.fake import FakeDisplay
+        return FakeDisplay(width, height)
+    raise ValueError(f"Unknown display backend: {kind}")
@@ -0,0 +1,9 @@
+from input_backend.desktop import PyAutoGUIBackend
+from .base import DisplayBackend
+
+class DesktopDisplay(PyAutoGUIBackend, DisplayBackend):
+    """The logged-in user's real screen."""
+    kind = "desktop"
+
+    def screenshot(self):
+        return self.gui.screenshot()
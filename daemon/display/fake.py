@@ -0,0 +1,72 @@
+import threading
+from typing import Any, List, Tuple
+from .base import DisplayBackend
+
+class FakeDisplay(DisplayBackend):
+    """
+    In-memory display for tests and benchmarks. Input is recorded in
+    `events` and drawn on a numpy framebuffer, so captures change the way
+    a real screen would: a click leaves a marker, typed text fills 8x16
+    cells from the text cursor, Enter starts a new line.
+    """
+    kind = "fake"
+    CELL_W, CELL_H = 8, 16
+
+    def __init__(self, width: int = 1920, height: int = 1080, background: int = 245):
+        import numpy as np
+        self.width, self.height = width, height
+        self.frame = np.full((height, width, 3), background, dtype=np.uint8)
+        self.events: List[Tuple[Any, ...]] = []
+        self.cursor = (0, 0) # Text insertion point, moved by clicks
+        self.clipboard = ""
+        self._lock = threading.Lock()
+
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    def click(self, x: int, y: int):
+        with self._lock:
+            self.events.append(("click", x, y))
+            self.frame[max(0, y - 2):y + 3, max(0, x - 2):x + 3] = (255, 0, 0)
+            self.cursor = (x, y)
+
+    def write(self, text: str, interval: float = 0.0):
+        with self._lock:
+            self.events.append(("write", text))
+            self._draw_text(text)
+
+    def _draw_text(self, text: str):
+        x, y = self.cursor
+        for ch in text:
+            if ch == "\n":
+                x, y = 0, y + self.CELL_H
+                continue
+            if x + self.CELL_W > self.width:
+                x, y = 0, y + self.CELL_H
+            if y + self.CELL_H > self.height:
+                break
+            # Glyph shade from the code point keeps different text distinguishable
+            shade = 20 + (ord(ch) * 37) % 120
+            self.frame[y + 3:y + self.CELL_H - 3, x + 1:x + self.CELL_W - 1] = shade
+            x += self.CELL_W
+        self.cursor = (x, y)
+
+    def hotkey(self, *keys: str):
+        with self._lock:
+            self.events.append(("hotkey",) + keys)
+            if [k.lower() for k in keys] in (["enter"], ["return"]):
+                self.cursor = (0, self.cursor[1] + self.CELL_H)
+
+    def can_paste(self) -> bool:
+        return True
+
+    def paste(self, text: str):
+        with self._lock:
+            self.clipboard = text
+            self.events.append(("paste", text))
+            self._draw_text(text)
+
+    def screenshot(self):
+        from PIL import Image
+        with self._lock:
+            return Image.fromarray(self.frame.copy())
@@ -0,0 +1,108 @@
+import os
+import time
+import shutil
+import select
+import signal
+import subprocess
+from typing import Dict, Tuple
+from .base import DisplayBackend
+
+# pyautogui key names -> X keysyms understood by xdotool
+_KEYSYMS = {
+    "enter": "Return", "return": "Return", "tab": "Tab", "esc": "Escape", "escape": "Escape",
+    "backspace": "BackSpace", "delete": "Delete", "del": "Delete", "space": "space",
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right",
+    "home": "Home", "end": "End", "pageup": "Prior", "pagedown": "Next",
+    "ctrl": "ctrl", "control": "ctrl", "shift": "shift", "alt": "alt",
+    "win": "super", "command": "super", "cmd": "super", "super": "super",
+}
+
+class XvfbDisplay(DisplayBackend):
+    """
+    A private X virtual framebuffer. Xvfb picks a free display number
+    itself (-displayfd), so any number of workers can start one at once.
+    Input goes through xdotool and capture through Pillow's XCB grabber,
+    both pointed at this display only; nothing touches $DISPLAY.
+    """
+    kind = "xvfb"
+
+    def __init__(self, width: int = 1920, height: int = 1080, depth: int = 24, start_timeout: float = 10.0):
+        for tool in ("Xvfb", "xdotool"):
+            if shutil.which(tool) is None:
+                raise RuntimeError(f"{tool} not found; install xvfb and xdotool for headless mode")
+        self.width, self.height = width, height
+        read_fd, write_fd = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                ["Xvfb", "-displayfd", str(write_fd), "-screen", "0", f"{width}x{height}x{depth}",
+                 "-nolisten", "tcp", "-noreset"],
+                pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                start_new_session=True)
+            os.close(write_fd)
+            write_fd = None
+            self.name = f":{self._read_display_number(read_fd, start_timeout)}"
+        except Exception:
+            if write_fd is not None:
+                os.close(write_fd)
+            if hasattr(self, "process"):
+                self.close()
+            raise
+        finally:
+            os.close(read_fd)
+        self.clipboard = shutil.which("xclip")
+        print(f"[Display] Xvfb {self.name} started ({width}x{height})")
+
+    def _read_display_number(self, fd: int, timeout: float) -> int:
+        # Xvfb writes the number once it accepts connections
+        data = b""
+        deadline = time.monotonic() + timeout
+        while not data.endswith(b"\n"):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise RuntimeError("Xvfb did not start in time")
+            chunk = os.read(fd, 16)
+            if not chunk:
+                raise RuntimeError(f"Xvfb exited with code {self.process.wait()}")
+            data += chunk
+        return int(data)
+
+    def env(self) -> Dict[str, str]:
+        return dict(os.environ, DISPLAY=self.name)
+
+    def _xdotool(self, *args: str):
+        subprocess.run(["xdotool", *args], env=self.env(), check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+    def click(self, x: int, y: int):
+        self._xdotool("mousemove", str(x), str(y), "click", "1")
+
+    def write(self, text: str, interval: float = 0.0):
+        self._xdotool("type", "--delay", str(int(interval * 1000)), "--", text)
+
+    def hotkey(self, *keys: str):
+        self._xdotool("key", "+".join(_KEYSYMS.get(k.lower(), k) for k in keys))
+
+    def can_paste(self) -> bool:
+        return self.clipboard is not None
+
+    def paste(self, text: str):
+        # The clipboard is per X server, so there is no other user's content to restore
+        subprocess.run([self.clipboard, "-selection", "clipboard"], input=text.encode(),
+                       env=self.env(), check=True)
+        self.hotkey("ctrl", "v")
+
+    def screenshot(self):
+        from PIL import ImageGrab
+        return ImageGrab.grab(xdisplay=self.name).convert("RGB")
+
+    def close(self):
+        if self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
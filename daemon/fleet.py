@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import importlib.util
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from access import fleet_headers
+from capabilities import CAPABILITIES, ACTION_CAPABILITIES, required_capabilities
+from metrics import registry
+from task_manager import task_manager, TaskStatus, FINAL_STATES
+
+# Multi-node mode. A daemon started with REMOTEPILOT_ROLE=coordinator plans
+# each task itself and hands execution to a registered worker daemon
+# (REMOTEPILOT_ROLE=worker), mirroring the worker's logs and states into its
+# own task so the UI sees no difference. Workers register and heartbeat
+# over HTTP; execution runs over one WebSocket per task, and a worker that
+# drops the socket or misses heartbeats has its tasks reassigned. Both
+# sides must share $REMOTEPILOT_FLEET_TOKEN (see access.py).
+
+FLEET_DISPATCHES = registry.counter(
+    "remotepilot_fleet_dispatches_total", "Task executions handed to workers by outcome", ("outcome",))
+FLEET_REASSIGNMENTS = registry.counter(
+    "remotepilot_fleet_reassignments_total", "Tasks moved to another worker after theirs was lost")
+
+class WorkerLost(Exception):
+    pass
+
+class NoWorkerAvailable(Exception):
+    pass
+
+def local_capabilities() -> Set[str]:
+    """What this daemon can run: $REMOTEPILOT_CAPABILITIES, or detected."""
+    configured = os.environ.get("REMOTEPILOT_CAPABILITIES")
+    if configured:
+        return {c.strip() for c in configured.split(",") if c.strip()}
+    caps = {"shell"}
+    if importlib.util.find_spec("playwright") is not None:
+        caps.add("browser")
+    display = os.environ.get("REMOTEPILOT_DISPLAY", "desktop")
+    if display != "desktop" or sys.platform in ("win32", "darwin") or os.environ.get("DISPLAY"):
+        caps.add("desktop")
+    return caps
+
+class Worker:
+    __slots__ = ("id", "url", "capabilities", "max_tasks", "tasks", "load", "last_seen", "lost")
+
+    def __init__(self, worker_id: str, url: str, capabilities: Iterable[str], max_tasks: int):
+        self.id = worker_id
+        self.url = url.rstrip("/")
+        self.capabilities = set(capabilities)
+        self.max_tasks = max(1, max_tasks)
+        self.tasks: Set[str] = set() # Dispatched here and not finished
+        self.load: Dict[str, Any] = {} # Last heartbeat: cpu, ram, saturated, running
+        self.last_seen = time.monotonic()
+        self.lost = asyncio.Event() # Set when declared dead; wakes its dispatches
+
+    def score(self) -> float:
+        # Lower is better: our own in-flight count plus what the worker reports
+        running = max(len(self.tasks), self.load.get("running") or 0)
+        return running / self.max_tasks + (self.load.get("cpu") or 0) / 100
+
+    def info(self) -> Dict[str, Any]:
+        return {"id": self.id, "url": self.url, "capabilities": sorted(self.capabilities),
+                "max_tasks": self.max_tasks, "tasks": sorted(self.tasks), "load": self.load,
+                "last_seen_seconds": round(time.monotonic() - self.last_seen, 1)}
+
+class Fleet:
+    """Coordinator-side registry of workers and the dispatcher that uses it."""
+    def __init__(self, heartbeat_timeout: float = 10.0, dispatch_wait: float = 60.0, max_attempts: int = 3):
+        self.dispatching = os.environ.get("REMOTEPILOT_ROLE") == "coordinator"
+        self.heartbeat_timeout = heartbeat_timeout
+        self.dispatch_wait = dispatch_wait # How long a task waits for a capable worker
+        self.max_attempts = max_attempts
+        self.workers: Dict[str, Worker] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._reaper: Optional[asyncio.Task] = None
+        registry.gauge("remotepilot_fleet_workers", "Registered live workers", fn=lambda: len(self.workers))
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+
+    def register(self, worker_id: str, url: str, capabilities: Iterable[str], max_tasks: int = 1) -> Worker:
+        old = self.workers.get(worker_id)
+        worker = Worker(worker_id, url, capabilities, max_tasks)
+        if old is not None:
+            # Restarted worker: whatever it was running is gone
+            worker.tasks = old.tasks
+            old.lost.set()
+        self.workers[worker_id] = worker
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+        print(f"[Fleet] Worker {worker_id} registered at {worker.url} ({', '.join(sorted(worker.capabilities))})")
+        self._notify()
+        return worker
+
+    def heartbeat(self, worker_id: str, load: Dict[str, Any]) -> bool:
+        worker = self.workers.get(worker_id)
+        if worker is None:
+            return False # Unknown (e.g. we restarted); the worker registers again
+        worker.last_seen = time.monotonic()
+        worker.load = load
+        self._notify()
+        return True
+
+    def remove(self, worker_id: str, reason: str):
+        worker = self.workers.pop(worker_id, None)
+        if worker is not None:
+            print(f"[Fleet] Worker {worker_id} removed: {reason}")
+            worker.lost.set()
+
+    def reap(self):
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            if now - worker.last_seen > self.heartbeat_timeout:
+                self.remove(worker.id, f"no heartbeat for {now - worker.last_seen:.0f}s")
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_timeout / 4)
+            self.reap()
+
+    def pick(self, required: Set[str], exclude: Set[str] = frozenset()) -> Optional[Worker]:
+        """Least-loaded live worker that has `required` and a free slot."""
+        candidates = [w for w in self.workers.values()
+                      if w.id not in exclude and required <= w.capabilities
+                      and len(w.tasks) < w.max_tasks and not w.load.get("saturated")]
+        return min(candidates, key=Worker.score, default=None)
+
+    async def _wait_for_worker(self, required: Set[str], exclude: Set[str]) -> Worker:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        deadline = time.monotonic() + self.dispatch_wait
+        while True:
+            worker = self.pick(required, exclude)
+            if worker is not None:
+                return worker
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise NoWorkerAvailable(f"No worker with {', '.join(sorted(required)) or 'any capability'} "
+                                        f"became available in {self.dispatch_wait:.0f}s")
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=min(remaining, 1.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def dispatch(self, task, required: Set[str]) -> TaskStatus:
+        """
+        Runs `task` (already planned) on a worker and mirrors its progress
+        into `task`. Returns the final status; moves the task to another
+        worker, from the start of the plan, when its worker is lost.
+        """
+        tried: Set[str] = set()
+        for attempt in range(1, self.max_attempts + 1):
+            worker = await self._wait_for_worker(required, tried)
+            tried.add(worker.id)
+            worker.tasks.add(task.id)
+            log = task.add_log("Fleet", f"Dispatched to worker {worker.id} (attempt {attempt}).")
+            await task_manager.broadcast_log(task.id, log)
+            try:
+                status = await self._run_on(worker, task)
+                FLEET_DISPATCHES.inc(outcome=status.value.lower())
+                return status
+            except WorkerLost as e:
+                FLEET_DISPATCHES.inc(outcome="lost")
+                log = task.add_log("Fleet", f"Worker {worker.id} lost: {e}", "WARNING")
+                await task_manager.broadcast_log(task.id, log)
+                if attempt < self.max_attempts:
+                    FLEET_REASSIGNMENTS.inc()
+            finally:
+                worker.tasks.discard(task.id)
+                self._notify()
+        raise NoWorkerAvailable(f"Task lost {self.max_attempts} workers")
+
+    async def _run_on(self, worker: Worker, task) -> TaskStatus:
+        stream = asyncio.create_task(self._stream(worker, task))
+        lost = asyncio.create_task(worker.lost.wait())
+        try:
+            done, _ = await asyncio.wait({stream, lost}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Also on our own cancellation: dropping the socket aborts the task on the worker
+            stream.cancel()
+            lost.cancel()
+        if stream in done:
+            return stream.result()
+        raise WorkerLost("missed heartbeats")
+
+    async def _stream(self, worker: Worker, task) -> TaskStatus:
+        import websockets
+        url = worker.url.replace("http", "ws", 1) + "/fleet/ws/run"
+        try:
+            async with websockets.connect(url, open_timeout=10, close_timeout=2,
+                                          additional_headers=fleet_headers()) as ws:
+                await ws.send(json.dumps({"task_id": task.id, "goal": task.goal, "plan": task.plan}))
+                async for raw in ws:
+                    event = json.loads(raw)
+                    kind, data = event.get("type"), event.get("data")
+                    if kind == "log":
+                        log = task.add_log(data["agent"], data["message"], data.get("level", "INFO"))
+                        await task_manager.broadcast_log(task.id, log)
+                    elif kind == "plan":
+                        task.plan = data
+                    elif kind == "state":
+                        status = TaskStatus(data["status"])
+                        await task_manager.update_state(task.id, status)
+                        if status in FINAL_STATES:
+                            return status
+                    elif kind == "rejected":
+                        raise WorkerLost(f"rejected the task ({data})")
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+            raise WorkerLost(f"connection failed: {e}") from None
+        raise WorkerLost("connection closed before the task finished")
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [w.info() for w in self.workers.values()]
+
+class WorkerClient:
+    """Worker side: registers with the coordinator and keeps heartbeating."""
+    def __init__(self, coordinator_url: str, worker_id: str, url: str, capabilities: Iterable[str],
+                 max_tasks: int = 1, interval: float = 2.0):
+        self.coordinator_url = coordinator_url.rstrip("/")
+        self.worker_id = worker_id
+        self.url = url
+        self.capabilities = sorted(capabilities)
+        self.max_tasks = max_tasks
+        self.interval = interval
+
+    async def run(self, load):
+        """`load()` returns this daemon's current {cpu, ram, saturated, running}."""
+        import httpx
+        registered = False
+        async with httpx.AsyncClient(base_url=self.coordinator_url, timeout=10, headers=fleet_headers()) as client:
+            while True:
+                try:
+                    if not registered:
+                        (await client.post("/fleet/register", json={
+                            "worker_id": self.worker_id, "url": self.url,
+                            "capabilities": self.capabilities, "max_tasks": self.max_tasks,
+                        })).raise_for_status()
+                        registered = True
+                        print(f"[Fleet] Registered with coordinator {self.coordinator_url} as {self.worker_id}")
+                    res = await client.post(f"/fleet/heartbeat/{self.worker_id}", json=await load())
+                    registered = res.status_code == 200
+                except httpx.HTTPError as e:
+                    if registered:
+                        print(f"[Fleet] Coordinator unreachable: {e}")
+                    registered = False
+                await asyncio.sleep(self.interval)
+
+fleet = Fleet()
@@ -0,0 +1,32 @@
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+class InputBackend(ABC):
+    """
+    Synthetic keyboard/mouse input. Methods block until the events are
+    delivered; ActionAgent calls them from its dedicated input thread.
+    """
+    @abstractmethod
+    def size(self) -> Tuple[int, int]:
+        """Screen size in pixels."""
+        pass
+
+    @abstractmethod
+    def click(self, x: int, y: int):
+        pass
+
+    @abstractmethod
+    def write(self, text: str, interval: float = 0.0):
+        """Type `text` key by key, `interval` seconds apart."""
+        pass
+
+    @abstractmethod
+    def hotkey(self, *keys: str):
+        pass
+
+    def can_paste(self) -> bool:
+        return False
+
+    def paste(self, text: str):
+        """Insert `text` in one go through the clipboard."""
+        raise NotImplementedError
@@ -0,0 +1,46 @@
+import time
+import platform
+from typing import Tuple
+from .base import InputBackend
+
+class PyAutoGUIBackend(InputBackend):
+    def __init__(self, restore_delay: float = 0.1):
+        import pyautogui
+        self.gui = pyautogui
+        # Safety: Fail-safe corner active
+        pyautogui.FAILSAFE = True
+        # pyautogui sleeps PAUSE seconds after *every* call; intervals are explicit here
+        pyautogui.PAUSE = 0
+        self.paste_keys = ("command", "v") if platform.system() == "Darwin" else ("ctrl", "v")
+        self.restore_delay = restore_delay # Let the target app read the clipboard first
+        try:
+            import pyperclip # Installed with pyautogui (via mouseinfo)
+            self.clipboard = pyperclip
+        except ImportError:
+            self.clipboard = None
+
+    def size(self) -> Tuple[int, int]:
+        return tuple(self.gui.size())
+
+    def click(self, x: int, y: int):
+        self.gui.click(x, y)
+
+    def write(self, text: str, interval: float = 0.0):
+        self.gui.write(text, interval=interval)
+
+    def hotkey(self, *keys: str):
+        self.gui.hotkey(*keys)
+
+    def can_paste(self) -> bool:
+        return self.clipboard is not None
+
+    def paste(self, text: str):
+        try:
+            previous = self.clipboard.paste()
+        except Exception:
+            previous = None
+        self.clipboard.copy(text)
+        self.gui.hotkey(*self.paste_keys)
+        if previous is not None:
+            time.sleep(self.restore_delay)
+            self.clipboard.copy(previous)
@@ -7,18 +7,24 @@ from typing import Dict, Any
 class AuditLogger:
     def __init__(self, log_dir="logs"):
         self.log_dir = log_dir
-        os.makedirs(log_dir, exist_ok=True)
         self.log_file = os.path.join(log_dir, "audit.log")
+        self.logger = None # Log directory and file are created on the first event
+
+    def _open(self):
+        os.makedirs(self.log_dir, exist_ok=True)
         
         # Setup specific logger
-        self.logger = logging.getLogger("RemotePilotAudit")
-        self.logger.setLevel(logging.INFO)
+        logger = logging.getLogger("RemotePilotAudit")
+        logger.setLevel(logging.INFO)
         
         handler = logging.FileHandler(self.log_file)
         handler.setFormatter(logging.Formatter('%(message)s'))
-        self.logger.addHandler(handler)
+        logger.addHandler(handler)
+        self.logger = logger
 
     def log_event(self, event_type: str, details: Dict[str, Any]):
+        if self.logger is None:
+            self._open()
         entry = {
             "timestamp": datetime.now().isoformat(),
             "event": event_type,
@@ -1,83 +1,282 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 import asyncio
+import os
+import time
+import platform
 import json
+import importlib
 from typing import Optional, Dict, Any, List
 
-from task_manager import task_manager, TaskStatus
+from task_manager import task_manager, TaskStatus, FINAL_STATES
 from coordinator import coordinator
+from metrics import registry, CONTENT_TYPE
+from tracing import tracer
+from sampler import sampler
+from fleet import fleet, required_capabilities, local_capabilities, WorkerClient
+from model_residency import residency
+from pipeline import StepPipeline
+import access
+import rpc
+import wire
 
 app = FastAPI(title="RemotePilot Daemon", version="1.0.0")
 
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+# Task state and log payloads are repetitive JSON; compress anything non-trivial
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 class TaskSubmitRequest(BaseModel):
     goal: str
 
+class ExecuteRequest(BaseModel):
+    command: str
+
+class BatchExecuteRequest(BaseModel):
+    commands: List[str]
+    parallel: bool = False
+
 @app.get("/")
 async def root():
     return {"status": "RemotePilot Online", "version": "1.0.0"}
 
+# Admission control: while the host is saturated new tasks wait (up to
+# DEFER_TIMEOUT) instead of starting; past MAX_DEFERRED waiting tasks they are rejected.
+MAX_DEFERRED = 16
+DEFER_TIMEOUT = 300.0
+_deferred = set()
+ADMISSIONS = registry.counter(
+    "remotepilot_admission_total", "Task submissions by admission decision", ("decision",))
+registry.gauge("remotepilot_tasks_deferred", "Tasks waiting for the host to stop being saturated",
+               fn=lambda: len(_deferred))
+
+def admit_task(goal: str, idempotency_key: Optional[str] = None):
+    reason = sampler.saturated()
+    if reason and len(_deferred) >= MAX_DEFERRED:
+        ADMISSIONS.inc(decision="rejected")
+        raise HTTPException(status_code=503, detail=f"Host saturated: {reason}", headers={"Retry-After": "30"})
+    task = task_manager.create_task(goal, idempotency_key=idempotency_key)
+    start_task(task, reason)
+    return task, reason
+
+def start_task(task, reason: Optional[str], resume_from: Optional[int] = None):
+    """Starts `task` now, or once the host isn't saturated if `reason` says it is."""
+    if reason:
+        ADMISSIONS.inc(decision="deferred")
+        _deferred.add(task.id)
+        task.add_log("Monitor", f"Deferred: host saturated ({reason})", "WARNING")
+        asyncio.create_task(_start_when_admitted(task.id, resume_from))
+    else:
+        ADMISSIONS.inc(decision="admitted")
+        # Start task processing in background
+        asyncio.create_task(process_task(task.id, resume_from=resume_from))
+
+async def _start_when_admitted(task_id: str, resume_from: Optional[int] = None):
+    deadline = time.monotonic() + DEFER_TIMEOUT
+    try:
+        reason = sampler.saturated()
+        while reason and time.monotonic() < deadline:
+            await asyncio.sleep(sampler.interval)
+            reason = sampler.saturated()
+    finally:
+        _deferred.discard(task_id)
+    if reason:
+        task = task_manager.get_task(task_id)
+        log = task.add_log("Monitor", f"Not started after {DEFER_TIMEOUT:.0f}s: host saturated ({reason})", "ERROR")
+        await task_manager.broadcast_log(task_id, log)
+        await task_manager.update_state(task_id, TaskStatus.FAILED)
+        return
+    await process_task(task_id, resume_from=resume_from)
+
+async def _admit_recovered(recovered):
+    """
+    Tasks recovered from the task log go through admission like new ones,
+    once the sampler has enough readings to judge saturation. They are
+    deferred rather than rejected past MAX_DEFERRED: nobody is there to retry.
+    """
+    deadline = time.monotonic() + DEFER_TIMEOUT
+    while len(sampler.samples) < sampler.saturation_window and time.monotonic() < deadline:
+        await asyncio.sleep(sampler.interval / 2)
+    for task, resume_from in recovered:
+        start_task(task, sampler.saturated(), resume_from)
+
 @app.post("/task/submit")
-async def submit_task(req: TaskSubmitRequest):
-    task = task_manager.create_task(req.goal)
-    # Start task processing in background
-    asyncio.create_task(process_task(task.id))
-    return {"task_id": task.id, "status": task.status}
+async def submit_task(req: TaskSubmitRequest, idempotency_key: Optional[str] = Header(None)):
+    """
+    A retried submission with the same Idempotency-Key header gets the
+    original task back instead of starting it again. The task is in the
+    task log before this returns, so that holds across a daemon restart.
+    """
+    existing = task_manager.find_by_key(idempotency_key)
+    if existing:
+        return {"task_id": existing.id, "status": existing.status, "deferred": None, "duplicate": True}
+    task, deferred = admit_task(req.goal, idempotency_key)
+    if task_manager.journal:
+        await task_manager.journal.flush()
+    return {"task_id": task.id, "status": task.status, "deferred": deferred}
 
 @app.get("/task/state/{task_id}")
-async def get_task_state(task_id: str):
+async def get_task_state(task_id: str, request: Request, since_seq: Optional[int] = None):
+    """
+    Task state. The ETag is the task's change sequence, so a poll with
+    If-None-Match gets 304 until something changes; `since_seq` (the `seq`
+    of the previous response) returns only new logs and a replaced plan.
+    """
     task = task_manager.get_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {
-        "id": task.id,
-        "status": task.status,
-        "goal": task.goal,
-        "plan": task.plan,
-        "logs": task.logs
-    }
+    etag = f'W/"{task.seq}"'
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag})
+    return wire.response(task.state(since_seq), request.headers.get("accept"), {"ETag": etag})
 
 @app.websocket("/ws/logs")
-async def websocket_logs(websocket: WebSocket):
+async def websocket_logs(websocket: WebSocket, encoding: str = "json"):
+    # Frames are permessage-deflate compressed when the client offers it (uvicorn default)
     await websocket.accept()
+    binary = encoding == "msgpack" and wire.msgpack is not None
     queue = asyncio.Queue()
     task_manager.log_queues.append(queue)
-    try:
+
+    async def forward():
         while True:
             data = await queue.get()
-            await websocket.send_json(data)
-    except WebSocketDisconnect:
+            if binary:
+                await websocket.send_bytes(wire.encode(data, True))
+            else:
+                await websocket.send_text(wire.encode(data))
+
+    async def closed():
+        # Clients never send; without reading, one that left while no task
+        # was running would keep its queue (and everything put on it) forever
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender, receiver = asyncio.create_task(forward()), asyncio.create_task(closed())
+    try:
+        done, _ = await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error and not isinstance(error, (WebSocketDisconnect, RuntimeError)):
+                raise error
+    finally:
+        sender.cancel()
+        receiver.cancel()
         task_manager.log_queues.remove(queue)
 
-async def process_task(task_id: str):
+# user_request runs shell commands and plans: callers are checked, not just the policy
+@app.post("/execute", dependencies=[Depends(access.require_caller)])
+async def execute_command(req: ExecuteRequest):
+    """One Coordinator.user_request command (list models, run, plan, execute_plan, see, verify)."""
+    rpc.RPC_REQUESTS.inc(transport="http")
+    return await coordinator.user_request(req.command)
+
+@app.post("/execute/batch", dependencies=[Depends(access.require_caller)])
+async def execute_batch(req: BatchExecuteRequest):
+    """Many commands in one round trip; results stream back as NDJSON lines."""
+    return StreamingResponse(rpc.ndjson_results(coordinator.user_request, req.commands, req.parallel),
+                             media_type="application/x-ndjson")
+
+@app.websocket("/ws/rpc")
+async def websocket_rpc(websocket: WebSocket):
+    if not await access.admit(websocket):
+        return
+    await rpc.serve_websocket(websocket, coordinator.user_request)
+
+@app.websocket("/ws/screen")
+async def websocket_screen(websocket: WebSocket, fps: float = 5.0, tile: int = 64, format: str = "jpeg"):
+    """Live desktop feed: changed tiles only, quality adapted to ack latency."""
+    import numpy as np
+    from screen_stream import serve_screen
+    if not await access.admit(websocket): # the whole desktop: not for any page the user visits
+        return
+    if format.lower() not in ("jpeg", "webp") or not 16 <= tile <= 512:
+        await websocket.close(code=1008)
+        return
+    capture = lambda: np.asarray(coordinator.vision.capture().convert("RGB"))
+    await serve_screen(websocket, capture, fps=fps, tile=tile, fmt=format)
+
+async def process_task(task_id: str, plan: Optional[List[Dict[str, Any]]] = None,
+                       resume_from: Optional[int] = None):
+    """
+    Runs a task end to end; with `plan` (a fleet worker) planning is skipped.
+    `resume_from` continues a recovered task's plan at that step.
+    """
     print(f"\n[Lifecycle] STARTING TASK: {task_id}")
     task = task_manager.get_task(task_id)
     if not task: return
 
-    coordinator.monitor.reset()
+    tracer.start_trace(task_id)
+    coordinator.monitor.watch(task_id)
+    try:
+        with tracer.span("task", goal=task.goal[:200]):
+            await _run_task(task_id, task, plan, resume_from)
+    finally:
+        coordinator.monitor.unwatch(task_id)
+        release = getattr(coordinator.action, "release_commands", None) \
+            if "Action" in coordinator.agents.loaded() else None
+        if release:
+            # Apps a finished task launched stay open; a cancelled task's don't
+            release(task_id, kill=task.status == TaskStatus.CANCELLED)
+
+async def _run_task(task_id: str, task, plan=None, resume_from=None):
     try:
         # 1. SECURITY & PLANNING
-        print(f"[Lifecycle] {task_id} -> PHASE: PLANNING")
-        await task_manager.update_state(task_id, TaskStatus.PLANNING)
-        plan_res = await coordinator.planner.execute({"goal": task.goal})
-        
-        if plan_res["status"] != "success":
-            raise Exception(f"Planning failed: {plan_res.get('error')}")
-            
-        task.plan = plan_res.get("plan", [])
+        resuming = resume_from is not None
+        planned = plan is None and not resuming
+        if resuming:
+            plan = task.plan
+        elif planned:
+            print(f"[Lifecycle] {task_id} -> PHASE: PLANNING")
+            await task_manager.update_state(task_id, TaskStatus.PLANNING)
+            # Known workflows replay a recipe: no LLM planning, DOM verification
+            recipe = await coordinator.domain.execute({"goal": task.goal})
+            if recipe["status"] == "success":
+                plan = recipe["plan"]
+                log = task.add_log("Domain", f"Recipe '{recipe['recipe']}' matched; planner skipped.")
+                await task_manager.broadcast_log(task_id, log)
+            else:
+                with tracer.span("planning"):
+                    plan_res = await coordinator.planner.execute({"goal": task.goal, "task_id": task_id})
+
+                if plan_res["status"] != "success":
+                    raise Exception(f"Planning failed: {plan_res.get('error')}")
+                plan = plan_res.get("plan", [])
+
+        if not resuming:
+            task.plan = plan
         
-        # Security Screening
-        sec_res = await coordinator.security.execute({"plan": task.plan})
+        # Security Screening (again on workers: they don't trust the wire)
+        with tracer.span("security", steps=len(task.plan)):
+            sec_res = await coordinator.security.execute({"plan": task.plan})
         if sec_res["status"] == "BLOCKED":
             raise Exception(f"Security Alert: {sec_res['reason']}")
 
-        log = task.add_log("Planner", f"Generated & Secured {len(task.plan)} steps.")
+        if planned:
+            log = task.add_log("Planner", f"Generated & Secured {len(task.plan)} steps.")
+        elif resuming:
+            log = task.add_log("Planner", f"Re-secured {len(task.plan)} steps; continuing at step {resume_from + 1}.")
+        else:
+            log = task.add_log("Planner", f"Secured {len(task.plan)} steps from the coordinator.")
         print(f"[Lifecycle] {task_id} -> PLAN SECURED ({len(task.plan)} steps)")
         await task_manager.broadcast_log(task_id, log)
 
+        if fleet.dispatching:
+            # Coordinator mode: a worker executes, we mirror its progress
+            status = await fleet.dispatch(task, required_capabilities(task.plan))
+            if status == TaskStatus.DONE:
+                from memory_store import memory_store
+                await memory_store.add_interaction(task.goal, task.plan)
+            await coordinator.memory.execute({
+                "action": "store",
+                "data": {"id": task_id, "goal": task.goal, "plan": task.plan, "status": status.value}
+            })
+            return
+
         # 2. MODEL_CHECK
         await task_manager.update_state(task_id, TaskStatus.MODEL_CHECK)
         
@@ -85,73 +284,114 @@ async def process_task(task_id: str):
         await task_manager.update_state(task_id, TaskStatus.SANDBOX_SETUP)
         
         # 4. EXECUTION LOOP with SELF-CORRECTION
+        # Pipelined: screenshot right after the action, WAIT until the screen settles,
+        # next step's browser launched during verification. REMOTEPILOT_PIPELINE=0: serial.
+        pipeline = StepPipeline(coordinator) if os.environ.get("REMOTEPILOT_PIPELINE", "1") != "0" else None
         research_fragments = []
-        step_index = 0
+        step_index = resume_from or 0
         retry_count = 0
         max_retries = 10 # Allow the agent to pivot many times
 
         while step_index < len(task.plan) and retry_count < max_retries:
             step = task.plan[step_index]
-            
-            # ACT
-            await task_manager.update_state(task_id, TaskStatus.ACT)
-            action_res = await coordinator.action.execute(step)
-            
-            if action_res.get("content"):
-                research_fragments.append(action_res["content"])
-            
-            log = task.add_log("Action", f"Step {step_index+1}: {action_res.get('detail', 'Executed')}")
-            await task_manager.broadcast_log(task_id, log)
 
-            # VERIFY
-            await task_manager.update_state(task_id, TaskStatus.VERIFY)
-            verify_res = await coordinator.verifier.execute({
-                "expectation": f"Goal state after action: {step.get('action')}"
-            })
-            
-            if verify_res.get("verified"):
-                step_index += 1
-                retry_count = 0 # Reset retries on success
-            else:
-                # SELF-CORRECTION TRIGGER
-                retry_count += 1
-                await task_manager.update_state(task_id, TaskStatus.PLANNING)
-                log = task.add_log("Monitor", f"Verification FAILED. Triggering Re-Plan (Attempt {retry_count}).", "WARNING")
-                await task_manager.broadcast_log(task_id, log)
+            with tracer.span(f"step {step_index + 1}", "step", action=str(step.get("action")), retry=retry_count):
+                # ACT
+                await task_manager.update_state(task_id, TaskStatus.ACT)
+                if step.get("expect") is None:
+                    # Verification asks a model; have it loaded by the time the action is done
+                    residency.prefetch(coordinator.vision.model_for(step), coordinator.vision.ollama_url)
+                with tracer.span("act"):
+                    if pipeline and str(step.get("action", "")).upper() == "WAIT":
+                        action_res = await pipeline.wait(step)
+                    else:
+                        action_res = await coordinator.action.execute(step)
+                screenshot = None
+                if pipeline:
+                    screenshot = pipeline.after_action(step)
+                    if step_index + 1 < len(task.plan):
+                        pipeline.prepare(task.plan[step_index + 1]) # runs while this step is verified
                 
-                # Get current UI state for context
-                vision_context = await coordinator.vision.execute({"command": "Describe detailed UI state", "model": "llava"})
+                if action_res.get("content"):
+                    research_fragments.append(action_res["content"])
                 
-                replan_res = await coordinator.planner.re_plan({
-                    "goal": task.goal,
-                    "failed_step": step,
-                    "error": verify_res.get("details", "Visual mismatch"),
-                    "vision_context": vision_context.get("description", "VLM context missing")
-                })
+                log = task.add_log("Action", f"Step {step_index+1}: {action_res.get('detail', 'Executed')}")
+                await task_manager.broadcast_log(task_id, log)
+
+                # VERIFY
+                await task_manager.update_state(task_id, TaskStatus.VERIFY)
+                with tracer.span("verify", speculative=screenshot is not None):
+                    verify_res = await coordinator.verifier.execute({
+                        "expectation": f"Goal state after action: {step.get('action')}",
+                        "step": step,
+                        "image": await pipeline.screenshot(screenshot) if pipeline else None,
+                        "expect": step.get("expect"), # Recipe steps: checked in the DOM
+                        "action_status": action_res.get("status"),
+                        "action_error": action_res.get("error"),
+                    })
                 
-                if replan_res["status"] == "success":
-                    task.plan = replan_res["plan"]
-                    step_index = 0 # Restart from new plan
-                    log = task.add_log("Planner", "Pivot successful. New plan generated.")
-                    await task_manager.broadcast_log(task_id, log)
+                if verify_res.get("verified"):
+                    step_index += 1
+                    task_manager.step_done(task_id, step_index)
+                    retry_count = 0 # Reset retries on success
                 else:
-                    raise Exception(f"Self-correction failed: {replan_res.get('error')}")
+                    # SELF-CORRECTION TRIGGER
+                    retry_count += 1
+                    await task_manager.update_state(task_id, TaskStatus.PLANNING)
+                    log = task.add_log("Monitor", f"Verification FAILED. Triggering Re-Plan (Attempt {retry_count}).", "WARNING")
+                    await task_manager.broadcast_log(task_id, log)
+                    
+                    with tracer.span("replan", attempt=retry_count):
+                        # Current UI state for context: the page's elements for browser steps, else the VLM
+                        vision_context = await coordinator.vision.observe(step)
+                        
+                        replan_res = await coordinator.planner.re_plan({
+                            "task_id": task_id, # Continues the planning context in Ollama
+                            "goal": task.goal,
+                            "failed_step": step,
+                            "error": verify_res.get("details", "Visual mismatch"),
+                            "vision_context": vision_context.get("description", "VLM context missing")
+                        })
+                    
+                    if replan_res["status"] == "success":
+                        task.plan = replan_res["plan"]
+                        step_index = 0 # Restart from new plan
+                        log = task.add_log("Planner", "Pivot successful. New plan generated.")
+                        await task_manager.broadcast_log(task_id, log)
+                    else:
+                        raise Exception(f"Self-correction failed: {replan_res.get('error')}")
 
         # 5. SPECIALIST SYNTHESIS
         if research_fragments:
-            summary_res = await coordinator.research.execute({"topic": task.goal, "pages": research_fragments})
+            coordinator.monitor.watchdog.enter_phase(task_id, "RESEARCH")
+            with tracer.span("research", pages=len(research_fragments)):
+                summary_res = await coordinator.research.execute({"topic": task.goal, "pages": research_fragments})
             log = task.add_log("Research", summary_res.get("data", {}).get("summary", "Synthesis done."))
             await task_manager.broadcast_log(task_id, log)
 
         await task_manager.update_state(task_id, TaskStatus.DONE)
         
         # 6. STORE MEMORY (RAG & HISTORY)
-        from memory_store import memory_store
-        await memory_store.add_interaction(task.goal, task.plan)
-        
+        with tracer.span("store_memory"):
+            from memory_store import memory_store
+            await memory_store.add_interaction(task.goal, task.plan)
+            
+            await coordinator.memory.execute({
+                "action": "store", 
+                "data": {"id": task_id, "goal": task.goal, "plan": task.plan, "status": "DONE"}
+            })
+
+    except asyncio.CancelledError:
+        reason = coordinator.monitor.abort_reason(task_id)
+        if reason is None:
+            raise # Not ours (e.g. daemon shutdown)
+        print(f"[Lifecycle] {task_id} -> CANCELLED ({reason})")
+        log = task.add_log("Monitor", f"CANCELLED: {reason}", "ERROR")
+        await task_manager.broadcast_log(task_id, log)
+        await task_manager.update_state(task_id, TaskStatus.CANCELLED)
         await coordinator.memory.execute({
             "action": "store", 
-            "data": {"id": task_id, "goal": task.goal, "plan": task.plan, "status": "DONE"}
+            "data": {"id": task_id, "goal": task.goal, "plan": task.plan, "status": "CANCELLED"}
         })
 
     except Exception as e:
@@ -163,6 +403,27 @@ async def process_task(task_id: str):
             "data": {"id": task_id, "goal": task.goal, "plan": task.plan, "status": "FAILED"}
         })
 
+@app.post("/task/cancel/{task_id}")
+async def cancel_task(task_id: str):
+    if not task_manager.get_task(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    res = await coordinator.monitor.execute({"action": "abort", "task_id": task_id, "reason": "cancelled by user"})
+    if res["status"] != "abort_triggered":
+        raise HTTPException(status_code=409, detail=res["error"])
+    return res
+
+@app.get("/task/trace/{task_id}")
+async def get_task_trace(task_id: str, format: str = "chrome"):
+    """Span timeline for a task: Chrome trace-event JSON (Perfetto) or OTLP/JSON."""
+    trace = tracer.get_trace(task_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found (task unknown, evicted or not sampled)")
+    if format == "otlp":
+        return trace.to_otlp()
+    if format != "chrome":
+        raise HTTPException(status_code=400, detail="format must be 'chrome' or 'otlp'")
+    return trace.to_chrome()
+
 from tunnels import tunnel_manager
 
 # ... existing app and routes ...
@@ -180,30 +441,239 @@ async def stop_tunnel():
     tunnel_manager.stop_tunnel()
     return {"status": "Tunnel stopping..."}
 
+# --- Fleet: coordinator endpoints (workers call these) ---
+
+class WorkerRegisterRequest(BaseModel):
+    worker_id: str
+    url: str
+    capabilities: List[str]
+    max_tasks: int = 1
+
+@app.post("/fleet/register", dependencies=[Depends(access.require_fleet)])
+async def fleet_register(req: WorkerRegisterRequest):
+    fleet.register(req.worker_id, req.url, req.capabilities, req.max_tasks)
+    return {"status": "registered", "heartbeat_timeout": fleet.heartbeat_timeout}
+
+@app.post("/fleet/heartbeat/{worker_id}", dependencies=[Depends(access.require_fleet)])
+async def fleet_heartbeat(worker_id: str, load: Dict[str, Any]):
+    if not fleet.heartbeat(worker_id, load):
+        raise HTTPException(status_code=404, detail="Unknown worker; register again")
+    return {"status": "ok"}
+
+@app.get("/fleet/workers")
+async def fleet_workers():
+    return {"dispatching": fleet.dispatching, "workers": fleet.status()}
+
+# --- Fleet: worker side ---
+
+@app.websocket("/fleet/ws/run")
+async def fleet_run(websocket: WebSocket):
+    """
+    Executes one planned task for a coordinator: receives {task_id, goal,
+    plan}, streams back its log/state/plan events until a final state.
+    Dropping the socket aborts the task; the coordinator owns it.
+    Only served by workers (REMOTEPILOT_ROLE=worker), to callers holding the
+    fleet token: the plan runs as given, without the planner.
+    """
+    if os.environ.get("REMOTEPILOT_ROLE") != "worker":
+        await websocket.close(code=1008)
+        return
+    if not await access.admit(websocket, fleet=True):
+        return
+    await websocket.accept()
+    try:
+        req = json.loads(await websocket.receive_text())
+        valid = isinstance(req, dict) and isinstance(req.get("task_id"), str) and \
+            isinstance(req.get("goal"), str) and isinstance(req.get("plan", []), list)
+    except (ValueError, WebSocketDisconnect):
+        req, valid = None, False
+    existing = task_manager.get_task(req["task_id"]) if valid else None
+    busy = "malformed request" if not valid else sampler.saturated() or (
+        "already running here" if existing and existing.status not in FINAL_STATES else None)
+    if busy:
+        try:
+            await websocket.send_text(json.dumps({"type": "rejected", "data": busy}))
+            await websocket.close()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        return
+    task = task_manager.create_task(req["goal"], task_id=req["task_id"])
+    queue = asyncio.Queue()
+    task_manager.log_queues.append(queue)
+    runner = asyncio.create_task(process_task(task.id, plan=req.get("plan", [])))
+    runner.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def watch_coordinator():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            if task.status not in FINAL_STATES:
+                coordinator.monitor.request_abort(task.id, "coordinator disconnected")
+
+    watcher = asyncio.create_task(watch_coordinator())
+    sent_plan_seq = task.plan_seq
+    try:
+        while (event := await queue.get()) is not None:
+            if event["task_id"] != task.id:
+                continue
+            if task.plan_seq > sent_plan_seq: # Re-planned on this worker
+                sent_plan_seq = task.plan_seq
+                await websocket.send_text(json.dumps({"type": "plan", "data": task.plan}))
+            await websocket.send_text(json.dumps(event))
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        if task.status not in FINAL_STATES:
+            coordinator.monitor.request_abort(task.id, "coordinator disconnected")
+    finally:
+        watcher.cancel()
+        task_manager.log_queues.remove(queue)
+
+async def fleet_load() -> Dict[str, Any]:
+    health = await coordinator.monitor.execute({"action": "check_health"})
+    return {"cpu": health.get("cpu"), "ram": health.get("ram"), "saturated": health.get("saturated"),
+            "running": len(health.get("tasks", {}))}
+
 async def submit_task_callback(goal: str):
-    task = task_manager.create_task(goal)
-    asyncio.create_task(process_task(task.id))
+    try:
+        admit_task(goal)
+    except HTTPException as e:
+        print(f"[Scheduler] Skipped '{goal}': {e.detail}")
 
-@app.on_event("startup")
-async def startup_event():
+# Agents a task touches first; built on a thread after startup instead of on
+# the first request. REMOTEPILOT_WARMUP=0 skips warm-up entirely.
+WARM_AGENTS = ("Monitor", "Planner", "Security", "Safety", "Memory", "Action", "Vision", "Verifier", "Research")
+
+async def warm_up():
+    start = time.perf_counter()
+    await asyncio.to_thread(coordinator.preload, WARM_AGENTS)
+    from memory_store import memory_store
+    await asyncio.to_thread(memory_store.load)
+    print(f"[System] Agents and memory ready in {time.perf_counter() - start:.1f}s")
+    if await coordinator.planner.preload():
+        print(f"[System] Planner model loaded after {time.perf_counter() - start:.1f}s")
+
+def _make_scheduler():
+    from agents.scheduler import SchedulerAgent
+    return SchedulerAgent(submit_task_callback)
+
+async def start_scheduler():
+    # apscheduler/SQLAlchemy import on a thread; the AsyncIOScheduler itself
+    # must start on the loop. Persisted jobs resume once this finishes.
     try:
-        from agents.scheduler import SchedulerAgent
-        coordinator.scheduler = SchedulerAgent(submit_task_callback)
-        coordinator.register_agent(coordinator.scheduler)
-        print("[System] Startup complete.")
+        await asyncio.to_thread(importlib.import_module, "agents.scheduler")
+        coordinator.scheduler # built through the registry factory
     except Exception as e:
-        print(f"[System] Startup error: {e}")
+        print(f"[System] Scheduler start failed: {e}")
         import traceback
         traceback.print_exc()
 
+@app.on_event("startup")
+async def startup_event():
+    sampler.start()
+    # Durable task log ($REMOTEPILOT_TASK_LOG, empty to disable): unfinished
+    # tasks from before a restart are resumed or failed, never lost
+    task_log = os.environ.get("REMOTEPILOT_TASK_LOG", "tasks.db")
+    if task_log:
+        recovered = await asyncio.to_thread(task_manager.open_journal, task_log)
+        if recovered:
+            asyncio.create_task(_admit_recovered(recovered))
+    coordinator.agents.register_factory("Scheduler", _make_scheduler)
+    asyncio.create_task(start_scheduler())
+    if os.environ.get("REMOTEPILOT_WARMUP", "1") != "0":
+        asyncio.create_task(warm_up())
+    coordinator_url = os.environ.get("REMOTEPILOT_COORDINATOR_URL")
+    if os.environ.get("REMOTEPILOT_ROLE") == "worker" and coordinator_url:
+        port = os.environ.get("REMOTEPILOT_PORT", "8000")
+        client = WorkerClient(
+            coordinator_url,
+            worker_id=os.environ.get("REMOTEPILOT_WORKER_ID", f"{platform.node()}:{port}"),
+            url=os.environ.get("REMOTEPILOT_WORKER_URL", f"http://{platform.node()}:{port}"),
+            capabilities=local_capabilities(),
+            max_tasks=int(os.environ.get("REMOTEPILOT_MAX_TASKS", "1")),
+            interval=float(os.environ.get("REMOTEPILOT_HEARTBEAT", "2")))
+        asyncio.create_task(client.run(fleet_load))
+    print("[System] Startup complete.")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    sampler.stop()
+    task_manager.close_journal()
+    coordinator.close_display() # Stops a private Xvfb, if one was started
+
+def _register_daemon_metrics():
+    sampled = lambda field: (lambda: sampler.latest().get(field, 0))
+    registry.gauge("remotepilot_host_cpu_percent", "Host CPU utilisation over the last sampler interval",
+                   fn=sampled("cpu"))
+    registry.gauge("remotepilot_host_ram_percent", "Host RAM utilisation", fn=sampled("ram"))
+    registry.gauge("remotepilot_process_rss_bytes", "Resident memory by process group",
+                   ("process",), fn=lambda: {(name,): sampler.latest().get(f"{name}_rss", 0)
+                                             for name in ("daemon", "children", "ollama")})
+    registry.gauge("remotepilot_host_disk_bytes_per_second", "Host disk throughput",
+                   ("direction",), fn=lambda: {(d,): sampler.latest().get(f"disk_{d}_bps", 0) for d in ("read", "write")})
+    registry.gauge("remotepilot_host_net_bytes_per_second", "Host network throughput",
+                   ("direction",), fn=lambda: {(d,): sampler.latest().get(f"net_{d}_bps", 0) for d in ("sent", "recv")})
+    security = lambda key: (lambda: coordinator.security.stats()[key])
+    registry.counter("remotepilot_security_verdict_cache_hits_total", "Intent verdicts served from cache",
+                     fn=security("verdict_cache_hits"))
+    registry.counter("remotepilot_security_verdict_cache_misses_total", "Intent verdict cache misses",
+                     fn=security("verdict_cache_misses"))
+    registry.gauge("remotepilot_security_verdict_cache_hit_ratio", "Intent verdict cache hit rate",
+                   fn=security("verdict_cache_hit_rate"))
+    registry.counter("remotepilot_security_reviews_total", "LLM intent reviews sent",
+                     fn=security("reviews"))
+    registry.counter("remotepilot_security_review_timeouts_total", "Blocking reviews that hit the timeout budget",
+                     fn=security("review_timeouts"))
+    registry.gauge("remotepilot_security_review_latency_avg_seconds", "Mean LLM intent review latency",
+                   fn=lambda: coordinator.security.stats()["review_latency_avg_ms"] / 1000)
+
+_register_daemon_metrics()
+
 @app.get("/metrics")
 async def get_metrics():
-    return await coordinator.monitor.execute({"action": "check_health"})
+    """Prometheus text exposition of every registered metric."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+@app.get("/metrics/history")
+async def get_metrics_history(window: float = 300.0, points: int = 120):
+    """Sampled host/process series for the last `window` seconds, downsampled to `points`."""
+    if window <= 0 or points <= 0:
+        raise HTTPException(status_code=400, detail="window and points must be positive")
+    return sampler.history(window, min(points, 2000))
+
+@app.get("/health")
+async def get_health():
+    res = await coordinator.monitor.execute({"action": "check_health"})
+    res["security"] = coordinator.security.stats()
+    return res
 
 @app.post("/task/schedule")
 async def schedule_task(req: TaskSubmitRequest, cron: str):
     res = await coordinator.scheduler.execute({"action": "schedule", "goal": req.goal, "cron": cron})
     return res
 
+@app.get("/task/schedule")
+async def list_scheduled_tasks():
+    return await coordinator.scheduler.execute({"action": "list"})
+
+async def _scheduled_job_action(action: str, job_id: str):
+    res = await coordinator.scheduler.execute({"action": action, "job_id": job_id})
+    if res["status"] != "success":
+        raise HTTPException(status_code=404, detail=res["error"])
+    return res
+
+@app.post("/task/schedule/{job_id}/pause")
+async def pause_scheduled_task(job_id: str):
+    return await _scheduled_job_action("pause", job_id)
+
+@app.post("/task/schedule/{job_id}/resume")
+async def resume_scheduled_task(job_id: str):
+    return await _scheduled_job_action("resume", job_id)
+
+@app.delete("/task/schedule/{job_id}")
+async def delete_scheduled_task(job_id: str):
+    return await _scheduled_job_action("delete", job_id)
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("REMOTEPILOT_PORT", "8000")),
+                ws_per_message_deflate=True)
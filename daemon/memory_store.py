@@ -1,38 +1,106 @@
 import numpy as np
-import requests
 import json
 import os
+import asyncio
+import threading
 from typing import List, Dict, Any
+from vector_index import create_index
+from ollama_client import ollama_post
 
 class MemoryStore:
-    def __init__(self, ollama_url="http://localhost:11434", storage_file="vector_memory.json"):
+    def __init__(self, ollama_url="http://localhost:11434", storage_file="vector_memory.json", index_backend="exact"):
         self.ollama_url = ollama_url
         self.storage_file = storage_file
+        # Plan payloads live in the storage file, one JSON object per line,
+        # appended as they come; vectors live in the index files (row id ==
+        # position in self.memory).
+        self.index = create_index(index_backend, path=os.path.splitext(storage_file)[0])
         self.memory: List[Dict[str, Any]] = []
-        self._load_memory()
+        # Files are read on first use (or by the startup warm-up), not at import
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # Inserts (which may retrain the IVF index) and searches run on threads;
+        # this keeps them apart and keeps index rows and entries in step
+        self._index_lock = threading.Lock()
 
-    def _load_memory(self):
-        if os.path.exists(self.storage_file):
+    def load(self):
+        with self._load_lock:
+            if not self._loaded:
+                self._load_memory()
+                self._loaded = True
+
+    async def _ensure_loaded(self):
+        if not self._loaded:
+            await asyncio.to_thread(self.load)
+
+    def _read_entries(self) -> bool:
+        """Reads the storage file into self.memory; True if it must be rewritten (old JSON array format)."""
+        if not os.path.exists(self.storage_file):
+            return False
+        with open(self.storage_file, "rb") as f:
+            data = f.read()
+        if data.lstrip().startswith(b"["):
             try:
-                with open(self.storage_file, 'r') as f:
-                    self.memory = json.load(f)
-            except:
+                self.memory = json.loads(data)
+            except ValueError:
+                print(f"[MemoryStore] {self.storage_file} is unreadable; starting empty")
                 self.memory = []
+                return False
+            return True
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Crashed mid-append: drop the partial line so the next one starts clean
+            with open(self.storage_file, "r+b") as f:
+                f.truncate(complete)
+        self.memory = []
+        for line in data[:complete].splitlines():
+            try:
+                self.memory.append(json.loads(line))
+            except ValueError:
+                print("[MemoryStore] Skipping a corrupt entry")
+        return False
+
+    def _load_memory(self):
+        if self._read_entries():
+            self._save_memory()
+
+        loaded = self.index.load()
+        if not loaded:
+            self.index.reset()
+        if self.memory and all(item.get("vector") for item in self.memory) and \
+                len(self.index) != len(self.memory):
+            # Legacy file: vectors were kept inline in the JSON
+            print(f"[MemoryStore] Rebuilding {self.index.backend} index for {len(self.memory)} entries...")
+            self.index.reset()
+            self.index.add_batch([item.pop("vector") for item in self.memory])
+            self._save_memory()
+        elif len(self.index) > len(self.memory):
+            # Crashed between index.add and saving the entry: drop the orphan rows
+            print(f"[MemoryStore] Dropping {len(self.index) - len(self.memory)} index rows with no entry")
+            self.index.truncate(len(self.memory))
+        elif len(self.index) < len(self.memory):
+            # Index lost or cut short: _index_pending re-embeds those goals
+            print(f"[MemoryStore] {len(self.memory) - len(self.index)} entries are not indexed yet")
 
     def _save_memory(self):
-        with open(self.storage_file, 'w') as f:
-            json.dump(self.memory, f)
+        """Rewrites the whole file; only for migrations. New entries go through _append_entry."""
+        tmp = f"{self.storage_file}.tmp"
+        with open(tmp, "w") as f:
+            f.writelines(json.dumps(item) + "\n" for item in self.memory)
+        os.replace(tmp, self.storage_file)
+
+    def _append_entry(self, entry: Dict[str, Any]):
+        with open(self.storage_file, "a") as f:
+            f.write(json.dumps(entry) + "\n")
 
     async def get_embedding(self, text: str) -> List[float]:
-        import asyncio
         try:
-            res = await asyncio.to_thread(
-                requests.post,
-                f"{self.ollama_url}/api/embeddings", 
+            res = await ollama_post(
+                f"{self.ollama_url}/api/embeddings",
                 json={
                     "model": "nomic-embed-text",
                     "prompt": text
-                }, 
+                },
                 timeout=5
             )
             if res.status_code == 200:
@@ -41,30 +109,63 @@ class MemoryStore:
             pass
         return []
 
+    def _index_row(self, position: int, embedding: List[float]) -> bool:
+        """Indexes entry `position` (on a thread); False if another caller already did."""
+        with self._index_lock:
+            if len(self.index) != position:
+                return False
+            self.index.add(embedding)
+            return True
+
+    def _insert(self, entry: Dict[str, Any], embedding: List[float]):
+        """Stores a new entry (on a thread). It's indexed now unless older entries are still waiting."""
+        with self._index_lock:
+            if len(self.index) == len(self.memory):
+                self.index.add(embedding) # may retrain IVF; raises ValueError before anything is stored
+            self.memory.append(entry)
+            self._append_entry(entry)
+
+    def _search(self, query_vec: List[float], top_k: int) -> List[Dict[str, Any]]:
+        with self._index_lock:
+            # Cosine Similarity (index rows are pre-normalized)
+            hits = self.index.search(np.array(query_vec), top_k)
+            return [self.memory[i] for score, i in hits if score > 0.7] # Only highly relevant
+
+    async def _index_pending(self) -> bool:
+        """
+        Embeds entries past the end of the index (row id == position, so
+        the index always covers a prefix of self.memory). True once it
+        covers them all.
+        """
+        while len(self.index) < len(self.memory):
+            position = len(self.index)
+            embedding = await self.get_embedding(self.memory[position]["goal"])
+            if not embedding:
+                return False
+            try:
+                await asyncio.to_thread(self._index_row, position, embedding)
+            except ValueError as e:
+                print(f"[MemoryStore] Can't index stored entry: {e}")
+                return False
+        return True
+
     async def add_interaction(self, goal: str, plan: List[Dict[str, Any]]):
+        await self._ensure_loaded()
         embedding = await self.get_embedding(goal)
         if embedding:
-            self.memory.append({
-                "goal": goal,
-                "plan": plan,
-                "vector": embedding
-            })
-            self._save_memory()
+            # Behind after a crash: catch up first, or the entry waits its turn
+            await self._index_pending()
+            try:
+                await asyncio.to_thread(self._insert, {"goal": goal, "plan": plan}, embedding)
+            except ValueError as e:
+                print(f"[MemoryStore] Skipping interaction: {e}")
 
     async def retrieve_relevant(self, goal: str, top_k: int = 2) -> List[Dict[str, Any]]:
+        await self._ensure_loaded()
+        await self._index_pending()
         query_vec = await self.get_embedding(goal)
         if not query_vec or not self.memory:
             return []
+        return await asyncio.to_thread(self._search, query_vec, top_k)
 
-        # Cosine Similarity
-        scores = []
-        q_v = np.array(query_vec)
-        for item in self.memory:
-            i_v = np.array(item["vector"])
-            score = np.dot(q_v, i_v) / (np.linalg.norm(q_v) * np.linalg.norm(i_v))
-            scores.append((score, item))
-
-        scores.sort(key=lambda x: x[0], reverse=True)
-        return [s[1] for s in scores[:top_k] if s[0] > 0.7] # Only highly relevant
-
-memory_store = MemoryStore()
+memory_store = MemoryStore(index_backend=os.environ.get("REMOTEPILOT_MEMORY_INDEX", "exact"))
@@ -0,0 +1,184 @@
+import os
+import re
+import time
+import asyncio
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+import psutil
+
+from metrics import registry
+from sampler import sampler
+
+# Which Ollama models stay loaded. A task alternates the planner, the VLM
+# and the embedding model, and on a CPU box that can't hold them all,
+# Ollama evicts whichever it likes and the next call pays a cold load.
+# Here the models used recently are ranked by use and "pinned" greedily
+# while they fit in available RAM (as last sampled, plus what they already occupy):
+# pinned models get a long keep_alive, the rest a short one so they give
+# the memory back. Every call through ollama_client gets its keep_alive
+# from here, and prefetch() loads the model a task needs next while the
+# current step runs.
+
+COLD_LOADS = registry.counter(
+    "remotepilot_ollama_cold_loads_total", "Ollama calls that had to load their model first", ("model", "kind"))
+LOAD_LATENCY = registry.histogram(
+    "remotepilot_ollama_load_seconds", "Model load time reported by Ollama", ("model", "kind"),
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0))
+PRELOADS = registry.counter(
+    "remotepilot_ollama_preloads_total", "Background model preloads by outcome", ("model", "outcome"))
+
+MODEL_ENDPOINTS = ("/api/generate", "/api/chat", "/api/embeddings", "/api/embed")
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+
+def keep_alive_seconds(keep_alive: Any) -> float:
+    """Ollama keep_alive ("30m", "45s", 300, -1) in seconds; negative is forever."""
+    if isinstance(keep_alive, (int, float)):
+        return float("inf") if keep_alive < 0 else float(keep_alive)
+    text = str(keep_alive).strip()
+    if text.startswith("-"):
+        return float("inf")
+    m = _DURATION.match(text)
+    return float(m.group(1)) * _UNITS[m.group(2)] if m else 300.0 # Ollama's default is 5m
+
+def canonical(model: str) -> str:
+    # "llama3.2" and "llama3.2:latest" are the same model to Ollama
+    return model if ":" in model else f"{model}:latest"
+
+def _available_ram() -> int:
+    # The background sampler's reading; psutil directly only before its first sample
+    available = sampler.latest().get("ram_available")
+    return available if available is not None else psutil.virtual_memory().available
+
+def _is_call(payload: Dict[str, Any]) -> bool:
+    # A payload with nothing to process just loads the model
+    return any(k in payload for k in ("prompt", "messages", "input"))
+
+class ModelResidency:
+    def __init__(self, keep_alive: str = os.environ.get("REMOTEPILOT_KEEP_ALIVE", "30m"),
+                 transient_keep_alive: str = "2m", reserve_bytes: int = 1 << 30, window: float = 600.0,
+                 cold_threshold: float = 0.5, refresh_interval: float = 10.0,
+                 available_ram: Callable[[], int] = _available_ram):
+        self.keep_alive_long = keep_alive
+        self.keep_alive_transient = transient_keep_alive # long enough to cover a step
+        self.reserve_bytes = reserve_bytes # RAM left for everything else
+        self.window = window # uses older than this don't count
+        self.cold_threshold = cold_threshold # load_duration above this is a cold load
+        self.refresh_interval = refresh_interval
+        self.available_ram = available_ram
+        self.ollama_url: Optional[str] = None
+        self.sizes: Dict[str, int] = {} # model -> bytes, from /api/tags and /api/ps
+        self.loaded: Dict[str, float] = {} # model -> monotonic time Ollama will unload it
+        self.uses: Dict[str, deque] = defaultdict(lambda: deque(maxlen=256))
+        self._preloading: Dict[str, asyncio.Task] = {}
+        self._refreshed = 0.0
+        registry.gauge("remotepilot_ollama_resident_models", "Models Ollama holds in memory, as last seen",
+                       fn=lambda: len(self.resident()))
+
+    def resident(self) -> Set[str]:
+        now = time.monotonic()
+        return {m for m, expires in self.loaded.items() if expires > now}
+
+    def pinned(self) -> Set[str]:
+        """Recently used models, most used first, that fit in RAM together."""
+        now = time.monotonic()
+        counts = {m: sum(1 for t in q if now - t < self.window) for m, q in self.uses.items()}
+        budget = self.available_ram() + sum(self.sizes.get(m, 0) for m in self.resident()) - self.reserve_bytes
+        pinned, used = set(), 0
+        for model in sorted((m for m, c in counts.items() if c), key=lambda m: -counts[m]):
+            size = self.sizes.get(model, 0)
+            if used + size <= budget:
+                pinned.add(model)
+                used += size
+        return pinned
+
+    def keep_alive(self, model: str) -> str:
+        return self.keep_alive_long if canonical(model) in self.pinned() else self.keep_alive_transient
+
+    def apply(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """The payload with a keep_alive for its model, unless the caller chose one."""
+        model = payload.get("model")
+        if not model or urlparse(url).path not in MODEL_ENDPOINTS:
+            return payload
+        parsed = urlparse(url)
+        self.ollama_url = f"{parsed.scheme}://{parsed.netloc}"
+        if _is_call(payload):
+            self.uses[canonical(model)].append(time.monotonic())
+        if "keep_alive" in payload:
+            return payload
+        return dict(payload, keep_alive=self.keep_alive(model))
+
+    def observe(self, payload: Dict[str, Any], response):
+        """Bookkeeping after a successful call: the model is loaded, and was it cold?"""
+        model = payload.get("model")
+        try:
+            result = response.json()
+        except ValueError:
+            return
+        if not model or not isinstance(result, dict):
+            return
+        kind = "request" if _is_call(payload) else "preload"
+        self.loaded[canonical(model)] = time.monotonic() + keep_alive_seconds(payload.get("keep_alive", "5m"))
+        load = result.get("load_duration", 0) / 1e9
+        if load > self.cold_threshold:
+            COLD_LOADS.inc(model=model, kind=kind)
+            LOAD_LATENCY.observe(load, model=model, kind=kind)
+            print(f"[Residency] {model} cold-loaded in {load:.1f}s ({kind})")
+
+    async def refresh(self, force: bool = False):
+        """Model sizes and what Ollama actually has loaded (it may have evicted something)."""
+        if not self.ollama_url or (not force and time.monotonic() - self._refreshed < self.refresh_interval):
+            return
+        from ollama_client import ollama_get
+        self._refreshed = time.monotonic()
+        try:
+            if not self.sizes:
+                tags = (await ollama_get(f"{self.ollama_url}/api/tags", timeout=5)).json()
+                self.sizes.update({canonical(m["name"]): m.get("size", 0) for m in tags.get("models", [])})
+            ps = (await ollama_get(f"{self.ollama_url}/api/ps", timeout=5)).json()
+        except Exception as e:
+            print(f"[Residency] Refresh failed: {e}")
+            return
+        now, wall = time.monotonic(), datetime.now(timezone.utc)
+        self.loaded = {}
+        for m in ps.get("models", []):
+            name = canonical(m["name"])
+            self.sizes[name] = m.get("size", self.sizes.get(name, 0))
+            try:
+                remaining = (datetime.fromisoformat(m["expires_at"].replace("Z", "+00:00")) - wall).total_seconds()
+            except (KeyError, ValueError):
+                remaining = 300.0
+            self.loaded[name] = now + remaining
+
+    def prefetch(self, model: Optional[str], ollama_url: Optional[str] = None):
+        """Starts loading `model` in the background unless it is loaded or loading already."""
+        key = canonical(model or "")
+        if not model or key in self._preloading or not (ollama_url or self.ollama_url):
+            return
+        task = asyncio.create_task(self.preload(model, ollama_url))
+        self._preloading[key] = task
+        task.add_done_callback(lambda _: self._preloading.pop(key, None))
+
+    async def preload(self, model: str, ollama_url: Optional[str] = None, keep_alive: Optional[str] = None) -> bool:
+        """Loads `model` now; keep_alive defaults to what its recent use earns it."""
+        from ollama_client import ollama_post
+        self.ollama_url = ollama_url or self.ollama_url
+        await self.refresh()
+        if canonical(model) in self.resident():
+            PRELOADS.inc(model=model, outcome="resident")
+            return True
+        try:
+            response = await ollama_post(f"{self.ollama_url}/api/generate",
+                                         json={"model": model, "keep_alive": keep_alive or self.keep_alive(model)}, timeout=300)
+        except Exception as e:
+            PRELOADS.inc(model=model, outcome="failed")
+            print(f"[Residency] Preloading {model} failed: {e}")
+            return False
+        ok = response.status_code == 200
+        PRELOADS.inc(model=model, outcome="loaded" if ok else "failed")
+        return ok
+
+residency = ModelResidency()
@@ -0,0 +1,115 @@
+import re
+from typing import Dict, Any, List, Optional
+from metrics import registry
+from capabilities import ACTION_CAPABILITIES
+from prompt_builder import estimate_tokens # re-exported for observation users
+
+# Prompt tokens one screenshot costs llava (CLIP ViT-L/14 at 336px: 24x24 patches)
+LLAVA_IMAGE_TOKENS = 576
+
+OBSERVATION_LATENCY = registry.histogram(
+    "remotepilot_observation_seconds", "Time to observe the screen or page by source", ("source",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+OBSERVATION_TOKENS = registry.counter(
+    "remotepilot_observation_tokens_total", "Estimated prompt tokens spent on observations by source", ("source",))
+
+# Runs in the page: visible interactive elements plus headings and live
+# regions, in document order, with a selector the planner can reuse.
+SNAPSHOT_JS = """
+() => {
+  const QUERY = 'a[href],button,input,select,textarea,summary,[role],[contenteditable="true"],'
+              + '[onclick],[tabindex]:not([tabindex="-1"]),h1,h2,h3,[aria-live]';
+  const ROLES = {A: 'link', BUTTON: 'button', SELECT: 'combobox', TEXTAREA: 'textbox', SUMMARY: 'button',
+                 H1: 'heading', H2: 'heading', H3: 'heading'};
+  const INPUT_ROLES = {checkbox: 'checkbox', radio: 'radio', submit: 'button', button: 'button',
+                       reset: 'button', range: 'slider', search: 'searchbox'};
+  const clean = s => (s || '').replace(/\\s+/g, ' ').trim();
+  const quote = s => JSON.stringify(s);
+  const label = el => {
+    const by = el.getAttribute('aria-labelledby');
+    if (by) return clean(by.split(/\\s+/).map(id => document.getElementById(id)?.innerText).join(' '));
+    if (el.labels && el.labels.length) return clean(el.labels[0].innerText);
+    return clean(el.getAttribute('aria-label') || el.getAttribute('placeholder') || el.getAttribute('alt')
+                 || el.getAttribute('title') || (el.tagName === 'INPUT' ? '' : el.innerText));
+  };
+  const selector = el => {
+    const tag = el.tagName.toLowerCase();
+    if (el.id && document.querySelectorAll('#' + CSS.escape(el.id)).length === 1) return '#' + CSS.escape(el.id);
+    for (const attr of ['name', 'aria-label', 'placeholder', 'data-testid']) {
+      const v = el.getAttribute(attr);
+      if (v && document.querySelectorAll(`${tag}[${attr}=${quote(v)}]`).length === 1) return `${tag}[${attr}=${quote(v)}]`;
+    }
+    const text = clean(el.innerText).slice(0, 40);
+    return text ? `${tag}:has-text(${quote(text)})` : null;
+  };
+  const elements = [];
+  for (const el of document.querySelectorAll(QUERY)) {
+    const rect = el.getBoundingClientRect();
+    const style = getComputedStyle(el);
+    if (!rect.width || !rect.height || style.visibility === 'hidden' || style.display === 'none') continue;
+    const type = (el.getAttribute('type') || '').toLowerCase();
+    elements.push({
+      role: el.getAttribute('role') || (el.tagName === 'INPUT' ? INPUT_ROLES[type] || 'textbox' : ROLES[el.tagName])
+            || (el.isContentEditable ? 'textbox' : el.tagName.toLowerCase()),
+      name: label(el).slice(0, 200),
+      selector: selector(el),
+      type: type,
+      value: 'value' in el && el.tagName !== 'BUTTON' ? String(el.value) : null,
+      checked: 'checked' in el && ['checkbox', 'radio'].includes(type) ? el.checked : null,
+      disabled: !!el.disabled || el.getAttribute('aria-disabled') === 'true',
+      in_viewport: rect.bottom > 0 && rect.top < innerHeight && rect.right > 0 && rect.left < innerWidth,
+    });
+  }
+  return {url: location.href, title: document.title, elements: elements};
+}
+"""
+
+_TEXT_SELECTOR = re.compile(r':has-text\("(.*)"\)$')
+
+def is_browser_step(step: Optional[Dict[str, Any]]) -> bool:
+    return bool(step) and ACTION_CAPABILITIES.get(str(step.get("action", "")).upper()) == "browser"
+
+def _line(i: int, el: Dict[str, Any], max_name: int) -> str:
+    name = el.get("name") or ""
+    if len(name) > max_name:
+        name = name[:max_name - 1] + "…"
+    selector = el.get("selector") or ""
+    parts = [f"[{i}] {el.get('role') or 'element'}"]
+    by_text = _TEXT_SELECTOR.search(selector)
+    if name and not (by_text and el["name"].startswith(by_text.group(1))): # else the selector already says it
+        parts.append(f'"{name}"')
+    if selector:
+        parts.append(selector)
+    if el.get("value") and el.get("type") != "password": # never hand a password to a model
+        parts.append(f'value="{el["value"][:max_name]}"')
+    if el.get("checked") is not None:
+        parts.append("checked" if el["checked"] else "unchecked")
+    if el.get("disabled"):
+        parts.append("disabled")
+    return " ".join(parts)
+
+def format_snapshot(snapshot: Dict[str, Any], max_chars: int = 4000, max_name: int = 80) -> str:
+    """
+    Text observation of a page snapshot (SNAPSHOT_JS): one line per
+    element, unnamed and duplicate elements dropped, elements in the
+    viewport first, cut off at `max_chars` with a count of what was left out.
+    """
+    header = f"Page: {snapshot.get('title') or '(untitled)'} <{snapshot.get('url', '')}>"
+    seen, elements = set(), []
+    for el in snapshot.get("elements") or []:
+        key = (el.get("role"), el.get("name"), el.get("selector"))
+        if not (el.get("name") or el.get("selector")) or key in seen:
+            continue
+        seen.add(key)
+        elements.append(el)
+    elements.sort(key=lambda el: not el.get("in_viewport", True)) # stable: document order within each group
+
+    lines, size = [header], len(header)
+    for i, el in enumerate(elements):
+        line = _line(i + 1, el, max_name)
+        if size + len(line) + 1 > max_chars - 40: # room for the trailer
+            lines.append(f"(+{len(elements) - i} more elements not shown)")
+            break
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
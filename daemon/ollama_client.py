@@ -0,0 +1,107 @@
+import time
+import hashlib
+import json as jsonlib
+import asyncio
+import requests
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional
+from metrics import registry
+from tracing import tracer
+from watchdog import report_progress
+from model_residency import residency
+
+# Every Ollama HTTP call goes through here so latency and errors are
+# recorded in one place. Call sites keep working with requests.Response.
+#
+# Async calls are single-flight: while a request is in flight, an identical
+# one (same URL, model and normalized payload) waits for it and gets the
+# same response instead of hitting Ollama again. Bursts of tasks started
+# together (cron jobs firing the same minute) otherwise send the same
+# embedding, intent review and /api/tags calls side by side.
+
+OLLAMA_LATENCY = registry.histogram(
+    "remotepilot_ollama_request_seconds", "Ollama HTTP request latency", ("endpoint", "model"))
+OLLAMA_REQUESTS = registry.counter(
+    "remotepilot_ollama_requests_total", "Ollama HTTP requests by outcome", ("endpoint", "model", "outcome"))
+OLLAMA_COALESCED = registry.counter(
+    "remotepilot_ollama_coalesced_total", "Calls answered by an identical in-flight Ollama request",
+    ("endpoint", "model"))
+
+# Payload keys that don't change the response
+_NON_SEMANTIC_KEYS = ("keep_alive",)
+_inflight: Dict[tuple, asyncio.Future] = {}
+
+def _flight_key(method: str, url: str, payload: Optional[Dict[str, Any]]) -> tuple:
+    body = {k: v for k, v in (payload or {}).items() if k not in _NON_SEMANTIC_KEYS}
+    normalized = jsonlib.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    # A digest, not the text: bodies carry base64 screenshots megabytes long
+    return (method, url.rstrip("/"), body.get("model", ""), hashlib.sha256(normalized.encode()).digest())
+
+async def _single_flight(key: tuple, call) -> requests.Response:
+    """Awaits the in-flight future for `key`, starting `call` in a thread if there is none."""
+    flight = _inflight.get(key)
+    if flight is not None:
+        OLLAMA_COALESCED.inc(endpoint=urlparse(key[1]).path, model=key[2])
+    else:
+        flight = asyncio.ensure_future(asyncio.to_thread(call))
+        _inflight[key] = flight
+
+        def landed(f):
+            if _inflight.get(key) is f:
+                del _inflight[key]
+            if not f.cancelled():
+                f.exception() # Retrieved, even if every waiter was cancelled
+        flight.add_done_callback(landed)
+    # Shielded: a cancelled waiter (e.g. an aborted task) leaves the call
+    # running for the others
+    return await asyncio.shield(flight)
+
+def _record(url: str, model: str, start: float, outcome: str):
+    endpoint = urlparse(url).path
+    OLLAMA_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, model=model)
+    OLLAMA_REQUESTS.inc(endpoint=endpoint, model=model, outcome=outcome)
+
+def _outcome(response: requests.Response) -> str:
+    return "ok" if response.status_code == 200 else f"http_{response.status_code}"
+
+def ollama_post_sync(url: str, json: Dict[str, Any], timeout: Optional[float] = None) -> requests.Response:
+    model = json.get("model", "")
+    json = residency.apply(url, json) # keep_alive by what fits in RAM
+    start = time.perf_counter()
+    try:
+        response = requests.post(url, json=json, timeout=timeout)
+    except Exception:
+        _record(url, model, start, "error")
+        raise
+    _record(url, model, start, _outcome(response))
+    if response.status_code == 200:
+        residency.observe(json, response)
+    return response
+
+async def ollama_post(url: str, json: Dict[str, Any], timeout: Optional[float] = None,
+                      coalesce: bool = True) -> requests.Response:
+    """requests.post on a worker thread, instrumented and coalesced with identical in-flight calls."""
+    with tracer.span(urlparse(url).path, "ollama", model=json.get("model", "")):
+        try:
+            if not coalesce:
+                return await asyncio.to_thread(ollama_post_sync, url, json, timeout)
+            return await _single_flight(_flight_key("POST", url, json),
+                                        lambda: ollama_post_sync(url, json, timeout))
+        finally:
+            # A completed model call counts as progress for the hang watchdog
+            report_progress()
+
+async def ollama_get(url: str, timeout: Optional[float] = None) -> requests.Response:
+    """requests.get on a worker thread, instrumented and coalesced."""
+    with tracer.span(urlparse(url).path, "ollama"):
+        return await _single_flight(_flight_key("GET", url, None), lambda: ollama_get_sync(url, timeout))
+
+def ollama_get_sync(url: str, timeout: Optional[float] = None) -> requests.Response:
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, timeout=timeout)
+    except Exception:
+        _record(url, "", start, "error")
+        raise
+    _record(url, "", start, _outcome(response))
+    return response
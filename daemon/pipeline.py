@@ -0,0 +1,140 @@
+import time
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import registry
+from observation import is_browser_step
+
+# act -> verify, overlapped. process_task used to run a step strictly in
+# order: the action, then the verifier took a screenshot, encoded it and
+# asked the VLM, and only then did anything happen for the next step.
+# StepPipeline starts the screenshot the moment the action returns (after
+# the screen stops changing, which also replaces the planner's fixed WAIT
+# guesses), and does the next step's setup that can't disturb the desktop
+# (launching the browser) while this one is verified.
+# $REMOTEPILOT_PIPELINE=0 keeps the serial path.
+
+SETTLE_TIME = registry.histogram(
+    "remotepilot_settle_seconds", "Time for the screen to stop changing after a step", ("kind",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0))
+WAIT_SAVED = registry.counter(
+    "remotepilot_wait_saved_seconds_total", "Planned WAIT time skipped because the screen had settled")
+
+def signature(image, size: Tuple[int, int] = (160, 90)):
+    """Small grayscale copy of a frame; enough to tell whether the screen is still changing."""
+    import numpy as np
+    return np.asarray(image.convert("L").resize(size), dtype=np.int16)
+
+def changed(a, b, pixel_delta: int = 12, fraction: float = 0.002) -> bool:
+    # A blinking cursor moves a pixel or two of the thumbnail; a repaint moves many
+    return (abs(a - b) > pixel_delta).mean() > fraction
+
+async def settle(capture: Callable[[], Any], timeout: float = 3.0, interval: float = 0.1,
+                 quiet: int = 2, since=None) -> Tuple[Any, float]:
+    """
+    Captures until `quiet` consecutive frames show no change, or until
+    `timeout`. With `since` (a signature()) the screen must first differ
+    from it: a screen that hasn't started changing yet isn't settled.
+    Returns the last frame (so it needn't be taken again) and the time it
+    took.
+    """
+    start = time.perf_counter()
+    previous, still, moved = None, 0, since is None
+    while True:
+        frame = await asyncio.to_thread(capture)
+        current = signature(frame)
+        if previous is not None:
+            still = 0 if changed(previous, current) else still + 1
+        if not moved and changed(since, current):
+            moved, still = True, 0
+        previous = current
+        if (moved and still >= quiet) or time.perf_counter() - start >= timeout:
+            return frame, time.perf_counter() - start
+        await asyncio.sleep(interval)
+
+def _quiet(task: asyncio.Task):
+    # Speculative work nobody awaited (the task was cancelled first) must not warn
+    if not task.cancelled():
+        task.exception()
+
+class StepPipeline:
+    def __init__(self, coordinator, settle_timeout: float = 3.0, interval: float = 0.05):
+        self.coordinator = coordinator # agents are looked up when used, as main does
+        self.settle_timeout = settle_timeout # longest an action's effects are waited for
+        self.interval = interval
+        self._settled = None # frame a WAIT ended on: what its verification sees
+        self._acted = None # signature() of the screen right after the last action returned
+
+    @property
+    def vision(self):
+        return self.coordinator.vision
+
+    @property
+    def action(self):
+        return self.coordinator.action
+
+    def needs_screenshot(self, step: Dict[str, Any]) -> bool:
+        # Recipe steps are checked in the DOM and browser steps observed through it
+        return step.get("expect") is None and self.vision.model_for(step) == "llava"
+
+    async def wait(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A WAIT step: until the screen has changed since the last action and
+        settled again, at most the planned time. A screen that never changes
+        (the app is still starting) gets the full planned time.
+        """
+        since, self._acted = self._acted, None
+        try:
+            planned = float(step.get("value") or 0)
+            if since is None:
+                since = signature(await asyncio.to_thread(self.vision.capture))
+            self._settled, waited = await settle(self.vision.capture, timeout=planned, interval=self.interval,
+                                                 since=since)
+        except Exception as e:
+            # Unparseable values get the same error (and re-plan) as on the serial path
+            print(f"[Pipeline] Can't settle this WAIT ({e}); running it as planned")
+            return await self.action.execute(step)
+        SETTLE_TIME.observe(waited, kind="wait")
+        WAIT_SAVED.inc(max(planned - waited, 0))
+        return {"status": "success", "detail": f"Screen settled after {waited:.1f}s (planned {planned:g}s)"}
+
+    def after_action(self, step: Dict[str, Any]) -> Optional[asyncio.Task]:
+        """Starts settling, capturing and encoding the screen for the verifier; None if it won't need one."""
+        frame, self._settled, self._acted = self._settled, None, None
+        if not self.needs_screenshot(step):
+            return None
+        task = asyncio.create_task(self._screenshot(frame))
+        task.add_done_callback(_quiet)
+        return task
+
+    async def _screenshot(self, frame=None) -> str:
+        if frame is not None:
+            self._acted = signature(frame)
+        else:
+            def capture():
+                frame = self.vision.capture()
+                if self._acted is None: # the first frame: what a following WAIT compares against
+                    self._acted = signature(frame)
+                return frame
+            frame, waited = await settle(capture, timeout=self.settle_timeout, interval=self.interval)
+            SETTLE_TIME.observe(waited, kind="action")
+        return await asyncio.to_thread(self.vision.encode_png_b64, frame)
+
+    def prepare(self, step: Optional[Dict[str, Any]]) -> Optional[asyncio.Task]:
+        """The next step's setup, run while this one is verified; only what leaves the screen alone."""
+        prepare = getattr(self.action, "prepare", None)
+        if not step or not prepare or not is_browser_step(step):
+            return None
+        task = asyncio.create_task(prepare(step))
+        task.add_done_callback(_quiet)
+        return task
+
+    async def screenshot(self, pending: Optional[asyncio.Task]) -> Optional[str]:
+        """The speculative screenshot, or None so the verifier captures its own."""
+        if pending is None:
+            return None
+        try:
+            return await pending
+        except Exception as e:
+            print(f"[Pipeline] Speculative capture failed: {e}")
+            return None
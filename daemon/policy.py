@@ -0,0 +1,108 @@
+import os
+import re
+import json
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy_rules.json")
+
+_IFS = re.compile(r"\$\{?ifs\}?")
+_STRIP = str.maketrans("", "", "\"'`\\")
+
+def normalize_command(text: str) -> str:
+    """
+    Canonical form used for matching: lower-cased, shell quoting and
+    escapes removed ("r'm' -\\rf" -> "rm -rf"), $IFS tricks and runs of
+    whitespace collapsed to a single space.
+    """
+    text = str(text).lower()
+    if "$" in text:
+        text = _IFS.sub(" ", text)
+    return " ".join(text.translate(_STRIP).split())
+
+class RuleGroup:
+    """
+    All rules of one group compiled into a single alternation regex.
+    Input is already lower-cased by normalize_command, so patterns are
+    matched case-sensitively (and must be written in lower case); that
+    keeps the regex engine's literal-prefix scan enabled.
+    """
+    def __init__(self, patterns: List[str], literals: List[str]):
+        sources = list(patterns) + [re.escape(normalize_command(l)) for l in literals]
+        self.rules = list(patterns) + list(literals)
+        self._single = [re.compile(s) for s in sources]
+        self.regex = re.compile("|".join(f"(?:{s})" for s in sources)) if sources else None
+
+    def match(self, normalized: str) -> Optional[str]:
+        if not self.regex or not self.regex.search(normalized):
+            return None
+        # Only on a hit: find which rule fired, for the block reason
+        for rule, single in zip(self.rules, self._single):
+            if single.search(normalized):
+                return rule
+        return None
+
+class PolicyEngine:
+    """
+    Shared rule matcher for SecurityAgent and SafetyAgent.
+    Rules are loaded from a JSON file ({"<group>": {"patterns": [...], "literals": [...]}})
+    and reloaded when the file's mtime changes (checked at most every `reload_interval` s).
+    A broken file keeps the previously loaded rules.
+    """
+    def __init__(self, rules_file: str = DEFAULT_RULES_FILE, reload_interval: float = 2.0):
+        self.rules_file = rules_file
+        self.reload_interval = reload_interval
+        self.groups: Dict[str, RuleGroup] = {}
+        self._mtime = None
+        self._next_check = 0.0
+        self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+            with open(self.rules_file, "r") as f:
+                config = json.load(f)
+            self.groups = {
+                name: RuleGroup(spec.get("patterns", []), spec.get("literals", []))
+                for name, spec in config.items()
+            }
+            self._mtime = mtime
+            print(f"[Policy] Loaded {sum(len(g.rules) for g in self.groups.values())} rules from {self.rules_file}")
+        except (OSError, ValueError, re.error) as e:
+            print(f"[Policy] Failed to load rules ({e}), keeping previous rules")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.reload_interval
+        try:
+            mtime = os.stat(self.rules_file).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self._load()
+
+    def scan(self, text: str, group: str) -> Optional[str]:
+        """Returns the first rule of `group` matching `text`, or None."""
+        self._maybe_reload()
+        rules = self.groups.get(group)
+        if not rules or not text:
+            return None
+        return rules.match(normalize_command(text))
+
+    def scan_plan(self, plan: List[Dict[str, Any]], group: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Scans every step's value once. Returns (step, rule) for the first hit."""
+        self._maybe_reload()
+        rules = self.groups.get(group)
+        if not rules:
+            return None
+        for step in plan:
+            value = step.get("value", "")
+            if value:
+                rule = rules.match(normalize_command(value))
+                if rule:
+                    return step, rule
+        return None
+
+policy_engine = PolicyEngine()
@@ -0,0 +1,98 @@
+import os
+import re
+import math
+from typing import Any, Dict, List, Tuple
+
+# Ollama runs models with a 2048-token context unless told otherwise, and
+# changing num_ctx per call reloads the model, so prompts are budgeted to
+# fit it with room for the answer. $REMOTEPILOT_PROMPT_BUDGET overrides.
+PROMPT_BUDGETS = {"default": 1536}
+
+# Pieces a llama-style BPE pre-tokenizer splits text into: words with their
+# leading space, up to 3 digits, punctuation runs, whitespace
+_PIECES = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count under a llama-style tokenizer, without loading one."""
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        core = piece.strip()
+        if not core:
+            tokens += 1
+        elif core[0].isalpha():
+            tokens += 1 + (len(core) - 1) // 7 # common words are one token, long ones a few
+        else:
+            tokens += math.ceil(len(core) / 2)
+    return tokens
+
+def budget_for(model: str) -> int:
+    configured = os.environ.get("REMOTEPILOT_PROMPT_BUDGET")
+    if configured:
+        return int(configured)
+    return PROMPT_BUDGETS.get(model.split(":")[0], PROMPT_BUDGETS["default"])
+
+def compact_plan(plan: Any, max_value: int = 60) -> str:
+    """'BROWSE https://x; CLICK_BROWSER #send' instead of the plan's JSON: a third of the tokens."""
+    if not isinstance(plan, list):
+        return truncate(str(plan), max_value)
+    steps = []
+    for step in plan:
+        if not isinstance(step, dict):
+            steps.append(truncate(str(step), max_value))
+            continue
+        parts = [str(step.get("action", "?"))]
+        for key in ("selector", "value", "url"):
+            if step.get(key) not in (None, ""):
+                parts.append(truncate(str(step[key]), max_value))
+        steps.append(" ".join(parts))
+    return "; ".join(steps)
+
+def truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+def _cut(text: str, tokens: int) -> str:
+    """`text` cut from the end to at most `tokens` (ellipsis included)."""
+    if tokens <= 0:
+        return ""
+    while estimate_tokens(text) > tokens and text and text != "…":
+        # Chars per token of this text, so the cut lands near `tokens`
+        keep = min(int(len(text) * tokens / estimate_tokens(text)), len(text) - 2)
+        text = text[:max(keep - 1, 0)] + "…"
+    return text
+
+class PromptBuilder:
+    """
+    Assembles a prompt from sections under a token budget. Sections keep
+    their order; when over budget, the lowest-priority section is cut from
+    the end down to its `min_tokens`, or dropped if that's 0, and so on up
+    the priorities. Required sections are never touched.
+    """
+    def __init__(self, budget: int, reserved: int = 0):
+        self.budget = budget - reserved # e.g. the system prompt or a carried-over context
+        self.sections: List[Dict[str, Any]] = []
+
+    def add(self, text: str, priority: int = 0, min_tokens: int = 0, required: bool = False) -> "PromptBuilder":
+        if text:
+            self.sections.append({"text": text, "priority": priority, "min_tokens": min_tokens,
+                                  "required": required, "tokens": estimate_tokens(text) + 1}) # + newline
+        return self
+
+    def build(self) -> Tuple[str, int, List[str]]:
+        """(prompt, estimated tokens, notes on what was cut)."""
+        cuts = []
+        over = sum(s["tokens"] for s in self.sections) - self.budget
+        for section in sorted((s for s in self.sections if not s["required"]), key=lambda s: s["priority"]):
+            if over <= 0:
+                break
+            keep = max(section["tokens"] - over, section["min_tokens"])
+            if keep <= 1: # a newline and nothing else
+                over -= section["tokens"]
+                cuts.append(f"dropped {section['tokens']} tokens: {section['text'][:30]!r}")
+                section["text"], section["tokens"] = "", 0
+            elif keep < section["tokens"]:
+                section["text"] = _cut(section["text"], keep - 1)
+                cuts.append(f"cut {section['tokens']}->{keep} tokens: {section['text'][:30]!r}")
+                over -= section["tokens"] - keep
+                section["tokens"] = keep
+        prompt = "\n".join(s["text"] for s in self.sections if s["text"])
+        return prompt, estimate_tokens(prompt), cuts
@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import sqlite3
+from collections import Counter, defaultdict
+from urllib.parse import quote
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_RECIPES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.json")
+
+# Actions a recipe may contain. All of them run in the browser and can be
+# checked against the DOM, which is what makes a recipe safe to replay
+# without the planner or the VLM verifier.
+RECIPE_ACTIONS = ("BROWSE", "CLICK_BROWSER", "FILL_BROWSER", "WAIT")
+
+_PLACEHOLDER = re.compile(r"\{([A-Za-z_]\w*)(?:\|(\w+))?\}") # not regex quantifiers like {2}
+_FILTERS = {"url": lambda v: quote(v, safe="")}
+
+def normalize_goal(goal: str) -> str:
+    return " ".join(str(goal).split()).rstrip(".!")
+
+def _intent_regex(intent: str) -> "re.Pattern":
+    # "{name}" is a parameter; everything else is regex written by the recipe author
+    pattern = _PLACEHOLDER.sub(lambda m: f"(?P<{m.group(1)}>.+?)", intent)
+    return re.compile(pattern.replace(" ", r"\s+"), re.IGNORECASE)
+
+def _fill(value: Any, params: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        def sub(m):
+            name, flt = m.group(1), m.group(2)
+            if name not in params:
+                raise KeyError(name)
+            return _FILTERS[flt](params[name]) if flt else params[name]
+        return _PLACEHOLDER.sub(sub, value)
+    if isinstance(value, dict):
+        return {k: _fill(v, params) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, params) for v in value]
+    return value
+
+class Recipe:
+    """
+    A parameterized plan: goals matching one of `intents` become `steps`
+    with the captured parameters filled in ("{to}", or "{to|url}" to
+    URL-encode). Each step's "expect" is checked against the DOM.
+    """
+    def __init__(self, name: str, intents: List[Any], steps: List[Dict[str, Any]], domain: str = "",
+                 defaults: Optional[Dict[str, str]] = None, source: str = "library"):
+        for step in steps:
+            if str(step.get("action", "")).upper() not in RECIPE_ACTIONS:
+                raise ValueError(f"Recipe {name}: {step.get('action')} is not a browser action")
+        self.name = name
+        self.domain = domain
+        self.intents = [i if isinstance(i, re.Pattern) else _intent_regex(i) for i in intents]
+        self.steps = steps
+        self.defaults = defaults or {}
+        self.source = source
+
+    def match(self, goal: str) -> Optional[Dict[str, str]]:
+        goal = normalize_goal(goal)
+        for intent in self.intents:
+            m = intent.fullmatch(goal)
+            if m:
+                params = dict(self.defaults)
+                params.update({k: v.strip().strip("\"'") for k, v in m.groupdict().items() if v is not None})
+                return params
+        return None
+
+    def plan(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        steps = _fill(self.steps, params)
+        for step in steps:
+            step.setdefault("expect", {}) # DOM-verified, even if only "the action succeeded"
+            step["recipe"] = self.name
+        return steps
+
+class RecipeLibrary:
+    """Hand-written recipes from recipes.json plus any compiled from task history."""
+    def __init__(self, recipes_file: str = DEFAULT_RECIPES_FILE):
+        self.recipes_file = recipes_file
+        self.recipes: List[Recipe] = []
+        self.compiled: List[Recipe] = []
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.recipes_file, "r") as f:
+                config = json.load(f)
+            self.recipes = [Recipe(r["name"], r["intents"], r["steps"], r.get("domain", ""), r.get("defaults"))
+                            for r in config.get("recipes", [])]
+            print(f"[Recipes] Loaded {len(self.recipes)} recipes from {self.recipes_file}")
+        except (OSError, ValueError, KeyError, re.error) as e:
+            print(f"[Recipes] Failed to load recipes ({e}), keeping previous recipes")
+
+    def match(self, goal: str, domain: str = "") -> Optional[Tuple[Recipe, List[Dict[str, Any]]]]:
+        """First recipe (hand-written before compiled) matching `goal`, with its filled-in plan."""
+        for recipe in self.recipes + self.compiled:
+            if domain and recipe.domain != domain:
+                continue
+            params = recipe.match(goal)
+            if params is None:
+                continue
+            try:
+                return recipe, recipe.plan(params)
+            except KeyError:
+                continue # Template needs a parameter this intent doesn't capture
+        return None
+
+def _shape(plan: List[Dict[str, Any]]) -> Optional[tuple]:
+    """Actions and selectors of a replayable plan; None if any step isn't a browser action."""
+    shape = []
+    for step in plan:
+        action = str(step.get("action", "")).upper()
+        if action not in RECIPE_ACTIONS:
+            return None
+        shape.append((action, step.get("selector", "")))
+    return tuple(shape)
+
+def _template(words: List[str], plan: List[Dict[str, Any]], varying: List[int]) -> Optional[str]:
+    """The plan with this run's varying goal words replaced by {p<i>}, as canonical JSON."""
+    text = json.dumps(plan, sort_keys=True)
+    for i in varying:
+        # Whole words only, so "in" doesn't eat into "input"
+        word = re.compile(r"(?<!\w)" + re.escape(json.dumps(words[i])[1:-1]) + r"(?!\w)", re.IGNORECASE)
+        text, count = word.subn(f"{{p{i}}}", text)
+        if not count:
+            return None # The plan doesn't use this word; can't be a parameter
+    return text
+
+def compile_history(db_path: str, min_successes: int = 2) -> List[Recipe]:
+    """
+    Recipes from successful runs in memory.db. Browser-only DONE plans are
+    grouped by goal length and plan shape. Goal words that differ between
+    runs become parameters when each run's plan uses them verbatim and the
+    plans are otherwise identical ("search the wiki for invoices" +
+    "... for receipts" -> "search the wiki for {p5}"). A goal that succeeded
+    `min_successes` times with the same plan becomes a literal recipe.
+    """
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT goal, plan FROM history WHERE status = 'DONE'").fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+    groups = defaultdict(list)
+    for goal, plan_json in rows:
+        try:
+            plan = json.loads(plan_json)
+        except (TypeError, ValueError):
+            continue
+        shape = _shape(plan) if isinstance(plan, list) and plan else None
+        if shape is None:
+            continue
+        words = normalize_goal(goal).lower().split()
+        groups[(len(words), shape)].append((words, plan))
+
+    recipes = []
+    for runs in groups.values():
+        if len(runs) < min_successes:
+            continue
+        recipe = _parameterized(runs)
+        if recipe is not None:
+            recipes.append(recipe)
+            continue
+        # Otherwise: goals that succeeded repeatedly with the same plan
+        counts = Counter((tuple(words), json.dumps(plan, sort_keys=True)) for words, plan in runs)
+        for (words, plan_json), n in counts.items():
+            if n >= min_successes:
+                recipes.append(_history_recipe(list(words), [], plan_json))
+    return recipes
+
+def _parameterized(runs) -> Optional[Recipe]:
+    if len({tuple(words) for words, _ in runs}) < 2:
+        return None
+    varying = [i for i in range(len(runs[0][0])) if len({w[i] for w, _ in runs}) > 1]
+    templates = {_template(words, plan, varying) for words, plan in runs}
+    if len(templates) != 1 or None in templates:
+        return None
+    return _history_recipe(runs[0][0], varying, templates.pop())
+
+def _history_recipe(words: List[str], varying: List[int], plan_json: str) -> Recipe:
+    pattern = r"\s+".join(f"(?P<p{i}>\\S+)" if i in varying else re.escape(w) for i, w in enumerate(words))
+    steps = json.loads(plan_json)
+    for step in steps:
+        step.pop("recipe", None)
+    name = "history:" + " ".join(f"{{p{i}}}" if i in varying else w for i, w in enumerate(words))
+    return Recipe(name, [re.compile(pattern, re.IGNORECASE)], steps, "history", source="history")
@@ -0,0 +1,106 @@
+import json
+import asyncio
+from typing import Callable, Awaitable, Any, Dict, List, AsyncIterator
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from metrics import registry
+
+# Remote command transports for high-latency links (e.g. the Cloudflare
+# tunnel): instead of one HTTPS round trip per command, clients pipeline
+# many commands over one WebSocket or one batch request.
+
+Handler = Callable[[str], Awaitable[Any]]
+
+RPC_REQUESTS = registry.counter(
+    "remotepilot_rpc_requests_total", "Remote commands received by transport", ("transport",))
+
+async def call(handler: Handler, command: str) -> Dict[str, Any]:
+    """Runs one command; the outcome is {"result": ...} or {"error": "..."}."""
+    try:
+        return {"result": jsonable_encoder(await handler(command))}
+    except Exception as e:
+        return {"error": str(e)}
+
+def _line(obj: Dict[str, Any]) -> bytes:
+    return (json.dumps(obj) + "\n").encode()
+
+async def ndjson_results(handler: Handler, commands: List[str], parallel: bool = False,
+                         max_concurrency: int = 8) -> AsyncIterator[bytes]:
+    """
+    Streams one {"index": i, "result"|"error": ...} line per command as soon as
+    it finishes. Sequential by default, since GUI and shell steps usually
+    depend on each other; `parallel` runs up to `max_concurrency` at once and
+    yields in completion order.
+    """
+    RPC_REQUESTS.inc(len(commands), transport="batch")
+    if not parallel:
+        for i, command in enumerate(commands):
+            yield _line({"index": i, **await call(handler, command)})
+        return
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(i, command):
+        async with semaphore:
+            return {"index": i, **await call(handler, command)}
+
+    tasks = [asyncio.create_task(run(i, c)) for i, c in enumerate(commands)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield _line(await next_done)
+    finally:
+        # Client went away mid-stream
+        for task in tasks:
+            task.cancel()
+
+async def serve_websocket(websocket: WebSocket, handler: Handler):
+    """
+    JSON RPC over one WebSocket. Requests are {"id": ..., "command": "..."}
+    and replies are {"id": ..., "result"|"error": ...}, matched by id.
+    Requests run in arrival order on one queue, so a client can pipeline a
+    whole sequence without waiting for replies; {"parallel": true} runs a
+    request (e.g. a read-only query) beside the queue instead.
+    """
+    await websocket.accept()
+    outbox: asyncio.Queue = asyncio.Queue()
+    ordered: asyncio.Queue = asyncio.Queue()
+    side_tasks = set()
+
+    async def writer():
+        # Single sender: Starlette WebSockets must not be written concurrently
+        while True:
+            await websocket.send_text(json.dumps(await outbox.get()))
+
+    async def run(req_id, command):
+        outbox.put_nowait({"id": req_id, **await call(handler, command)})
+
+    async def run_ordered():
+        while True:
+            await run(*await ordered.get())
+
+    workers = [asyncio.create_task(writer()), asyncio.create_task(run_ordered())]
+    try:
+        while True:
+            try:
+                msg = json.loads(await websocket.receive_text())
+            except ValueError:
+                outbox.put_nowait({"id": None, "error": "invalid JSON"})
+                continue
+            req_id = msg.get("id") if isinstance(msg, dict) else None
+            command = msg.get("command") if isinstance(msg, dict) else None
+            if not isinstance(command, str):
+                outbox.put_nowait({"id": req_id, "error": "missing 'command'"})
+                continue
+            RPC_REQUESTS.inc(transport="websocket")
+            if msg.get("parallel"):
+                task = asyncio.create_task(run(req_id, command))
+                side_tasks.add(task)
+                task.add_done_callback(side_tasks.discard)
+            else:
+                ordered.put_nowait((req_id, command))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in workers + list(side_tasks):
+            task.cancel()
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+
+import psutil
+
+FIELDS = ("cpu", "ram", "ram_available", "daemon_rss", "children_rss", "ollama_rss",
+          "disk_read_bps", "disk_write_bps", "net_sent_bps", "net_recv_bps")
+
+class SystemSampler:
+    """
+    Samples host and process resources every `interval` seconds on a
+    background thread into a fixed-size ring buffer. cpu_percent() is only
+    meaningful relative to the previous call, so a steady cadence is what
+    makes the numbers comparable; readers never call psutil themselves.
+
+    Each sample is (wall_ts, cpu %, ram %, available RAM bytes, daemon RSS, RSS of daemon children
+    (sandbox commands, browsers), Ollama RSS, disk and network bytes/s).
+    """
+    def __init__(self, interval: float = 2.0, capacity: int = 1800,
+                 cpu_limit: float = 90.0, ram_limit: float = 90.0, saturation_window: int = 3):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=capacity)
+        self.cpu_limit = cpu_limit
+        self.ram_limit = ram_limit
+        self.saturation_window = saturation_window # Consecutive samples averaged for admission
+        self._proc = psutil.Process(os.getpid())
+        self._ollama: Optional[psutil.Process] = None
+        self._ollama_scanned_at = 0.0
+        self._last_io: Optional[Tuple[float, Any, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Lifecycle ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        psutil.cpu_percent() # Prime the baseline for the first interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[Sampler] Sample failed: {e}")
+            self._stop.wait(self.interval)
+
+    # --- Collection ---
+    def _rss(self, proc: Optional[psutil.Process]) -> int:
+        try:
+            return proc.memory_info().rss if proc else 0
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return 0
+
+    def _ollama_process(self) -> Optional[psutil.Process]:
+        if self._ollama is not None and self._ollama.is_running():
+            return self._ollama
+        # Process scans are comparatively expensive; retry at most every 30s
+        now = time.monotonic()
+        if now - self._ollama_scanned_at < 30:
+            return None
+        self._ollama_scanned_at = now
+        self._ollama = None
+        for proc in psutil.process_iter(["name"]):
+            name = (proc.info.get("name") or "").lower()
+            if name.startswith("ollama"):
+                self._ollama = proc
+                break
+        return self._ollama
+
+    def _io_rates(self, now: float) -> Tuple[float, float, float, float]:
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        last, self._last_io = self._last_io, (now, disk, net)
+        if last is None:
+            return 0.0, 0.0, 0.0, 0.0
+        dt = max(now - last[0], 1e-6)
+        rate = lambda cur, prev, attr: (getattr(cur, attr) - getattr(prev, attr)) / dt if cur and prev else 0.0
+        return (rate(disk, last[1], "read_bytes"), rate(disk, last[1], "write_bytes"),
+                rate(net, last[2], "bytes_sent"), rate(net, last[2], "bytes_recv"))
+
+    def sample(self) -> tuple:
+        now = time.monotonic()
+        try:
+            children = self._proc.children(recursive=True)
+        except psutil.NoSuchProcess:
+            children = []
+        memory = psutil.virtual_memory()
+        sample = (
+            time.time(),
+            psutil.cpu_percent(),
+            memory.percent,
+            memory.available,
+            self._rss(self._proc),
+            sum(self._rss(c) for c in children),
+            self._rss(self._ollama_process()),
+            *self._io_rates(now),
+        )
+        self.samples.append(sample)
+        return sample
+
+    # --- Readers ---
+    def latest(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {}
+        sample = self.samples[-1]
+        return dict(zip(("ts",) + FIELDS, sample))
+
+    def history(self, window: float = 300.0, points: int = 120) -> Dict[str, Any]:
+        """Samples from the last `window` seconds, averaged down to at most `points` buckets."""
+        cutoff = time.time() - window
+        rows = [s for s in list(self.samples) if s[0] >= cutoff]
+        points = max(1, points)
+        step = max(1, -(-len(rows) // points)) # ceil
+        buckets = [rows[i:i + step] for i in range(0, len(rows), step)]
+        columns = list(zip(*[[sum(col) / len(bucket) for col in zip(*bucket)] for bucket in buckets])) if buckets else []
+        series = {name: [round(v, 2) for v in col] for name, col in zip(("ts",) + FIELDS, columns)}
+        return {
+            "interval": self.interval * step,
+            "window": window,
+            "ts": series.pop("ts", []),
+            "series": {name: series.get(name, []) for name in FIELDS},
+        }
+
+    def saturated(self) -> Optional[str]:
+        """Reason the host is too busy to admit work, or None."""
+        recent = list(self.samples)[-self.saturation_window:]
+        if len(recent) < self.saturation_window:
+            return None
+        cpu = sum(s[1] for s in recent) / len(recent)
+        ram = sum(s[2] for s in recent) / len(recent)
+        if cpu >= self.cpu_limit:
+            return f"CPU at {cpu:.0f}% (limit {self.cpu_limit:.0f}%)"
+        if ram >= self.ram_limit:
+            return f"RAM at {ram:.0f}% (limit {self.ram_limit:.0f}%)"
+        return None
+
+sampler = SystemSampler()
@@ -1,12 +1,41 @@
 import subprocess
 import os
+import signal
+import time
 import asyncio
 from typing import Dict, Tuple
 from .base import Sandbox
+from metrics import registry
+from tracing import tracer
+
+COMMAND_LATENCY = registry.histogram(
+    "remotepilot_sandbox_command_seconds", "Sandbox command wall-clock time", ("outcome",))
+
+if os.name == "nt":
+    NEW_GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    NEW_GROUP = {"start_new_session": True}
+
+def kill_tree(process):
+    """Kills a process started with NEW_GROUP and every child in its group."""
+    if process.returncode is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
 
 class ProcessSandbox(Sandbox):
     def __init__(self):
         self.active_processes = []
+        registry.gauge("remotepilot_sandbox_active_processes", "Sandbox subprocesses currently running",
+                       fn=lambda: len(self.active_processes))
 
     async def run_command(self, command: str, cwd: str = None, env: Dict[str, str] = None) -> Tuple[int, str, str]:
         # Security: Default to empty env to prevent inheriting sensitive host vars
@@ -17,33 +46,50 @@ class ProcessSandbox(Sandbox):
         # but we can restrict the environment and use specific users if configured.
         # For Phase 1 PoC, we rely on specific safe_env.
 
+        with tracer.span("sandbox.run_command", "sandbox", command=command[:200]):
+            return await self._run(command, cwd, safe_env)
+
+    async def _run(self, command: str, cwd: str, safe_env: Dict[str, str]) -> Tuple[int, str, str]:
+        process = None
+        start = time.perf_counter()
+        outcome = "error"
         try:
+            # Own process group, so a cancel kills the shell *and* whatever it spawned
             process = await asyncio.create_subprocess_shell(
                 command,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
-                env=safe_env
+                env=safe_env,
+                **NEW_GROUP
             )
             self.active_processes.append(process)
             
             stdout, stderr = await process.communicate()
+            outcome = "ok" if process.returncode == 0 else "nonzero_exit"
             
             return (
                 process.returncode,
                 stdout.decode() if stdout else "",
                 stderr.decode() if stderr else ""
             )
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            if process is not None:
+                kill_tree(process)
+                try:
+                    await asyncio.wait_for(process.wait(), 5) # reap, so the transport closes
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    pass
+            raise
         except Exception as e:
             return (-1, "", str(e))
         finally:
+            COMMAND_LATENCY.observe(time.perf_counter() - start, outcome=outcome)
             if process in self.active_processes:
                 self.active_processes.remove(process)
 
     def cleanup(self):
         for proc in self.active_processes:
-            try:
-                proc.terminate()
-            except:
-                pass
+            kill_tree(proc)
         self.active_processes = []
@@ -0,0 +1,128 @@
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import Dict, Any, Iterator, List, Tuple
+from metrics import registry
+
+# Append-only journal of task events (created, state, plan, step, log) in
+# SQLite WAL. append() only queues; one writer thread commits whatever has
+# queued since its last commit in a single transaction, so many events
+# share each fsync (group commit). flush() waits until everything appended
+# so far is on disk, for the few places that must not answer before that
+# (accepting a submission). A "snapshot" event (written when a task
+# finishes) holds the whole task, so committing one deletes that task's
+# earlier events: a finished task costs one row however long it ran.
+
+EVENT_BATCH = registry.histogram(
+    "remotepilot_task_log_batch_events", "Events written per task log commit",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000))
+EVENT_COMMIT_LATENCY = registry.histogram(
+    "remotepilot_task_log_commit_seconds", "Task log commit (fsync) time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+class TaskEventLog:
+    def __init__(self, path: str = "tasks.db"):
+        self.path = path
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL, seq INTEGER NOT NULL,
+            type TEXT NOT NULL, data TEXT NOT NULL, ts REAL NOT NULL)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_task ON events (task_id, seq)")
+        conn.commit()
+        conn.close()
+        self._pending: List[Tuple] = []
+        self._appended = 0
+        self._committed = 0
+        self._waiters = [] # (target, future)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="task-log-writer", daemon=True)
+        self._writer.start()
+
+    def replay(self) -> Iterator[Tuple[str, int, str, Dict[str, Any]]]:
+        """(task_id, seq, type, data) for every event written so far, oldest first."""
+        conn = sqlite3.connect(self.path)
+        try:
+            for task_id, seq, type_, data in conn.execute("SELECT task_id, seq, type, data FROM events ORDER BY id"):
+                yield task_id, seq, type_, json.loads(data)
+        finally:
+            conn.close()
+
+    def forget(self, task_ids: List[str]):
+        """Deletes every event of `task_ids` and gives the space back if it's most of the file."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.executemany("DELETE FROM events WHERE task_id = ?", [(t,) for t in task_ids])
+            free, = conn.execute("PRAGMA freelist_count").fetchone()
+            pages, = conn.execute("PRAGMA page_count").fetchone()
+            if free * 2 > pages:
+                conn.execute("VACUUM")
+        except sqlite3.Error as e:
+            print(f"[TaskLog] Compaction failed: {e}")
+        finally:
+            conn.close()
+
+    def append(self, task_id: str, seq: int, type_: str, data: Dict[str, Any]):
+        row = (task_id, seq, type_, json.dumps(data, default=str), time.time())
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append(row)
+            self._appended += 1
+            self._cond.notify()
+
+    async def flush(self):
+        """Returns once every event appended before the call is committed."""
+        with self._cond:
+            target = self._appended
+            if self._committed >= target:
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((target, future))
+        await future
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=FULL") # fsync the WAL on every commit
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    break
+                batch, self._pending = self._pending, []
+            start = time.perf_counter()
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO events (task_id, seq, type, data, ts) VALUES (?, ?, ?, ?, ?)", batch)
+                    conn.executemany("DELETE FROM events WHERE task_id = ? AND (seq < ? OR seq = ? AND type != 'snapshot')",
+                                     [(row[0], row[1], row[1]) for row in batch if row[2] == "snapshot"])
+            except sqlite3.Error as e:
+                print(f"[TaskLog] Write failed ({e}); retrying {len(batch)} events")
+                with self._cond:
+                    self._pending[:0] = batch
+                time.sleep(1)
+                continue
+            EVENT_COMMIT_LATENCY.observe(time.perf_counter() - start)
+            EVENT_BATCH.observe(len(batch))
+            with self._cond:
+                self._committed += len(batch)
+                done = [f for target, f in self._waiters if target <= self._committed]
+                self._waiters = [(t, f) for t, f in self._waiters if t > self._committed]
+            for future in done:
+                future.get_loop().call_soon_threadsafe(_resolve, future)
+        conn.close()
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
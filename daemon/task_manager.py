@@ -1,9 +1,17 @@
 import asyncio
+import time
 import uuid
+import sys
+import os
 import json
+from array import array
+from bisect import bisect_right
 from datetime import datetime
 from enum import Enum
 from typing import List, Dict, Any, Optional
+from metrics import registry
+from tracing import tracer
+from watchdog import watchdog
 
 class TaskStatus(str, Enum):
     IDLE = "IDLE"
@@ -15,55 +23,364 @@ class TaskStatus(str, Enum):
     VERIFY = "VERIFY"
     DONE = "DONE"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+FINAL_STATES = (TaskStatus.DONE, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+PHASE_LATENCY = registry.histogram(
+    "remotepilot_task_phase_seconds", "Time spent in each task phase before the next transition", ("phase",))
+PHASE_TRANSITIONS = registry.counter(
+    "remotepilot_task_transitions_total", "Task phase transitions by target phase", ("phase",))
+WS_FANOUT_LATENCY = registry.histogram(
+    "remotepilot_ws_fanout_seconds", "Time to enqueue one event for every WebSocket subscriber", ("type",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5))
+WS_MESSAGES = registry.counter(
+    "remotepilot_ws_messages_total", "Events enqueued to WebSocket subscribers", ("type",))
+RECOVERED_TASKS = registry.counter(
+    "remotepilot_tasks_recovered_total", "Unfinished tasks found in the task log at startup by outcome", ("outcome",))
+
+# Steps that can safely run twice. After a restart, a task interrupted
+# mid-step resumes at that step only if it is one of these; anything that
+# types, clicks or runs a command may already have happened.
+REPEATABLE_ACTIONS = ("BROWSE", "WAIT")
+
+# Finished tasks the task log keeps (with their idempotency keys) across
+# restarts; older ones are dropped when it is opened
+TASK_LOG_KEEP = int(os.environ.get("REMOTEPILOT_TASK_LOG_KEEP", "500"))
+
+# Timestamps are kept as time.time() floats and only turned into ISO
+# strings when a task or log line is serialized. They are wall clock so
+# they stay right across suspend/resume, clock steps and restarts; durations
+# (phase latency) use time.monotonic() instead.
+
+def isoformat(ts: float) -> str:
+    return datetime.fromtimestamp(round(ts, 6)).isoformat()
+
+def from_isoformat(text: str) -> float:
+    return datetime.fromisoformat(text).timestamp()
+
+class Interned:
+    """Small ints for the few distinct strings a column repeats (agent names, levels)."""
+    def __init__(self, *names: str):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for name in names:
+            self.code(name)
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return code
+
+AGENTS = Interned("Planner", "Action", "Vision", "Verifier", "Research", "Memory", "Monitor", "Domain", "Fleet")
+LEVELS = Interned("INFO", "WARNING", "ERROR", "DEBUG")
+
+class LogEntry:
+    __slots__ = ("timestamp", "agent", "message", "level")
+
+    def __init__(self, agent: str, message: str, level: str = "INFO", timestamp: Optional[float] = None):
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.agent = agent
+        self.message = message
+        self.level = level
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogEntry":
+        return cls(data["agent"], data["message"], data.get("level", "INFO"), from_isoformat(data["timestamp"]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"timestamp": isoformat(self.timestamp), "agent": self.agent,
+                "message": self.message, "level": self.level}
+
+class LogBuffer:
+    """
+    A task's log, one column per field: a line costs a float, two interned
+    codes, a seq and its message instead of a dict and a timestamp string.
+    Indexing, slicing and iterating give the same dicts the API sends.
+    """
+    __slots__ = ("timestamps", "agents", "levels", "messages", "seqs")
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.agents = array("H")
+        self.levels = array("H")
+        self.messages: List[str] = []
+        self.seqs = array("q") # Task.seq each line was added at, ascending
+
+    def append(self, entry: LogEntry, seq: int):
+        self.timestamps.append(entry.timestamp)
+        self.agents.append(AGENTS.code(entry.agent))
+        self.levels.append(LEVELS.code(entry.level))
+        self.messages.append(entry.message)
+        self.seqs.append(seq)
+
+    def entry(self, i: int) -> LogEntry:
+        return LogEntry(AGENTS.names[self.agents[i]], self.messages[i], LEVELS.names[self.levels[i]],
+                        self.timestamps[i])
+
+    def since(self, seq: int) -> List[Dict[str, Any]]:
+        """Lines added after change `seq`."""
+        return self[bisect_right(self.seqs, seq):]
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.entry(j).to_dict() for j in range(*i.indices(len(self)))]
+        return self.entry(range(len(self))[i]).to_dict()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.entry(i).to_dict()
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other) if isinstance(other, (list, LogBuffer)) else NotImplemented
 
 class Task:
-    def __init__(self, goal: str):
-        self.id = str(uuid.uuid4())
+    __slots__ = ("id", "goal", "idempotency_key", "remote", "next_step", "journal", "status", "logs",
+                 "created_at", "phase_started_at", "seq", "plan_seq", "_plan", "error")
+
+    def __init__(self, goal: str, task_id: Optional[str] = None, idempotency_key: Optional[str] = None):
+        self.id = task_id or str(uuid.uuid4())
         self.goal = goal
+        self.idempotency_key = idempotency_key
+        self.remote = False # Handed to us by a fleet coordinator
+        self.next_step = 0 # Index of the first plan step not yet verified
+        self.journal = None # TaskEventLog, when the daemon keeps one
         self.status = TaskStatus.IDLE
-        self.logs = []
-        self.created_at = datetime.now().isoformat()
-        self.plan = []
+        self.logs = LogBuffer()
+        self.created_at = time.time()
+        self.phase_started_at = time.monotonic()
+        # Change sequence for /task/state ETags and deltas: bumped on every
+        # status, plan or log change; each log remembers the seq it got.
+        self.seq = 0
+        self.plan_seq = 0
+        self._plan = []
         self.error = None
 
+    @property
+    def plan(self) -> List[Dict[str, Any]]:
+        return self._plan
+
+    @plan.setter
+    def plan(self, plan: List[Dict[str, Any]]):
+        self._plan = plan
+        self.next_step = 0
+        self.plan_seq = self.touch()
+        self.record("plan", {"plan": plan})
+
+    def touch(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def record(self, type_: str, data: Dict[str, Any]):
+        if self.journal:
+            self.journal.append(self.id, self.seq, type_, data)
+
     def add_log(self, agent: str, message: str, level: str = "INFO"):
-        log_entry = {
-            "timestamp": datetime.now().isoformat(),
-            "agent": agent,
-            "message": message,
-            "level": level
-        }
-        self.logs.append(log_entry)
+        entry = LogEntry(agent, message, level)
+        self.logs.append(entry, self.touch())
+        log_entry = entry.to_dict()
+        self.record("log", log_entry)
         return log_entry
 
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything replay needs, as one event; the log drops the task's earlier events for it."""
+        return {"goal": self.goal, "created_at": isoformat(self.created_at), "remote": self.remote,
+                "idempotency_key": self.idempotency_key, "status": self.status.value, "plan": self._plan,
+                "plan_seq": self.plan_seq, "next_step": self.next_step, "logs": list(self.logs),
+                "log_seqs": list(self.logs.seqs)}
+
+    @classmethod
+    def restore(cls, task_id: str, data: Dict[str, Any]) -> "Task":
+        task = cls(data["goal"], task_id, data.get("idempotency_key"))
+        task.created_at = from_isoformat(data["created_at"])
+        task.remote = data.get("remote", False)
+        task.status = TaskStatus(data["status"])
+        task._plan, task.plan_seq, task.next_step = data["plan"], data["plan_seq"], data["next_step"]
+        for log, seq in zip(data["logs"], data["log_seqs"]):
+            task.logs.append(LogEntry.from_dict(log), seq)
+        return task
+
+    def state(self, since_seq: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Full task state, or with `since_seq` only what changed after it:
+        the logs added since, and the plan only if it was replaced.
+        """
+        state = {"id": self.id, "status": self.status.value, "goal": self.goal, "seq": self.seq}
+        if since_seq is None:
+            state["plan"] = self.plan
+            state["logs"] = self.logs[:]
+            return state
+        state["since_seq"] = since_seq
+        if self.plan_seq > since_seq:
+            state["plan"] = self.plan
+        state["logs"] = self.logs.since(since_seq)
+        return state
+
 class TaskManager:
     def __init__(self):
         self.tasks: Dict[str, Task] = {}
+        self.idempotency_keys: Dict[str, Task] = {}
+        self.journal = None
         self.active_task_id: Optional[str] = None
         self.log_queues: List[asyncio.Queue] = []
+        registry.gauge("remotepilot_tasks_active", "Tasks between submission and DONE/FAILED/CANCELLED",
+                       fn=lambda: sum(1 for t in self.tasks.values() if t.status not in FINAL_STATES))
+        registry.gauge("remotepilot_tasks_queued", "Tasks submitted but not started yet",
+                       fn=lambda: sum(1 for t in self.tasks.values() if t.status == TaskStatus.IDLE))
+        registry.gauge("remotepilot_ws_subscribers", "Connected /ws/logs clients",
+                       fn=lambda: len(self.log_queues))
+        registry.gauge("remotepilot_ws_queue_depth", "Events waiting in WebSocket subscriber queues",
+                       fn=lambda: sum(q.qsize() for q in self.log_queues))
 
-    def create_task(self, goal: str) -> Task:
-        task = Task(goal)
+    def create_task(self, goal: str, task_id: Optional[str] = None, idempotency_key: Optional[str] = None) -> Task:
+        """`task_id` is given when a fleet coordinator hands us its task."""
+        task = Task(goal, task_id, idempotency_key)
+        task.remote = task_id is not None
+        task.journal = self.journal
         self.tasks[task.id] = task
+        if idempotency_key:
+            self.idempotency_keys[idempotency_key] = task
         self.active_task_id = task.id
+        task.record("created", {"goal": goal, "created_at": isoformat(task.created_at), "remote": task.remote,
+                                "idempotency_key": idempotency_key})
         return task
 
     def get_task(self, task_id: str) -> Optional[Task]:
         return self.tasks.get(task_id)
 
+    def find_by_key(self, idempotency_key: Optional[str]) -> Optional[Task]:
+        return self.idempotency_keys.get(idempotency_key) if idempotency_key else None
+
+    def step_done(self, task_id: str, next_step: int):
+        task = self.get_task(task_id)
+        if task:
+            task.next_step = next_step
+            task.record("step", {"next": next_step})
+
+    def open_journal(self, path: str) -> List[tuple]:
+        """
+        Opens (or creates) the task log at `path`, rebuilds the tasks in it
+        and decides what happens to the unfinished ones. Returns
+        (task, resume_from) pairs to restart: resume_from None re-runs the
+        task from planning, an index continues the plan at that step.
+        Interrupted tasks that can't safely continue are marked FAILED.
+        Finished tasks past the newest TASK_LOG_KEEP are dropped from the log.
+        """
+        from task_log import TaskEventLog
+        self.journal = TaskEventLog(path)
+        executed = set()
+        unsnapshotted = set() # Tasks with events the log hasn't folded into a snapshot
+        for task_id, seq, type_, data in self.journal.replay():
+            if type_ in ("created", "snapshot"):
+                if type_ == "created":
+                    task = Task(data["goal"], task_id, data.get("idempotency_key"))
+                    task.created_at = from_isoformat(data["created_at"])
+                    task.remote = data.get("remote", False)
+                    unsnapshotted.add(task_id)
+                else:
+                    task = Task.restore(task_id, data)
+                    unsnapshotted.discard(task_id)
+                task.seq = seq
+                self.tasks[task_id] = task
+                if task.idempotency_key:
+                    self.idempotency_keys[task.idempotency_key] = task
+                continue
+            task = self.tasks.get(task_id)
+            if task is None:
+                continue
+            unsnapshotted.add(task_id)
+            if type_ == "state":
+                task.status = TaskStatus(data["status"])
+                if task.status == TaskStatus.ACT:
+                    executed.add(task_id)
+            elif type_ == "plan":
+                task._plan, task.plan_seq, task.next_step = data["plan"], seq, 0
+            elif type_ == "step":
+                task.next_step = data["next"]
+            elif type_ == "log":
+                task.logs.append(LogEntry.from_dict(data), seq)
+            task.seq = max(task.seq, seq)
+
+        finished = [task for task in self.tasks.values() if task.status in FINAL_STATES]
+        expired = finished[:max(0, len(finished) - TASK_LOG_KEEP)]
+        for task in expired:
+            del self.tasks[task.id]
+            if self.idempotency_keys.get(task.idempotency_key) is task:
+                del self.idempotency_keys[task.idempotency_key]
+        if expired:
+            self.journal.forget([task.id for task in expired])
+            print(f"[TaskManager] Dropped {len(expired)} old finished tasks from {path}")
+
+        resume = []
+        for task in self.tasks.values():
+            task.journal = self.journal
+            if task.status in FINAL_STATES:
+                if task.id in unsnapshotted:
+                    task.record("snapshot", task.snapshot())
+                continue
+            if task.remote:
+                outcome, message = "failed", "Interrupted by a daemon restart; the coordinator reassigns it."
+            elif task.id not in executed:
+                outcome, message = "restarted", "Daemon restarted before any step ran; starting over."
+                resume.append((task, None))
+            elif task.next_step >= len(task.plan) or \
+                    str(task.plan[task.next_step].get("action", "")).upper() in REPEATABLE_ACTIONS:
+                outcome, message = "resumed", f"Daemon restarted; resuming at step {task.next_step + 1}."
+                resume.append((task, task.next_step))
+            else:
+                step = task.plan[task.next_step]
+                outcome, message = "failed", (f"Interrupted by a daemon restart during step {task.next_step + 1} "
+                                              f"({step.get('action')}), which is not safe to repeat.")
+            RECOVERED_TASKS.inc(outcome=outcome)
+            task.add_log("Monitor", message, "WARNING" if outcome != "failed" else "ERROR")
+            if outcome == "failed":
+                task.status = TaskStatus.FAILED
+                task.touch()
+                task.record("state", {"status": task.status.value})
+                task.record("snapshot", task.snapshot())
+        if resume:
+            print(f"[TaskManager] Recovered {len(resume)} unfinished tasks from {path}")
+        return resume
+
+    def close_journal(self):
+        if self.journal:
+            self.journal.close()
+
     async def broadcast_log(self, task_id: str, log_entry: Dict[str, Any]):
+        watchdog.touch(task_id)
+        start = time.perf_counter()
         for queue in self.log_queues:
             await queue.put({"task_id": task_id, "type": "log", "data": log_entry})
+        WS_FANOUT_LATENCY.observe(time.perf_counter() - start, type="log")
+        WS_MESSAGES.inc(len(self.log_queues), type="log")
 
     async def update_state(self, task_id: str, status: TaskStatus):
         task = self.get_task(task_id)
         if task:
+            now = time.monotonic()
+            PHASE_LATENCY.observe(now - task.phase_started_at, phase=task.status.value)
+            PHASE_TRANSITIONS.inc(phase=status.value)
+            task.phase_started_at = now
             task.status = status
+            task.touch()
+            task.record("state", {"status": status.value})
+            if status in FINAL_STATES:
+                task.record("snapshot", task.snapshot())
+            watchdog.enter_phase(task_id, status.value)
+            tracer.event(f"state:{status.value}")
+            start = time.perf_counter()
             for queue in self.log_queues:
                 await queue.put({
                     "task_id": task_id, 
                     "type": "state", 
                     "data": {"status": status.value}
                 })
+            WS_FANOUT_LATENCY.observe(time.perf_counter() - start, type="state")
+            WS_MESSAGES.inc(len(self.log_queues), type="state")
 
 task_manager = TaskManager()
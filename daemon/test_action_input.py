@@ -0,0 +1,116 @@
+import time
+import asyncio
+import threading
+
+from agents.action import ActionAgent
+from input_backend.base import InputBackend
+
+class FakeInputBackend(InputBackend):
+    """Records events; typing costs `key_cost` per key like a real keyboard queue."""
+    def __init__(self, key_cost=0.0, paste=True):
+        self.events = []
+        self.threads = set()
+        self.key_cost = key_cost
+        self.paste_supported = paste
+
+    def _record(self, *event):
+        self.threads.add(threading.current_thread().name)
+        self.events.append(event)
+
+    def size(self):
+        return (1920, 1080)
+
+    def click(self, x, y):
+        self._record("click", x, y)
+
+    def write(self, text, interval=0.0):
+        time.sleep(len(text) * (self.key_cost + interval))
+        self._record("write", text, interval)
+
+    def hotkey(self, *keys):
+        self._record("hotkey", *keys)
+
+    def can_paste(self):
+        return self.paste_supported
+
+    def paste(self, text):
+        self._record("paste", text)
+
+async def max_loop_gap(coro, tick=0.01):
+    """Runs `coro` while measuring the longest event-loop stall."""
+    gaps = []
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(tick)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    t = asyncio.create_task(ticker())
+    try:
+        result = await coro
+    finally:
+        done.set()
+        await t
+    return result, max(gaps)
+
+def test_type_paths():
+    backend = FakeInputBackend()
+    agent = ActionAgent(backend=backend)
+
+    async def run():
+        short = await agent.execute({"action": "TYPE", "value": "hello"})
+        long = await agent.execute({"action": "TYPE", "value": "x" * 200})
+        unicode = await agent.execute({"action": "TYPE", "value": "héllo"})
+        forced = await agent.execute({"action": "TYPE", "value": "y" * 200, "mode": "type", "interval": 0})
+        return short, long, unicode, forced
+
+    short, long, unicode, forced = asyncio.run(run())
+    assert [r["method"] for r in (short, long, unicode, forced)] == ["typed", "pasted", "pasted", "typed"]
+    assert backend.events[0] == ("write", "hello", 0.0) # zero-interval fast path
+    assert backend.events[1] == ("paste", "x" * 200)
+    assert backend.threads == {"action-input_0"}
+
+def test_falls_back_to_typing_without_clipboard():
+    backend = FakeInputBackend(paste=False)
+    res = asyncio.run(ActionAgent(backend=backend).execute({"action": "TYPE", "value": "x" * 100}))
+    assert res["method"] == "typed" and backend.events == [("write", "x" * 100, 0.0)]
+
+def test_input_and_wait_do_not_block_loop():
+    backend = FakeInputBackend(key_cost=0.004)
+    agent = ActionAgent(backend=backend)
+
+    async def run():
+        # 100 keys at 4ms each: 0.4s of typing on the input thread
+        typed, typing_gap = await max_loop_gap(
+            agent.execute({"action": "TYPE", "value": "k" * 100, "mode": "type"}))
+        waited, wait_gap = await max_loop_gap(agent.execute({"action": "WAIT", "value": "0.3"}))
+        return typed, typing_gap, waited, wait_gap
+
+    typed, typing_gap, waited, wait_gap = asyncio.run(run())
+    assert typed["status"] == waited["status"] == "success"
+    assert typing_gap < 0.1 and wait_gap < 0.1
+
+def test_events_stay_ordered():
+    backend = FakeInputBackend(key_cost=0.002)
+    agent = ActionAgent(backend=backend)
+
+    async def run():
+        await asyncio.gather(
+            agent.execute({"action": "CLICK", "value": "10 20"}),
+            agent.execute({"action": "TYPE", "value": "abc" * 5, "mode": "type"}),
+            agent.execute({"action": "HOTKEY", "value": "ctrl+s"}),
+        )
+
+    asyncio.run(run())
+    assert [e[0] for e in backend.events] == ["click", "write", "hotkey"]
+
+if __name__ == "__main__":
+    test_type_paths()
+    test_falls_back_to_typing_without_clipboard()
+    test_input_and_wait_do_not_block_loop()
+    test_events_stay_ordered()
+    print("Action input tests passed.")
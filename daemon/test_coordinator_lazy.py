@@ -0,0 +1,49 @@
+import sys
+import subprocess
+import threading
+import time
+
+from coordinator import Coordinator, AgentRegistry
+
+def test_import_builds_no_agents():
+    # Fresh interpreter: nothing heavy may load before the port is bound
+    code = ("import sys, coordinator; "
+            "print(sorted(m for m in sys.modules if m.startswith('agents.') and m != 'agents.base')); "
+            "print(coordinator.coordinator.agents.loaded())")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.splitlines()[-2:] == ["[]", "[]"]
+
+def test_agent_built_once_under_concurrent_lookups():
+    registry = AgentRegistry()
+    built = []
+
+    class Slow:
+        name = "Slow"
+        def __init__(self):
+            time.sleep(0.05)
+            built.append(self)
+
+    registry.register_factory("Slow", Slow)
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(registry.get("Slow"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 1
+    assert all(agent is built[0] for agent in seen)
+    assert registry.loaded() == ["Slow"]
+
+def test_injected_agent_replaces_factory():
+    c = Coordinator()
+    assert "Planner" in c.agents and "Planner" not in c.agents.loaded()
+    sentinel = type("FakePlanner", (), {"name": "Planner"})()
+    c.planner = sentinel
+    assert c.planner is sentinel
+    assert c.agents.loaded() == ["Planner"]
+
+if __name__ == "__main__":
+    test_import_builds_no_agents()
+    test_agent_built_once_under_concurrent_lookups()
+    test_injected_agent_replaces_factory()
+    print("All tests passed!")
@@ -0,0 +1,54 @@
+import shutil
+import asyncio
+
+import numpy as np
+import pytest
+
+from agents.action import ActionAgent
+from agents.vision import VisionAgent
+from display.base import open_display
+from display.fake import FakeDisplay
+
+def test_agents_drive_and_capture_their_own_display():
+    async def run():
+        a, b = FakeDisplay(320, 200), FakeDisplay(320, 200)
+        workers = [(ActionAgent(backend=d), VisionAgent(display=d)) for d in (a, b)]
+        blank = np.asarray(workers[0][1].capture())
+        await workers[0][0].execute({"action": "CLICK", "value": "10 20"})
+        await workers[0][0].execute({"action": "TYPE", "value": "hello", "mode": "type"})
+        await workers[1][0].execute({"action": "HOTKEY", "value": "ctrl+s"})
+        first, second = (np.asarray(vision.capture()) for _, vision in workers)
+        assert (first != blank).any()
+        assert (second == blank).all() # b never saw a's input
+        assert a.events == [("click", 10, 20), ("write", "hello")]
+        assert b.events == [("hotkey", "ctrl", "s")]
+        assert a.cursor == (10 + 5 * FakeDisplay.CELL_W, 20)
+    asyncio.run(run())
+
+def test_open_display_from_environment(monkeypatch):
+    monkeypatch.setenv("REMOTEPILOT_DISPLAY", "fake")
+    monkeypatch.setenv("REMOTEPILOT_DISPLAY_SIZE", "640x480")
+    display = open_display()
+    assert display.kind == "fake" and display.size() == (640, 480)
+    assert display.screenshot().size == (640, 480)
+    with pytest.raises(ValueError):
+        open_display("wayland")
+
+@pytest.mark.skipif(shutil.which("Xvfb") is None or shutil.which("xdotool") is None,
+                    reason="Xvfb/xdotool not installed")
+def test_parallel_xvfb_displays_are_isolated():
+    from display.xvfb import XvfbDisplay
+    displays = [XvfbDisplay(320, 240) for _ in range(2)]
+    try:
+        assert len({d.name for d in displays}) == 2
+        for d in displays:
+            assert d.screenshot().size == (320, 240)
+            d.click(5, 5)
+    finally:
+        for d in displays:
+            d.close()
+    assert all(d.process.poll() is not None for d in displays)
+
+if __name__ == "__main__":
+    test_agents_drive_and_capture_their_own_display()
+    print("All tests passed!")
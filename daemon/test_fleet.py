@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import threading
+import subprocess
+
+import httpx
+import pytest
+import uvicorn
+
+from fleet import Fleet, required_capabilities
+
+DAEMON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# A real worker daemon; only the VLM verifier is replaced (no Ollama here)
+WORKER = """
+import sys, uvicorn, main
+from coordinator import coordinator
+
+class Verifier:
+    name = "Verifier"
+    async def execute(self, task):
+        return {"status": "success", "verified": True}
+
+coordinator.verifier = Verifier()
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_required_capabilities():
+    plan = [{"action": "BROWSE", "value": "x"}, {"action": "type", "value": "y"}, {"action": "WAIT", "value": "1"}]
+    assert required_capabilities(plan) == {"browser", "desktop"}
+    assert required_capabilities([]) == set()
+
+def test_pick_is_capability_and_load_aware_and_reaps_silent_workers():
+    async def run():
+        fleet = Fleet(heartbeat_timeout=0.2)
+        fleet.register("a", "http://a", ["desktop", "shell"], max_tasks=2)
+        fleet.register("b", "http://b", ["desktop", "browser"], max_tasks=2)
+        fleet.register("c", "http://c", ["shell"])
+        fleet.heartbeat("a", {"cpu": 80, "running": 1})
+        fleet.heartbeat("b", {"cpu": 10, "running": 0})
+        assert fleet.pick({"desktop"}).id == "b" # less loaded
+        assert fleet.pick({"browser"}).id == "b"
+        assert fleet.pick({"shell"}, exclude={"c"}).id == "a"
+        fleet.heartbeat("b", {"cpu": 10, "saturated": "cpu 97%"})
+        assert fleet.pick({"desktop"}).id == "a"
+        fleet.workers["a"].tasks.update({"t1", "t2"}) # full
+        assert fleet.pick({"desktop"}) is None
+
+        lost = fleet.workers["c"].lost
+        for _ in range(6): # the reaper runs meanwhile; only "a" keeps heartbeating
+            await asyncio.sleep(0.05)
+            fleet.heartbeat("a", {})
+        assert set(fleet.workers) == {"a"} and lost.is_set()
+    asyncio.run(run())
+
+def test_fleet_endpoints_need_the_fleet_token_and_workers_check_requests(monkeypatch):
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+    import main
+    client = TestClient(main.app)
+    worker = {"worker_id": "rogue", "url": "http://evil", "capabilities": ["desktop"]}
+    bearer = {"authorization": "Bearer fleet-secret"}
+
+    monkeypatch.delenv("REMOTEPILOT_FLEET_TOKEN", raising=False)
+    assert client.post("/fleet/register", json=worker, headers=bearer).status_code == 403 # not configured
+    monkeypatch.setenv("REMOTEPILOT_FLEET_TOKEN", "fleet-secret")
+    assert client.post("/fleet/register", json=worker).status_code == 403
+    assert client.post("/fleet/heartbeat/rogue", json={}, headers={"authorization": "Bearer nope"}).status_code == 403
+
+    def run(message, **headers):
+        with client.websocket_connect("/fleet/ws/run", headers=headers) as ws:
+            ws.send_text(message)
+            return ws.receive_json()
+
+    plan = json.dumps({"task_id": "t-1", "goal": "x", "plan": [{"action": "COMMAND", "value": "id"}]})
+    monkeypatch.delenv("REMOTEPILOT_ROLE", raising=False)
+    with pytest.raises(WebSocketDisconnect): # not a worker: raw plans aren't run at all
+        run(plan, **bearer)
+    monkeypatch.setenv("REMOTEPILOT_ROLE", "worker")
+    with pytest.raises(WebSocketDisconnect):
+        run(plan)
+    for bad in ("not json", "[]", json.dumps({"goal": "no id"})):
+        assert run(bad, **bearer) == {"type": "rejected", "data": "malformed request"}
+
+def _state(client, task_id):
+    return client.get(f"/task/state/{task_id}").json()
+
+def _wait_final(client, task_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = _state(client, task_id)
+        if state["status"] in ("DONE", "FAILED", "CANCELLED"):
+            return state
+        time.sleep(0.1)
+    raise AssertionError(f"task did not finish: {_state(client, task_id)}")
+
+def _dispatched_to(state):
+    return [log["message"].split()[3] for log in state["logs"] if log["message"].startswith("Dispatched to worker")]
+
+def test_dispatch_to_local_workers_with_reassignment(tmp_path, monkeypatch):
+    import main
+    from coordinator import coordinator
+    from fleet import fleet
+
+    class Planner:
+        name = "Planner"
+        async def execute(self, task):
+            return {"status": "success", "plan": json.loads(task["goal"])}
+
+    class Memory:
+        name = "Memory"
+        async def execute(self, task):
+            return {"status": "success"}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("REMOTEPILOT_WARMUP", "0")
+    monkeypatch.setenv("REMOTEPILOT_FLEET_TOKEN", "fleet-secret") # workers inherit it
+    monkeypatch.setattr(coordinator, "planner", Planner())
+    monkeypatch.setattr(coordinator, "memory", Memory())
+    monkeypatch.setattr(fleet, "dispatching", True)
+    monkeypatch.setattr(fleet, "heartbeat_timeout", 2.0)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    workers = {}
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        for name, caps in (("desk-1", "desktop"), ("web", "browser"), ("desk-2", "desktop")):
+            wport = free_port()
+            env = dict(os.environ, PYTHONPATH=DAEMON_DIR, REMOTEPILOT_ROLE="worker",
+                       REMOTEPILOT_COORDINATOR_URL=f"http://127.0.0.1:{port}", REMOTEPILOT_WORKER_ID=name,
+                       REMOTEPILOT_WORKER_URL=f"http://127.0.0.1:{wport}", REMOTEPILOT_PORT=str(wport),
+                       REMOTEPILOT_CAPABILITIES=caps, REMOTEPILOT_HEARTBEAT="0.3", REMOTEPILOT_DISPLAY="fake",
+                       REMOTEPILOT_WARMUP="0")
+            workers[name] = subprocess.Popen([sys.executable, "-c", WORKER, str(wport)], cwd=tmp_path, env=env,
+                                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=10) as client:
+            deadline = time.monotonic() + 30
+            while len(client.get("/fleet/workers").json()["workers"]) < 3:
+                assert time.monotonic() < deadline, "workers did not register"
+                time.sleep(0.1)
+
+            # Capability-aware: browser work only goes to the browser worker
+            browse = client.post("/task/submit", json={"goal": json.dumps([{"action": "BROWSE", "value": "about:blank"}])})
+            state = _wait_final(client, browse.json()["task_id"])
+            assert state["status"] == "DONE" and _dispatched_to(state) == ["web"]
+            assert any(log["message"].startswith("Secured 1 steps") for log in state["logs"]) # mirrored
+
+            # Kill the worker mid-task: the task moves to the other desktop worker
+            slow = [{"action": "TYPE", "value": "hi"}] + [{"action": "WAIT", "value": "0.5"}] * 6
+            task_id = client.post("/task/submit", json={"goal": json.dumps(slow)}).json()["task_id"]
+            deadline = time.monotonic() + 10
+            while not any(log["message"].startswith("Step 1") for log in _state(client, task_id)["logs"]):
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            first = _dispatched_to(_state(client, task_id))[0]
+            workers[first].kill()
+            state = _wait_final(client, task_id)
+            second = "desk-2" if first == "desk-1" else "desk-1"
+            assert state["status"] == "DONE"
+            assert _dispatched_to(state) == [first, second]
+            assert any(f"Worker {first} lost" in log["message"] for log in state["logs"])
+
+            # The dead worker is dropped once its heartbeats stop
+            deadline = time.monotonic() + 5
+            while first in {w["id"] for w in client.get("/fleet/workers").json()["workers"]}:
+                assert time.monotonic() < deadline
+                time.sleep(0.1)
+    finally:
+        for proc in workers.values():
+            proc.kill()
+            proc.wait()
+        server.should_exit = True
+
+if __name__ == "__main__":
+    test_required_capabilities()
+    test_pick_is_capability_and_load_aware_and_reaps_silent_workers()
+    print("All tests passed!")
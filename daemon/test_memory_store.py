@@ -0,0 +1,96 @@
+import os
+import json
+import asyncio
+
+from memory_store import MemoryStore
+
+GOALS = ["open the weekly report", "email the invoice", "book a meeting room"]
+
+def make_store(path, offline=False):
+    store = MemoryStore("http://127.0.0.1:9", storage_file=str(path / "memory.json"))
+    async def embedding(text):
+        # One axis per known goal, so each goal finds exactly itself
+        return [] if offline else [float(text == g) for g in GOALS] + [0.01]
+    store.get_embedding = embedding
+    return store
+
+def test_out_of_sync_index_keeps_every_entry(tmp_path):
+    store = make_store(tmp_path)
+    for goal in GOALS:
+        asyncio.run(store.add_interaction(goal, [{"action": "WAIT", "value": goal}]))
+    store.index.add([0.0, 0.0, 0.0, 1.0]) # crash after index.add, before the entry was saved
+
+    store = make_store(tmp_path)
+    store.load()
+    assert [m["goal"] for m in store.memory] == GOALS and len(store.index) == 3
+    hits = asyncio.run(store.retrieve_relevant("email the invoice", top_k=1))
+    assert hits[0]["goal"] == "email the invoice"
+
+    # Index files lost: entries stay, and are re-embedded once Ollama answers
+    for name in os.listdir(tmp_path):
+        if name != "memory.json":
+            os.remove(tmp_path / name)
+    store = make_store(tmp_path, offline=True)
+    store.load()
+    asyncio.run(store.retrieve_relevant("book a meeting room"))
+    assert len(store.memory) == 3 and len(store.index) == 0
+    with open(tmp_path / "memory.json") as f:
+        assert len(f.readlines()) == 3
+
+    store = make_store(tmp_path)
+    asyncio.run(store.add_interaction("rename the folder", []))
+    assert len(store.index) == len(store.memory) == 4
+    hits = asyncio.run(store.retrieve_relevant("book a meeting room", top_k=1))
+    assert hits[0]["goal"] == "book a meeting room"
+
+def test_entries_are_appended_and_old_files_migrated(tmp_path):
+    # The old format: one JSON array, vectors inline
+    legacy = [{"goal": g, "plan": [], "vector": [float(g == x) for x in GOALS] + [0.01]} for g in GOALS[:2]]
+    with open(tmp_path / "memory.json", "w") as f:
+        json.dump(legacy, f)
+    store = make_store(tmp_path)
+    store.load()
+    assert len(store.index) == 2 and "vector" not in store.memory[0]
+
+    asyncio.run(store.add_interaction(GOALS[2], [{"action": "WAIT", "value": "1"}]))
+    with open(tmp_path / "memory.json") as f:
+        lines = f.readlines()
+    assert [json.loads(l)["goal"] for l in lines] == GOALS
+
+    with open(tmp_path / "memory.json", "a") as f:
+        f.write('{"goal": "cut off mid-wri') # crash during an append
+    store = make_store(tmp_path)
+    asyncio.run(store.add_interaction("rename the folder", []))
+    store = make_store(tmp_path)
+    store.load()
+    assert [m["goal"] for m in store.memory] == GOALS + ["rename the folder"] and len(store.index) == 4
+
+def test_inserts_and_searches_overlap_without_losing_rows(tmp_path):
+    from vector_index import IVFIndex
+    store = make_store(tmp_path)
+    # Retrains on the insert thread while searches run
+    store.index = IVFIndex(path=str(tmp_path / "memory"), train_threshold=8, nlist=2)
+    async def embedding(text):
+        n = int(text.split()[-1])
+        return [float(n % 7), float(n % 5), 1.0, float(n)]
+    store.get_embedding = embedding
+
+    async def run():
+        await asyncio.gather(*[store.add_interaction(f"goal {i}", []) for i in range(60)],
+                             *[store.retrieve_relevant(f"goal {i}") for i in range(60)])
+    asyncio.run(run())
+    assert len(store.index) == len(store.memory) == 60 and store.index.trained
+    # Row i still holds entry i's vector
+    for i in (0, 17, 59):
+        row = next(n for n, m in enumerate(store.memory) if m["goal"] == f"goal {i}")
+        assert store.index.search(asyncio.run(embedding(f"goal {i}")), 1)[0][1] == row
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as tmp:
+        test_out_of_sync_index_keeps_every_entry(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_entries_are_appended_and_old_files_migrated(pathlib.Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_inserts_and_searches_overlap_without_losing_rows(pathlib.Path(tmp))
+    print("All tests passed!")
@@ -0,0 +1,154 @@
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ollama_client
+import model_residency
+from model_residency import ModelResidency, canonical, keep_alive_seconds
+
+GB = 1 << 30
+
+class StubOllama:
+    """Holds up to `capacity` models; loading one takes `load_delay` and evicts the least recently used."""
+    def __init__(self, load_delay=0.3, capacity=1, sizes=None):
+        self.sizes = sizes or {"llama3.2:latest": 2 * GB, "llava:latest": 4 * GB}
+        self.loaded = OrderedDict() # model -> unload time
+        self.keep_alives = []
+        lock = threading.Lock() # one load at a time, like Ollama's scheduler
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                now = time.time()
+                if self.path == "/api/tags":
+                    self._reply({"models": [{"name": m, "size": s} for m, s in stub.sizes.items()]})
+                else:
+                    self._reply({"models": [
+                        {"name": m, "size": stub.sizes[m], "expires_at": datetime.fromtimestamp(
+                            min(expires, now + 86400), timezone.utc).isoformat().replace("+00:00", "Z")}
+                        for m, expires in stub.loaded.items() if expires > now]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                model = canonical(body["model"])
+                stub.keep_alives.append((body["model"], body.get("keep_alive")))
+                with lock:
+                    load = 0.0
+                    if stub.loaded.get(model, 0) <= time.time():
+                        time.sleep(load_delay)
+                        load = load_delay
+                        stub.loaded.pop(model, None)
+                        while len(stub.loaded) >= capacity:
+                            stub.loaded.popitem(last=False)
+                    stub.loaded[model] = time.time() + keep_alive_seconds(body.get("keep_alive", "5m"))
+                    stub.loaded.move_to_end(model)
+                reply = {"model": body["model"], "done": True, "load_duration": int(load * 1e9)}
+                if "prompt" in body:
+                    reply["response"] = "YES"
+                self._reply(reply)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+def cold_loads(model, kind):
+    return model_residency.COLD_LOADS._values.get((model, kind), 0)
+
+def load_count(model, kind):
+    series = model_residency.LOAD_LATENCY._series.get((model, kind))
+    return series[-1] if series else 0
+
+def test_keep_alive_follows_what_fits_in_ram():
+    available = [8 * GB]
+    residency = ModelResidency(available_ram=lambda: available[0])
+    residency.sizes = {"llama3.2:latest": 2 * GB, "llava:latest": 4 * GB, "nomic-embed-text:latest": GB // 4}
+    url = "http://ollama:11434/api/generate"
+    for model in ["llama3.2"] * 3 + ["llava"] * 2 + ["nomic-embed-text"]:
+        residency.apply(url, {"model": model, "prompt": "hi"})
+    assert residency.pinned() == {"llama3.2:latest", "llava:latest", "nomic-embed-text:latest"}
+
+    available[0] = 4 * GB # Less room: llava, the larger and less used, gets the short keep_alive
+    assert residency.pinned() == {"llama3.2:latest", "nomic-embed-text:latest"}
+    assert residency.apply(url, {"model": "llama3.2", "prompt": "hi"})["keep_alive"] == "30m"
+    assert residency.apply(url, {"model": "llava", "prompt": "hi"})["keep_alive"] == "2m"
+
+    # What the resident models already occupy counts as available
+    residency.loaded["llava:latest"] = time.monotonic() + 60
+    assert "llava:latest" in residency.pinned()
+
+    # Caller's choice and non-model endpoints are left alone
+    assert residency.apply(url, {"model": "llava", "prompt": "hi", "keep_alive": 0})["keep_alive"] == 0
+    assert "keep_alive" not in residency.apply("http://ollama:11434/api/tags", {"model": "llava"})
+    assert keep_alive_seconds("30m") == 1800 and keep_alive_seconds(-1) == float("inf")
+
+def test_available_ram_is_the_samplers_reading(monkeypatch):
+    from collections import deque
+    from sampler import FIELDS
+    def virtual_memory():
+        raise AssertionError("psutil called on the request path")
+    monkeypatch.setattr(model_residency.psutil, "virtual_memory", virtual_memory)
+    sample = dict.fromkeys(FIELDS, 0)
+    sample["ram_available"] = 3 * GB
+    monkeypatch.setattr(model_residency.sampler, "samples", deque([(time.time(), *sample.values())]))
+    residency = ModelResidency()
+    residency.sizes = {"llama3.2:latest": 2 * GB, "llava:latest": 4 * GB}
+    for model in ("llama3.2", "llama3.2", "llava"):
+        residency.apply("http://ollama:11434/api/generate", {"model": model, "prompt": "hi"})
+    assert residency.pinned() == {"llama3.2:latest"}
+
+def test_prefetch_takes_the_cold_load_off_the_request_path(monkeypatch):
+    stub = StubOllama(load_delay=0.3, capacity=1)
+    residency = ModelResidency(available_ram=lambda: 16 * GB, cold_threshold=0.1)
+    monkeypatch.setattr(ollama_client, "residency", residency)
+    before = {k: (cold_loads(*k), load_count(*k)) for k in (("llava", "request"), ("llava", "preload"))}
+
+    async def verify_after_action(prefetch):
+        if prefetch:
+            residency.prefetch("llava", stub.url)
+            residency.prefetch("llava:latest", stub.url) # same model: already loading
+            assert len(residency._preloading) == 1
+        await asyncio.sleep(0.5) # the action
+        start = time.perf_counter()
+        await ollama_client.ollama_post(f"{stub.url}/api/generate", json={"model": "llava", "prompt": "Verify"})
+        return time.perf_counter() - start
+
+    async def plan():
+        await ollama_client.ollama_post(f"{stub.url}/api/generate", json={"model": "llama3.2", "prompt": "Plan"})
+    try:
+        asyncio.run(plan())
+        cold = asyncio.run(verify_after_action(prefetch=False))
+        asyncio.run(plan()) # evicts llava again
+        warm = asyncio.run(verify_after_action(prefetch=True))
+        asyncio.run(residency.refresh(force=True))
+    finally:
+        stub.close()
+
+    assert cold >= 0.3 and warm < 0.2
+    assert cold_loads("llava", "request") - before[("llava", "request")][0] == 1
+    assert cold_loads("llava", "preload") - before[("llava", "preload")][0] == 1
+    assert load_count("llava", "request") - before[("llava", "request")][1] == 1
+    # Ollama's view after the refresh: only llava fits
+    assert residency.resident() == {"llava:latest"} and residency.sizes["llava:latest"] == 4 * GB
+    assert all(keep_alive for _, keep_alive in stub.keep_alives) # every call had one set
+
+if __name__ == "__main__":
+    test_keep_alive_follows_what_fits_in_ram()
+    print("All tests passed!")
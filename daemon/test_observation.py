@@ -0,0 +1,93 @@
+import asyncio
+
+import agents.vision
+from agents.vision import VisionAgent
+from agents.verifier import VerifierAgent
+from observation import format_snapshot, estimate_tokens, is_browser_step, LLAVA_IMAGE_TOKENS
+
+def page(n_links=0):
+    elements = [
+        {"role": "heading", "name": "Inbox", "selector": None, "in_viewport": True},
+        {"role": "textbox", "name": "To", "selector": "input[name=\"to\"]", "type": "email",
+         "value": "bob@example.com", "in_viewport": True},
+        {"role": "textbox", "name": "Password", "selector": "#pw", "type": "password", "value": "hunter2",
+         "in_viewport": True},
+        {"role": "checkbox", "name": "Remember me", "selector": "#remember", "checked": False, "in_viewport": True},
+        {"role": "button", "name": "Send", "selector": "#send", "disabled": True, "in_viewport": False},
+        {"role": "button", "name": "Send", "selector": "#send", "disabled": True, "in_viewport": False}, # duplicate
+        {"role": "div", "name": "", "selector": None, "in_viewport": True}, # nothing to say about it
+    ]
+    elements += [{"role": "link", "name": f"Message {i} " + "x" * 200, "selector": f"#m{i}", "in_viewport": False}
+                 for i in range(n_links)]
+    return {"url": "http://mail.local/inbox", "title": "Mail", "elements": elements}
+
+def test_snapshot_is_pruned_and_bounded():
+    text = format_snapshot(page())
+    assert text.splitlines() == [
+        "Page: Mail <http://mail.local/inbox>",
+        '[1] heading "Inbox"',
+        '[2] textbox "To" input[name="to"] value="bob@example.com"',
+        '[3] textbox "Password" #pw', # value withheld
+        '[4] checkbox "Remember me" #remember unchecked',
+        '[5] button "Send" #send disabled',
+    ]
+    big = format_snapshot(page(n_links=500), max_chars=2000)
+    assert len(big) <= 2000
+    assert big.splitlines()[-1].endswith("more elements not shown)")
+    assert big.splitlines()[1] == '[1] heading "Inbox"' # in-viewport elements first
+    assert "…" in big and estimate_tokens(big) < LLAVA_IMAGE_TOKENS
+    assert is_browser_step({"action": "fill_browser"}) and not is_browser_step({"action": "CLICK"})
+
+def test_browser_steps_observe_the_dom_and_desktop_steps_the_vlm():
+    snapshots = []
+    vlm_calls = []
+
+    async def dom_snapshot():
+        snapshots.append(1)
+        return page() if len(snapshots) == 1 else None # second time: no page open
+
+    vision = VisionAgent("http://127.0.0.1:9", dom_snapshot=dom_snapshot) # nothing listening
+
+    async def vlm(task):
+        vlm_calls.append(task)
+        return {"status": "success", "description": "A terminal window"}
+    vision.execute = vlm
+
+    async def run():
+        return (await vision.observe({"action": "CLICK_BROWSER", "selector": "#send"}),
+                await vision.observe({"action": "BROWSE", "value": "http://x"}),
+                await vision.observe({"action": "HOTKEY", "value": "ctrl+s"}))
+    dom, unreadable, desktop = asyncio.run(run())
+    assert dom["source"] == "dom" and dom["description"].startswith("Page: Mail")
+    assert dom["tokens"] == estimate_tokens(dom["description"])
+    assert unreadable["source"] == desktop["source"] == "vlm"
+    assert desktop["tokens"] > LLAVA_IMAGE_TOKENS
+    assert len(snapshots) == 2 and len(vlm_calls) == 2 # the desktop step never asked the page
+
+def test_verifier_judges_browser_steps_on_the_snapshot_with_a_text_model(monkeypatch):
+    sent = []
+
+    class Response:
+        status_code = 200
+        def json(self):
+            return {"response": "YES, the Send button is there."}
+
+    async def fake_post(url, json=None, **kwargs):
+        sent.append(json)
+        return Response()
+    monkeypatch.setattr(agents.vision, "ollama_post", fake_post)
+
+    async def dom_snapshot():
+        return page()
+
+    verifier = VerifierAgent(VisionAgent(dom_snapshot=dom_snapshot, text_model="llama3.2"))
+    res = asyncio.run(verifier.execute({"expectation": "The compose form is open",
+                                        "step": {"action": "BROWSE", "value": "http://mail.local"}}))
+    assert res["verified"] is True and res["source"] == "dom"
+    assert len(sent) == 1 and sent[0]["model"] == "llama3.2" and "images" not in sent[0]
+    assert '#send' in sent[0]["prompt"] and "The compose form is open" in sent[0]["prompt"]
+
+if __name__ == "__main__":
+    test_snapshot_is_pruned_and_bounded()
+    test_browser_steps_observe_the_dom_and_desktop_steps_the_vlm()
+    print("All tests passed!")
@@ -0,0 +1,130 @@
+import json
+import time
+import asyncio
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ollama_client
+from ollama_client import ollama_post
+from memory_store import MemoryStore
+from agents.router import ModelRouterAgent
+from agents.security import SecurityAgent
+
+class StubOllama:
+    """Counts hits per path; answers after `delay` so calls overlap."""
+    def __init__(self, delay=0.2):
+        self.hits = Counter()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, payload):
+                time.sleep(delay)
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub.hits[self.path] += 1
+                self._reply({"models": [{"name": "llama3.2:latest"}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.hits[self.path] += 1
+                if self.path == "/api/embeddings":
+                    self._reply({"embedding": [float(len(body["prompt"])), 1.0]})
+                else:
+                    self._reply({"response": f"SAFE: {body['prompt'][-20:]}"})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+def coalesced(path):
+    return sum(v for labels, v in ollama_client.OLLAMA_COALESCED._values.items() if labels[0] == path)
+
+def test_identical_concurrent_calls_share_one_request(tmp_path):
+    stub = StubOllama()
+    store = MemoryStore(stub.url, storage_file=str(tmp_path / "memory.json"))
+    security = SecurityAgent(stub.url)
+    router = ModelRouterAgent()
+    router.ollama_url = stub.url
+    before = {path: coalesced(path) for path in ("/api/embeddings", "/api/generate", "/api/tags")}
+
+    async def run():
+        return await asyncio.gather(
+            *[store.get_embedding("open the weekly report") for _ in range(10)],
+            *[security._check_intent("rm -rf build/") for _ in range(10)],
+            *[router.list_models() for _ in range(10)],
+        )
+    try:
+        results = asyncio.run(run())
+    finally:
+        stub.close()
+    assert stub.hits == {"/api/embeddings": 1, "/api/generate": 1, "/api/tags": 1}
+    assert all(r == results[0] for r in results[:10])
+    assert all(r == {"status": "SAFE"} for r in results[10:20])
+    assert all(r == {"models": ["llama3.2:latest"]} for r in results[20:])
+    for path in before:
+        assert coalesced(path) - before[path] == 9
+
+def test_different_payloads_and_sequential_calls_are_not_merged():
+    stub = StubOllama(delay=0.05)
+
+    async def run():
+        url = f"{stub.url}/api/embeddings"
+        # keep_alive and key order don't matter; the prompt does
+        await asyncio.gather(
+            ollama_post(url, {"model": "m", "prompt": "a", "keep_alive": "5m"}),
+            ollama_post(url, {"prompt": "a", "model": "m"}),
+            ollama_post(url, {"model": "m", "prompt": "b"}),
+            ollama_post(url, {"model": "m", "prompt": "a"}, coalesce=False),
+        )
+        await ollama_post(url, {"model": "m", "prompt": "a"}) # earlier call has landed
+        assert not ollama_client._inflight
+    try:
+        asyncio.run(run())
+    finally:
+        stub.close()
+    assert stub.hits["/api/embeddings"] == 4
+
+    # In-flight keys hold a digest of the body, not a copy of a multi-MB screenshot
+    screenshot = {"model": "llava", "prompt": "Verify", "images": ["A" * 5_000_000]}
+    key = ollama_client._flight_key("POST", f"{stub.url}/api/generate", screenshot)
+    assert len(key[3]) == 32
+    assert key == ollama_client._flight_key("POST", f"{stub.url}/api/generate/", dict(screenshot, keep_alive="2m"))
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    stub = StubOllama(delay=0.2)
+
+    async def run():
+        url = f"{stub.url}/api/embeddings"
+        first = asyncio.create_task(ollama_post(url, {"model": "m", "prompt": "x"}))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(ollama_post(url, {"model": "m", "prompt": "x"}))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        response = await second
+        return response.json()
+    try:
+        assert asyncio.run(run()) == {"embedding": [1.0, 1.0]}
+    finally:
+        stub.close()
+    assert stub.hits["/api/embeddings"] == 1
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with tempfile.TemporaryDirectory() as tmp:
+        test_identical_concurrent_calls_share_one_request(pathlib.Path(tmp))
+    test_different_payloads_and_sequential_calls_are_not_merged()
+    test_cancelled_waiter_does_not_cancel_shared_call()
+    print("All tests passed!")
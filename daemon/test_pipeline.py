@@ -0,0 +1,142 @@
+import io
+import time
+import base64
+import asyncio
+import threading
+
+import numpy as np
+from PIL import Image
+
+import agents.vision
+from display.fake import FakeDisplay
+from pipeline import settle, StepPipeline
+
+class SlowApp(FakeDisplay):
+    """A click opens a window that paints itself in over `paint_ms`, like a real app would."""
+    WINDOW = (slice(100, 300), slice(100, 500))
+
+    def __init__(self, paint_ms=400, **kwargs):
+        super().__init__(640, 480, **kwargs)
+        self.paint_ms = paint_ms
+
+    def click(self, x, y):
+        super().click(x, y)
+        threading.Thread(target=self._paint, daemon=True).start()
+
+    def _paint(self):
+        rows, cols = self.WINDOW
+        bands = np.array_split(np.arange(rows.start, rows.stop), 8)
+        for band in bands:
+            time.sleep(self.paint_ms / 1000 / len(bands))
+            with self._lock:
+                self.frame[band[0]:band[-1] + 1, cols] = (30, 90, 200)
+
+    def painted(self, image) -> bool:
+        return (np.asarray(image)[self.WINDOW] == (30, 90, 200)).all()
+
+def test_settle_waits_for_the_repaint_and_gives_up_on_animation():
+    app = SlowApp(paint_ms=400)
+    app.click(10, 10)
+
+    async def run():
+        frame, waited = await settle(app.screenshot, timeout=3.0, interval=0.05)
+        assert app.painted(frame) and 0.4 <= waited < 1.5
+
+        counter = iter(range(10 ** 6))
+        def animation(): # a progress bar that never stops
+            return Image.fromarray(np.full((90, 160, 3), next(counter) * 40 % 256, dtype=np.uint8))
+        _, waited = await settle(animation, timeout=0.5, interval=0.05)
+        assert 0.5 <= waited < 1.0
+    asyncio.run(run())
+
+def test_wait_lasts_until_a_late_change_has_settled():
+    from types import SimpleNamespace
+    from agents.action import ActionAgent
+    app = SlowApp(paint_ms=400)
+    vision = SimpleNamespace(capture=app.screenshot)
+    pipeline = StepPipeline(SimpleNamespace(vision=vision, action=ActionAgent(backend=app)))
+
+    async def timed(step):
+        start = time.perf_counter()
+        res = await pipeline.wait(step)
+        return res, time.perf_counter() - start
+
+    async def run():
+        # Nothing changes: the planned time, in full
+        res, waited = await timed({"action": "WAIT", "value": "1"})
+        assert res["status"] == "success" and waited >= 1.0
+
+        # The app starts drawing 0.8s into the WAIT: done once it has finished
+        threading.Timer(0.8, app._paint).start()
+        res, waited = await timed({"action": "WAIT", "value": "5"})
+        assert res["status"] == "success" and 1.2 <= waited < 3.0 and app.painted(pipeline._settled)
+
+        # A value the LLM wrote in words fails the step, like the serial path does
+        res, _ = await timed({"action": "WAIT", "value": "2 seconds"})
+        assert res["status"] == "error"
+    asyncio.run(run())
+
+def run_plan(monkeypatch, plan, pipelined):
+    import main
+    from coordinator import coordinator
+    from memory_store import memory_store
+    from task_manager import task_manager
+    from agents.action import ActionAgent
+    from agents.verifier import VerifierAgent
+    from agents.vision import VisionAgent
+
+    class Planner:
+        name = "Planner"
+        async def execute(self, task):
+            return {"status": "success", "plan": plan}
+
+    class Memory:
+        name = "Memory"
+        async def execute(self, task):
+            return {"status": "success"}
+
+    images = []
+    async def vlm(url, json=None, **kwargs):
+        images.append(json["images"][0])
+        class Response:
+            status_code = 200
+            def json(self):
+                return {"response": "YES"}
+        return Response()
+
+    async def no_memory(goal, plan):
+        pass
+
+    app = SlowApp(paint_ms=400)
+    vision = VisionAgent("http://127.0.0.1:9", display=app)
+    action = ActionAgent(backend=app)
+    for agent in (Planner(), Memory(), action, vision, VerifierAgent(vision)):
+        monkeypatch.setitem(coordinator.agents._agents, agent.name, agent)
+    monkeypatch.setattr(agents.vision, "ollama_post", vlm)
+    monkeypatch.setattr(memory_store, "add_interaction", no_memory)
+    monkeypatch.setenv("REMOTEPILOT_PIPELINE", "1" if pipelined else "0")
+
+    task = task_manager.create_task("open the settings window and name it")
+    start = time.perf_counter()
+    asyncio.run(main.process_task(task.id))
+    return task, time.perf_counter() - start, app, [Image.open(io.BytesIO(base64.b64decode(i))) for i in images]
+
+def test_pipelined_steps_verify_the_settled_screen(monkeypatch):
+    from task_manager import TaskStatus
+    plan = [{"action": "CLICK", "value": "50 50"}, {"action": "WAIT", "value": "2"},
+            {"action": "TYPE", "value": "report", "mode": "type"}]
+
+    task, serial, _, _ = run_plan(monkeypatch, plan, pipelined=False)
+    assert task.status == TaskStatus.DONE and serial >= 2.0 # the planned WAIT, in full
+
+    task, pipelined, app, images = run_plan(monkeypatch, plan, pipelined=True)
+    assert task.status == TaskStatus.DONE
+    assert pipelined < serial - 0.5 # WAIT ended once the screen stopped changing
+    assert len(images) == 3 and app.painted(images[0]) # the click was judged on the finished window
+    assert any("Screen settled" in log["message"] for log in task.logs)
+    assert [e[0] for e in app.events] == ["click", "write"]
+
+if __name__ == "__main__":
+    test_settle_waits_for_the_repaint_and_gives_up_on_animation()
+    test_wait_lasts_until_a_late_change_has_settled()
+    print("All tests passed!")
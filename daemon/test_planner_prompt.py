@@ -0,0 +1,107 @@
+import json
+import asyncio
+
+import agents.planner
+from agents.planner import PlannerAgent, SYSTEM_PROMPT
+from prompt_builder import PromptBuilder, compact_plan, estimate_tokens, _cut
+
+def test_builder_cuts_lowest_priority_first():
+    builder = PromptBuilder(budget=60)
+    builder.add("Goal: archive the newsletters", required=True)
+    builder.add("Screen: " + "button Archive " * 40, priority=1, min_tokens=20)
+    builder.add("Example: " + "old plan " * 40, priority=0)
+    prompt, tokens, cuts = builder.build()
+    assert tokens <= 60
+    assert prompt.startswith("Goal: archive the newsletters\nScreen: button Archive")
+    assert prompt.endswith("…") and "Example" not in prompt # dropped whole, then the screen cut
+    assert [c.split()[0] for c in cuts] == ["dropped", "cut"]
+
+    assert compact_plan([{"action": "BROWSE", "value": "https://mail.local/inbox"},
+                         {"action": "CLICK_BROWSER", "selector": "#archive"}]) == \
+        "BROWSE https://mail.local/inbox; CLICK_BROWSER #archive"
+
+def test_section_left_with_one_token_is_dropped():
+    import threading
+    goal = "Goal: rename every file in the reports folder"
+    history = "Similar past plan: BROWSE https://intranet.local; CLICK_BROWSER #upload"
+    result = []
+    # Budget leaves the history section exactly 1 token (its newline): used to loop forever in _cut
+    builder = PromptBuilder(estimate_tokens(goal) + 1 + 1).add(history).add(goal, required=True)
+    worker = threading.Thread(target=lambda: result.append(builder.build()), daemon=True)
+    worker.start()
+    worker.join(2)
+    assert result, "build() did not return"
+    prompt, _, cuts = result[0]
+    assert prompt == goal and cuts[0].startswith("dropped")
+    assert _cut(history, 0) == "" and _cut("…", 1) == "…"
+
+class FakeOllama:
+    def __init__(self, context_size=100):
+        self.payloads = []
+        self.context_size = context_size
+
+    async def post(self, url, json=None, **kwargs):
+        self.payloads.append(json)
+        fake = self
+
+        class Response:
+            status_code = 200
+            def json(self):
+                return {"response": '[{"action": "WAIT", "value": "1"}]', "context": [7] * fake.context_size,
+                        "prompt_eval_count": 250, "prompt_eval_duration": 5e8, "load_duration": 0}
+        return Response()
+
+def test_plan_and_replan_prompts_fit_the_budget(monkeypatch):
+    from memory_store import memory_store
+    ollama = FakeOllama()
+    monkeypatch.setattr(agents.planner, "ollama_post", ollama.post)
+    monkeypatch.setenv("REMOTEPILOT_PROMPT_BUDGET", "400")
+
+    async def history(goal):
+        return [{"goal": f"archive newsletters #{i}",
+                 "plan": [{"action": "BROWSE", "value": f"https://mail.local/folder/{i}"}] +
+                         [{"action": "CLICK_BROWSER", "selector": f"tr:nth-child({n}) .archive"} for n in range(20)]}
+                for i in range(4)]
+    monkeypatch.setattr(memory_store, "retrieve_relevant", history)
+
+    planner = PlannerAgent()
+    async def run():
+        plan = await planner.execute({"goal": "archive all newsletters", "task_id": "t1"})
+        replan = await planner.re_plan({"task_id": "t1", "goal": "archive all newsletters",
+                                        "failed_step": {"action": "CLICK_BROWSER", "selector": ".archive"},
+                                        "error": "Timeout 5000ms exceeded", "vision_context": "link Inbox " * 400})
+        return plan, replan
+    plan, replan = asyncio.run(run())
+
+    first, second = ollama.payloads
+    assert first["system"] == SYSTEM_PROMPT # stable prefix
+    assert estimate_tokens(first["prompt"]) + estimate_tokens(SYSTEM_PROMPT) <= 400
+    assert "User Goal: archive all newsletters" in first["prompt"]
+    assert "archive newsletters #0" in first["prompt"] and "archive newsletters #3" not in first["prompt"]
+    assert "BROWSE https://mail.local/folder/0; CLICK_BROWSER" in first["prompt"] # not JSON
+    assert plan["usage"]["prompt_tokens"] == 250 and plan["usage"]["prefill_ms"] == 500.0
+
+    # The replan continues the first call's context: no system prompt or goal resent
+    assert second["context"] == [7] * 100 and "system" not in second
+    assert "Original Goal" not in second["prompt"] and "Timeout 5000ms exceeded" in second["prompt"]
+    assert estimate_tokens(second["prompt"]) + 100 <= 400 and "…" in second["prompt"] # screen state cut
+    assert replan["status"] == "success" and replan["usage"]["cuts"]
+
+def test_replan_starts_fresh_when_the_context_is_too_long(monkeypatch):
+    ollama = FakeOllama(context_size=300)
+    monkeypatch.setattr(agents.planner, "ollama_post", ollama.post)
+    monkeypatch.setenv("REMOTEPILOT_PROMPT_BUDGET", "400")
+    planner = PlannerAgent()
+    planner._contexts["t2"] = [7] * 300
+
+    asyncio.run(planner.re_plan({"task_id": "t2", "goal": "rename the report", "failed_step": {"action": "TYPE"},
+                                 "error": "no editor", "vision_context": "a desktop"}))
+    payload, = ollama.payloads
+    assert "context" not in payload and payload["system"] == SYSTEM_PROMPT
+    assert "Original Goal: rename the report" in payload["prompt"]
+    assert json.loads(json.dumps(payload)) == payload
+
+if __name__ == "__main__":
+    test_builder_cuts_lowest_priority_first()
+    test_section_left_with_one_token_is_dropped()
+    print("All tests passed!")
@@ -0,0 +1,60 @@
+import os
+import json
+import time
+import tempfile
+
+from policy import PolicyEngine, normalize_command, DEFAULT_RULES_FILE
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "policy_corpus.json")
+
+def load_corpus():
+    with open(CORPUS_FILE, "r") as f:
+        return json.load(f)
+
+def test_normalize_command():
+    assert normalize_command("r'm'  \"-rf\"\t/") == "rm -rf /"
+    assert normalize_command("rm${IFS}-rf$IFS/") == "rm -rf /"
+    assert normalize_command("R\\M -RF /") == "rm -rf /"
+
+def test_corpus_classification():
+    engine = PolicyEngine(DEFAULT_RULES_FILE)
+    corpus = load_corpus()
+    missed = [c for c in corpus["blocked"] if not engine.scan(c, "security")]
+    false_hits = [c for c in corpus["allowed"] if engine.scan(c, "security")]
+    assert not missed, f"Not blocked: {missed}"
+    assert not false_hits, f"Wrongly blocked: {false_hits}"
+
+def test_scan_plan_returns_first_offending_step():
+    engine = PolicyEngine(DEFAULT_RULES_FILE)
+    plan = [{"action": "TYPE", "value": "hello"}, {"action": "COMMAND", "value": "shutdown -h now"}]
+    step, keyword = engine.scan_plan(plan, "safety")
+    assert step is plan[1]
+    assert keyword == "shutdown"
+    assert engine.scan_plan(plan[:1], "safety") is None
+
+def test_hot_reload_and_bad_file_keeps_rules():
+    with tempfile.TemporaryDirectory() as tmp:
+        rules_file = os.path.join(tmp, "rules.json")
+        with open(rules_file, "w") as f:
+            json.dump({"security": {"literals": ["forbidden-one"]}}, f)
+        engine = PolicyEngine(rules_file, reload_interval=0)
+        assert engine.scan("run forbidden-one", "security")
+        assert not engine.scan("run forbidden-two", "security")
+
+        with open(rules_file, "w") as f:
+            json.dump({"security": {"literals": ["forbidden-two"]}}, f)
+        os.utime(rules_file, (time.time() + 5, time.time() + 5))
+        assert engine.scan("run forbidden-two", "security")
+        assert not engine.scan("run forbidden-one", "security")
+
+        with open(rules_file, "w") as f:
+            f.write("{not json")
+        os.utime(rules_file, (time.time() + 10, time.time() + 10))
+        assert engine.scan("run forbidden-two", "security")
+
+if __name__ == "__main__":
+    test_normalize_command()
+    test_corpus_classification()
+    test_scan_plan_returns_first_offending_step()
+    test_hot_reload_and_bad_file_keeps_rules()
+    print("Policy tests passed.")
@@ -0,0 +1,127 @@
+import asyncio
+
+from recipes import RecipeLibrary, compile_history
+from agents.memory import MemoryAgent
+from agents.specialist import DomainAgent
+from agents.verifier import VerifierAgent
+
+def test_library_matches_intents_and_fills_parameters():
+    library = RecipeLibrary()
+    recipe, plan = library.match("Send an email to bob@example.com about Q3 numbers saying see attached & thanks.")
+    assert recipe.name == "gmail_send"
+    assert "to=bob%40example.com&su=Q3%20numbers&body=see%20attached%20%26%20thanks" in plan[0]["value"]
+    assert all(step["expect"] and step["recipe"] == "gmail_send" for step in plan)
+    assert library.match("write mail to a@b.c saying hi")[1][0]["value"].endswith("to=a%40b.c&su=&body=hi")
+    assert library.match("search for cheapest flights")[0].name == "web_search"
+    assert library.match("search for cheapest flights and book one") is None # multi-step goal: plan it
+    assert library.match("open notepad") is None
+    assert library.match("search for shoes", domain="gmail") is None
+
+def _store_runs(db, runs):
+    memory = MemoryAgent(db)
+    async def store():
+        for i, (goal, plan, status) in enumerate(runs):
+            await memory.execute({"action": "store", "data": {"id": str(i), "goal": goal, "plan": plan, "status": status}})
+    asyncio.run(store())
+
+def wiki(term):
+    return [{"action": "BROWSE", "value": f"http://wiki.local/search?q={term}"},
+            {"action": "CLICK_BROWSER", "selector": "a.result:first-child"}]
+
+def test_compile_recipes_from_successful_history(tmp_path):
+    db = str(tmp_path / "memory.db")
+    _store_runs(db, [
+        ("Search the wiki for invoices", wiki("invoices"), "DONE"),
+        ("search the wiki for receipts", wiki("receipts"), "DONE"),
+        ("search the wiki for payroll", wiki("payroll"), "FAILED"),
+        ("open the dashboard", [{"action": "BROWSE", "value": "http://dash.local"}], "DONE"),
+        ("open the dashboard", [{"action": "BROWSE", "value": "http://dash.local"}], "DONE"),
+        ("check the inbox", [{"action": "BROWSE", "value": "http://mail.local"}], "DONE"), # only once
+        ("save the file", [{"action": "HOTKEY", "value": "ctrl+s"}], "DONE"), # not a browser plan
+        ("save the file", [{"action": "HOTKEY", "value": "ctrl+s"}], "DONE"),
+    ])
+    recipes = compile_history(db)
+    assert sorted(r.name for r in recipes) == ["history:open the dashboard", "history:search the wiki for {p4}"]
+
+    library = RecipeLibrary()
+    library.compiled = recipes
+    recipe, plan = library.match("search the wiki for contracts")
+    assert recipe.source == "history"
+    assert plan[0]["value"] == "http://wiki.local/search?q=contracts"
+    assert plan[1]["selector"] == "a.result:first-child"
+    assert library.match("check the inbox") is None
+
+def test_domain_agent_and_dom_verification(tmp_path):
+    checked = []
+
+    async def dom_check(expect):
+        checked.append(expect)
+        return {"verified": expect.get("text") == "Message sent", "details": "stub"}
+
+    async def run():
+        domain = DomainAgent(history_db=str(tmp_path / "none.db"))
+        hit = await domain.execute({"goal": "send email to a@b.c saying hi"})
+        miss = await domain.execute({"goal": "reboot the router"})
+        verifier = VerifierAgent(vision_agent=None, dom_check=dom_check)
+        results = [await verifier.execute({"expect": step["expect"], "action_status": "success"})
+                   for step in hit["plan"]]
+        failed_action = await verifier.execute({"expect": {"text": "Message sent"}, "action_status": "error",
+                                                "action_error": "Timeout 30000ms exceeded"})
+        return hit, miss, results, failed_action
+
+    hit, miss, results, failed_action = asyncio.run(run())
+    assert hit["status"] == "success" and hit["recipe"] == "gmail_send"
+    assert miss == {"status": "no_match"}
+    assert [r["verified"] for r in results] == [False, True]
+    assert len(checked) == 2 # the failed action never reached the page
+    assert failed_action["verified"] is False and "Timeout" in failed_action["details"]
+
+def test_recipe_task_skips_planner_and_vlm(monkeypatch):
+    import main
+    from coordinator import coordinator
+    from task_manager import task_manager, TaskStatus
+
+    class Planner:
+        name = "Planner"
+        async def execute(self, task):
+            raise AssertionError("planner must not run for a recipe")
+
+    class Action:
+        name = "Action"
+        def __init__(self):
+            self.steps = []
+        async def execute(self, step):
+            self.steps.append(step["action"])
+            return {"status": "success", "detail": step["action"]}
+        async def check_dom(self, expect):
+            return {"verified": True, "details": "ok"}
+
+    class Memory:
+        name = "Memory"
+        async def execute(self, task):
+            return {"status": "success"}
+
+    action = Action()
+    # Straight into the registry: nothing real (pyautogui, SQLite) gets built
+    for agent in (Planner(), action, Memory(), VerifierAgent(None, dom_check=action.check_dom),
+                  DomainAgent(history_db="/nonexistent/memory.db")):
+        monkeypatch.setitem(coordinator.agents._agents, agent.name, agent)
+
+    async def no_memory(goal, plan):
+        pass
+    from memory_store import memory_store
+    monkeypatch.setattr(memory_store, "add_interaction", no_memory)
+
+    task = task_manager.create_task("send email to a@b.c about lunch saying 12:30 works")
+    asyncio.run(main.process_task(task.id))
+    assert task.status == TaskStatus.DONE
+    assert action.steps == ["BROWSE", "CLICK_BROWSER"]
+    assert any("Recipe 'gmail_send' matched" in log["message"] for log in task.logs)
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_library_matches_intents_and_fills_parameters()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_compile_recipes_from_successful_history(pathlib.Path(tmp))
+        test_domain_agent_and_dom_verification(pathlib.Path(tmp))
+    print("All tests passed!")
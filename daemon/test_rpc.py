@@ -0,0 +1,87 @@
+import json
+import asyncio
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import rpc
+
+async def stub_handler(command):
+    if command == "boom":
+        raise RuntimeError("boom")
+    delay = float(command.split()[-1]) if command.startswith("sleep") else 0
+    await asyncio.sleep(delay)
+    return {"status": "success", "echo": command}
+
+app = FastAPI()
+
+@app.post("/batch")
+async def batch(body: dict):
+    return StreamingResponse(rpc.ndjson_results(stub_handler, body["commands"], body.get("parallel", False)),
+                             media_type="application/x-ndjson")
+
+@app.websocket("/rpc")
+async def ws(websocket: WebSocket):
+    await rpc.serve_websocket(websocket, stub_handler)
+
+def test_websocket_requests_are_ordered_unless_parallel():
+    with TestClient(app).websocket_connect("/rpc") as ws:
+        ws.send_json({"id": 1, "command": "sleep 0.2"})
+        ws.send_json({"id": 2, "command": "second"})
+        ws.send_json({"id": "side", "command": "side", "parallel": True})
+        ws.send_json({"id": 3, "command": "boom"})
+        ws.send_text("not json")
+        replies = [ws.receive_json() for _ in range(5)]
+    ids = [r["id"] for r in replies]
+    # The parallel request and the protocol error overtake the slow queue head
+    assert ids.index("side") < ids.index(1) < ids.index(2) < ids.index(3)
+    assert {"id": None, "error": "invalid JSON"} in replies
+    assert next(r for r in replies if r["id"] == 3) == {"id": 3, "error": "boom"}
+    assert next(r for r in replies if r["id"] == 2)["result"]["echo"] == "second"
+
+def test_batch_streams_ndjson():
+    client = TestClient(app)
+    lines = client.post("/batch", json={"commands": ["a", "boom", "b"]}).text.splitlines()
+    results = [json.loads(l) for l in lines]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[1] == {"index": 1, "error": "boom"}
+
+    lines = client.post("/batch", json={"commands": ["sleep 0.2", "fast"], "parallel": True}).text.splitlines()
+    assert [json.loads(l)["index"] for l in lines] == [1, 0] # completion order
+
+def test_daemon_command_endpoints_refuse_foreign_callers(monkeypatch):
+    from starlette.websockets import WebSocketDisconnect
+    import main
+    calls = []
+    async def user_request(command):
+        calls.append(command)
+        return {"status": "success"}
+    monkeypatch.setattr(main.coordinator, "user_request", user_request)
+    client = TestClient(main.app)
+    evil = {"origin": "https://evil.example"}
+
+    assert client.post("/execute", json={"command": "run rm -rf ~"}, headers=evil).status_code == 403
+    assert client.post("/execute/batch", json={"commands": ["run rm -rf ~"]}, headers=evil).status_code == 403
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/ws/rpc", headers=evil) as ws:
+            ws.send_json({"id": 1, "command": "run rm -rf ~"})
+            ws.receive_json()
+    assert calls == []
+
+    monkeypatch.setenv("REMOTEPILOT_TOKEN", "s3cret")
+    assert client.post("/execute", json={"command": "list models"}).status_code == 403
+    token = {"x-remotepilot-token": "s3cret", "origin": "http://127.0.0.1:8000"}
+    assert client.post("/execute", json={"command": "list models"}, headers=token).json() == {"status": "success"}
+    with client.websocket_connect("/ws/rpc?token=s3cret") as ws:
+        ws.send_json({"id": 1, "command": "see"})
+        assert ws.receive_json() == {"id": 1, "result": {"status": "success"}}
+    assert calls == ["list models", "see"]
+
+if __name__ == "__main__":
+    test_websocket_requests_are_ordered_unless_parallel()
+    test_batch_streams_ndjson()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_daemon_command_endpoints_refuse_foreign_callers(monkeypatch)
+    print("RPC tests passed.")
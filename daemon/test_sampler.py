@@ -0,0 +1,46 @@
+import time
+
+from sampler import SystemSampler, FIELDS
+
+def synthetic(sampler, cpu_values, ram=50.0, step=1.0):
+    now = time.time()
+    for i, cpu in enumerate(cpu_values):
+        ts = now - (len(cpu_values) - i) * step
+        sampler.samples.append((ts, cpu, ram) + (0,) * (len(FIELDS) - 2))
+
+def test_background_sampling_fills_ring_buffer():
+    sampler = SystemSampler(interval=0.02, capacity=5)
+    sampler.start()
+    time.sleep(0.3)
+    sampler.stop()
+    assert len(sampler.samples) == 5 # capped by capacity
+    latest = sampler.latest()
+    assert set(latest) == {"ts", *FIELDS}
+    assert latest["daemon_rss"] > 0
+
+def test_history_window_and_downsampling():
+    sampler = SystemSampler(interval=1.0)
+    synthetic(sampler, [10.0] * 50 + [90.0] * 50)
+    full = sampler.history(window=1000, points=10)
+    assert len(full["ts"]) == 10
+    assert full["interval"] == 10.0
+    assert full["series"]["cpu"][0] == 10.0 and full["series"]["cpu"][-1] == 90.0
+    recent = sampler.history(window=20.5, points=100)
+    assert len(recent["ts"]) == 20 and set(recent["series"]["cpu"]) == {90.0}
+    assert sampler.history(window=1000, points=1000)["interval"] == 1.0
+    assert SystemSampler().history()["ts"] == []
+
+def test_saturation_needs_sustained_load():
+    sampler = SystemSampler(cpu_limit=85, ram_limit=90, saturation_window=3)
+    synthetic(sampler, [20, 99, 20])
+    assert sampler.saturated() is None # one spike is not saturation
+    synthetic(sampler, [95, 97, 99])
+    assert "CPU" in sampler.saturated()
+    synthetic(sampler, [10, 10, 10], ram=95)
+    assert "RAM" in sampler.saturated()
+
+if __name__ == "__main__":
+    test_background_sampling_fills_ring_buffer()
+    test_history_window_and_downsampling()
+    test_saturation_needs_sustained_load()
+    print("Sampler tests passed.")
@@ -0,0 +1,98 @@
+import os
+import time
+import asyncio
+import tempfile
+from datetime import datetime
+
+import pytest
+
+from agents.scheduler import SchedulerAgent, parse_cron
+
+async def noop_submit(goal):
+    pass
+
+def test_parse_cron_standard_forms():
+    assert parse_cron("*/5 * * * *").fields[6].expressions  # minute field
+    # Cron weekday 0 is Sunday (APScheduler alone would read it as Monday)
+    sunday = parse_cron("0 10 * * 0").get_next_fire_time(None, datetime(2026, 10, 19, tzinfo=datetime.now().astimezone().tzinfo))
+    assert sunday.weekday() == 6
+    weekdays = parse_cron("0 9 * * 1-5")
+    assert "mon-fri" in str(weekdays)
+    assert "day_of_week='*'" in str(parse_cron("0 9 * * 0-6")) and "day_of_week='*'" in str(parse_cron("0 9 * * 0-7"))
+    assert "day_of_week='sun,mon-wed'" in str(parse_cron("0 9 * * 0-3"))
+    assert "day_of_week='sun,tue,thu,sat'" in str(parse_cron("0 9 * * */2"))
+    assert "day_of_week='fri-sun'" in str(parse_cron("0 9 * * 5-7"))
+    assert "hour='0'" in str(parse_cron("@daily"))
+    assert parse_cron("30 0 12 * * *", jitter=5).jitter == 5
+
+@pytest.mark.parametrize("expr", ["* * *", "61 * * * *", "* * * * * * *", "0 25 * * *"])
+def test_parse_cron_rejects_invalid(expr):
+    with pytest.raises(ValueError):
+        parse_cron(expr)
+
+def test_jobs_persist_and_ids_are_unique():
+    async def run(db):
+        agent = SchedulerAgent(noop_submit, db_path=db)
+        ids = [(await agent.execute({"goal": f"goal {i}", "cron": "0 10 * * *"}))["job_id"] for i in range(5)]
+        bad = await agent.execute({"goal": "x", "cron": "not a cron"})
+        agent.shutdown()
+        return ids, bad
+
+    async def reopen(db):
+        agent = SchedulerAgent(noop_submit, db_path=db)
+        jobs = agent.list_jobs()
+        agent.shutdown()
+        return jobs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "jobs.db")
+        ids, bad = asyncio.run(run(db))
+        assert len(set(ids)) == 5
+        assert bad["status"] == "error"
+        jobs = asyncio.run(reopen(db))
+        assert sorted(j["id"] for j in jobs) == sorted(ids)
+
+def test_pause_resume_delete():
+    async def run(db):
+        agent = SchedulerAgent(noop_submit, db_path=db)
+        job_id = (await agent.execute({"goal": "g", "cron": "@hourly"}))["job_id"]
+        assert (await agent.execute({"action": "pause", "job_id": job_id}))["status"] == "success"
+        assert agent.list_jobs()[0]["paused"]
+        await agent.execute({"action": "resume", "job_id": job_id})
+        assert not agent.list_jobs()[0]["paused"]
+        await agent.execute({"action": "delete", "job_id": job_id})
+        missing = await agent.execute({"action": "delete", "job_id": job_id})
+        agent.shutdown()
+        return agent.list_jobs(), missing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs, missing = asyncio.run(run(os.path.join(tmp, "jobs.db")))
+        assert jobs == []
+        assert missing["status"] == "error"
+
+def test_tick_overhead_with_10k_jobs():
+    async def run(db, count=10000, ticks=50):
+        agent = SchedulerAgent(noop_submit, db_path=db)
+        start = time.perf_counter()
+        for i in range(count):
+            await agent.execute({"goal": f"goal {i}", "cron": f"{i % 60} {i % 24} * * *"})
+        insert_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(ticks):
+            agent.scheduler._process_jobs()
+        tick_ms = (time.perf_counter() - start) / ticks * 1000
+        agent.shutdown()
+        return insert_s, tick_ms
+
+    with tempfile.TemporaryDirectory() as tmp:
+        insert_s, tick_ms = asyncio.run(run(os.path.join(tmp, "jobs.db")))
+        # A tick only queries due jobs via the next_run_time index
+        assert tick_ms < 50, f"10k jobs: insert {insert_s:.1f}s, scheduler tick {tick_ms:.2f} ms"
+
+if __name__ == "__main__":
+    test_parse_cron_standard_forms()
+    test_jobs_persist_and_ids_are_unique()
+    test_pause_resume_delete()
+    test_tick_overhead_with_10k_jobs()
+    print("Scheduler tests passed.")
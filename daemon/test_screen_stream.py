@@ -0,0 +1,86 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from screen_stream import TileEncoder, QualityController, pack_frame
+
+def test_dirty_tiles_and_rect_merging():
+    encoder = TileEncoder(tile=32)
+    frame = np.zeros((100, 200, 3), np.uint8) # not a multiple of the tile size
+    assert encoder.dirty_tiles(frame).all() # first frame is all dirty
+    encoder.prev = frame
+
+    changed = frame.copy()
+    changed[5, 40:100] = 1 # tiles (0,1)..(0,3)
+    changed[99, 199] = 1 # partial corner tile (3,6)
+    grid = encoder.dirty_tiles(changed)
+    assert grid.shape == (4, 7)
+    assert sorted(zip(*np.nonzero(grid))) == [(0, 1), (0, 2), (0, 3), (3, 6)]
+    assert encoder.rects(grid, 200, 100) == [(32, 0, 96, 32), (192, 96, 8, 4)]
+
+    odd = TileEncoder(tile=20) # byte-compare path (tile width not a multiple of 8)
+    odd.prev = frame
+    assert sorted(zip(*np.nonzero(odd.dirty_tiles(changed)))) == [(0, 2), (0, 3), (0, 4), (4, 9)]
+
+def test_encode_sends_only_changes():
+    pytest.importorskip("PIL")
+    encoder = TileEncoder(tile=32)
+    frame = np.full((64, 96, 3), 200, np.uint8)
+    key, payload = encoder.encode(frame, 70)
+    assert key["key"] and len(key["rects"]) == 2
+    idle, nothing = encoder.encode(frame.copy(), 70)
+    assert idle["rects"] == [] and nothing == b""
+
+    frame = frame.copy()
+    frame[40, 40] = 0
+    delta, payload = encoder.encode(frame, 70)
+    assert not delta["key"]
+    assert [(r["x"], r["y"]) for r in delta["rects"]] == [(32, 32)]
+    packed = pack_frame(delta, payload)
+    size = struct.unpack(">I", packed[:4])[0]
+    assert json.loads(packed[4:4 + size]) == delta
+    assert packed[4 + size:] == payload and len(payload) == delta["rects"][0]["len"]
+    assert encoder.encode(frame, 70, keyframe=True)[0]["key"]
+
+def test_quality_tracks_ack_latency():
+    quality = QualityController(target_latency=0.2, quality=70)
+    for _ in range(10):
+        quality.on_ack(1.0)
+    assert quality.quality == quality.min_quality
+    for _ in range(40):
+        quality.on_ack(0.01)
+    assert quality.quality == quality.max_quality
+
+def test_screen_socket_refuses_foreign_pages(monkeypatch):
+    from types import SimpleNamespace
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+    import main
+    from coordinator import coordinator
+    from display.fake import FakeDisplay
+    monkeypatch.setitem(coordinator.agents._agents, "Vision", SimpleNamespace(capture=FakeDisplay(128, 64).screenshot))
+    client = TestClient(main.app)
+
+    def frame(path, **headers):
+        with client.websocket_connect(path, headers=headers) as ws:
+            return ws.receive_bytes()
+
+    assert frame("/ws/screen", origin="http://localhost:5173")
+    assert frame("/ws/screen") # the app: no Origin
+    with pytest.raises(WebSocketDisconnect) as refused:
+        frame("/ws/screen", origin="https://evil.example")
+    assert refused.value.code == 1008
+
+    monkeypatch.setenv("REMOTEPILOT_TOKEN", "s3cret")
+    with pytest.raises(WebSocketDisconnect):
+        frame("/ws/screen", origin="http://localhost:5173")
+    assert frame("/ws/screen?token=s3cret", origin="http://localhost:5173")
+    assert frame("/ws/screen", authorization="Bearer s3cret")
+
+if __name__ == "__main__":
+    test_dirty_tiles_and_rect_merging()
+    test_encode_sends_only_changes()
+    test_quality_tracks_ack_latency()
+    print("Screen stream tests passed.")
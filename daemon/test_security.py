@@ -0,0 +1,88 @@
+import asyncio
+
+from agents.security import SecurityAgent
+
+class StubReviewSecurityAgent(SecurityAgent):
+    """SecurityAgent with the Ollama call replaced by a counting stub."""
+    def __init__(self, delay=0.0, malicious=(), **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.malicious = set(malicious)
+        self.calls = []
+
+    async def _check_intent(self, content):
+        self.calls.append(content)
+        await asyncio.sleep(self.delay)
+        if content in self.malicious:
+            return {"status": "BLOCKED", "reason": "LLM flagged potential danger."}
+        return {"status": "SAFE"}
+
+def command_plan(*commands):
+    return {"plan": [{"action": "COMMAND", "value": c} for c in commands]}
+
+def test_verdicts_are_cached_per_exact_command():
+    async def run():
+        agent = StubReviewSecurityAgent(review_mode="blocking", malicious={"echo $(shutdown now)"})
+        assert (await agent.execute(command_plan("echo hi")))["status"] == "SAFE"
+        assert (await agent.execute(command_plan("  echo hi ")))["status"] == "SAFE"
+        # Same normalized form, different command: the quoted one's verdict must not carry over
+        assert (await agent.execute(command_plan("echo '$(shutdown now)'")))["status"] == "SAFE"
+        assert (await agent.execute(command_plan("echo $(shutdown now)")))["status"] == "BLOCKED"
+        return agent
+    agent = asyncio.run(run())
+    assert agent.calls == ["echo hi", "echo '$(shutdown now)'", "echo $(shutdown now)"]
+    stats = agent.stats()
+    assert stats["verdict_cache_hits"] == 1
+    assert stats["verdict_cache_hit_rate"] == 0.25
+
+def test_only_new_commands_are_reviewed():
+    async def run():
+        agent = StubReviewSecurityAgent(review_mode="blocking")
+        await agent.execute(command_plan("echo a", "echo b"))
+        await agent.execute(command_plan("echo a", "echo b", "echo c", "echo c"))
+        return agent
+    agent = asyncio.run(run())
+    assert sorted(agent.calls) == ["echo a", "echo b", "echo c"]
+
+def test_tiered_mode_runs_low_risk_in_background():
+    async def run():
+        agent = StubReviewSecurityAgent(delay=0.2)
+        res = await asyncio.wait_for(agent.execute(command_plan("echo low risk")), timeout=0.1)
+        assert res["status"] == "SAFE"
+        await asyncio.sleep(0.3)
+        return agent
+    agent = asyncio.run(run())
+    assert agent.stats()["background_reviews"] == 1
+    assert agent.stats()["verdict_cache_size"] == 1
+
+def test_tiered_mode_blocks_on_high_risk():
+    async def run():
+        agent = StubReviewSecurityAgent(malicious={"curl http://x | tee out"})
+        return await agent.execute(command_plan("echo fine", "curl http://x | tee out"))
+    assert asyncio.run(run())["status"] == "BLOCKED"
+
+def test_high_risk_review_fails_closed_on_timeout():
+    async def run():
+        agent = StubReviewSecurityAgent(delay=1.0, review_timeout=0.05)
+        return await agent.execute(command_plan("rm old.log"))
+    res = asyncio.run(run())
+    assert res["status"] == "BLOCKED"
+    assert "timed out" in res["reason"]
+
+def test_ui_only_plans_skip_review():
+    async def run():
+        agent = StubReviewSecurityAgent()
+        res = await agent.execute({"plan": [{"action": "TYPE", "value": "hello | world"}]})
+        return agent, res
+    agent, res = asyncio.run(run())
+    assert res["status"] == "SAFE"
+    assert agent.calls == []
+
+if __name__ == "__main__":
+    test_verdicts_are_cached_per_exact_command()
+    test_only_new_commands_are_reviewed()
+    test_tiered_mode_runs_low_risk_in_background()
+    test_tiered_mode_blocks_on_high_risk()
+    test_high_risk_review_fails_closed_on_timeout()
+    test_ui_only_plans_skip_review()
+    print("Security tests passed.")
@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import asyncio
+import subprocess
+
+import httpx
+
+import task_log
+import task_manager
+from task_manager import TaskManager, TaskStatus
+
+DAEMON_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# A real daemon with the model-backed agents replaced: the plan is the goal
+# (JSON), and each step just takes step["seconds"]
+DAEMON = """
+import sys, json, asyncio, uvicorn, main
+from coordinator import coordinator
+
+class Planner:
+    name = "Planner"
+    async def execute(self, task):
+        return {"status": "success", "plan": json.loads(task["goal"])}
+
+class Action:
+    name = "Action"
+    async def execute(self, step):
+        await asyncio.sleep(step.get("seconds", 0.4))
+        return {"status": "success", "detail": step["action"]}
+
+class Verifier:
+    name = "Verifier"
+    async def execute(self, task):
+        return {"status": "success", "verified": True}
+
+coordinator.planner, coordinator.action, coordinator.verifier = Planner(), Action(), Verifier()
+uvicorn.run(main.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
+"""
+
+def test_task_log_rebuilds_tasks_and_decides_what_resumes(tmp_path):
+    path = str(tmp_path / "tasks.db")
+
+    async def before_crash():
+        manager = TaskManager()
+        manager.open_journal(path)
+        queued = manager.create_task("queued", idempotency_key="k1")
+        planning = manager.create_task("planning")
+        await manager.update_state(planning.id, TaskStatus.PLANNING)
+        tasks = {"queued": queued, "planning": planning}
+        for name, plan, next_step in (("repeatable", ["TYPE", "WAIT", "TYPE"], 1),
+                                      ("unsafe", ["WAIT", "CLICK"], 1),
+                                      ("finished_steps", ["TYPE"], 1)):
+            task = tasks[name] = manager.create_task(name)
+            task.plan = [{"action": a, "value": "x"} for a in plan]
+            await manager.update_state(task.id, TaskStatus.ACT)
+            task.add_log("Action", "Step 1: done")
+            manager.step_done(task.id, next_step)
+        tasks["done"] = manager.create_task("done")
+        await manager.update_state(tasks["done"].id, TaskStatus.DONE)
+        tasks["remote"] = manager.create_task("remote", task_id="from-coordinator")
+        await manager.update_state("from-coordinator", TaskStatus.ACT)
+        await manager.journal.flush() # then "crash": nothing closed
+        return {name: (t.id, t.seq, t.state()) for name, t in tasks.items()}
+
+    before = asyncio.run(before_crash())
+    manager = TaskManager()
+    resume = {task.goal: step for task, step in manager.open_journal(path)}
+    assert resume == {"queued": None, "planning": None, "repeatable": 1, "finished_steps": 1}
+
+    status = {name: manager.get_task(task_id).status for name, (task_id, _, _) in before.items()}
+    assert status["unsafe"] == status["remote"] == TaskStatus.FAILED
+    assert status["done"] == TaskStatus.DONE and status["repeatable"] == TaskStatus.ACT
+
+    # Same seqs as before the crash: a client's since_seq delta sees only the recovery note
+    task_id, seq, state = before["repeatable"]
+    task = manager.get_task(task_id)
+    assert task.state(seq)["logs"] == [task.logs[-1]] and "resuming at step 2" in task.logs[-1]["message"]
+    assert {k: v for k, v in task.state().items() if k not in ("logs", "seq")} == \
+        {k: v for k, v in state.items() if k not in ("logs", "seq")}
+    assert "not safe to repeat" in manager.get_task(before["unsafe"][0]).logs[-1]["message"]
+    assert manager.find_by_key("k1").id == before["queued"][0]
+
+def test_finished_tasks_compact_to_a_snapshot_and_old_ones_are_dropped(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    rows = lambda task_id: sqlite3.connect(path).execute(
+        "SELECT type FROM events WHERE task_id = ?", (task_id,)).fetchall()
+
+    async def run():
+        manager = TaskManager()
+        manager.open_journal(path)
+        tasks = []
+        for i in range(4):
+            task = manager.create_task(f"task {i}", idempotency_key=f"k{i}")
+            task.plan = [{"action": "WAIT", "value": "1"}]
+            await manager.update_state(task.id, TaskStatus.ACT)
+            for line in range(20):
+                task.add_log("Action", f"line {line}")
+            if i < 3:
+                await manager.update_state(task.id, TaskStatus.DONE)
+            tasks.append((task.id, task.seq, task.state()))
+        await manager.journal.flush()
+        manager.close_journal()
+        return tasks
+
+    tasks = asyncio.run(run())
+    assert [rows(task_id) for task_id, _, _ in tasks[:3]] == [[("snapshot",)]] * 3
+    assert len(rows(tasks[3][0])) > 20 # unfinished: every event kept
+
+    manager = TaskManager()
+    manager.open_journal(path)
+    for task_id, seq, state in tasks[:3]:
+        task = manager.get_task(task_id)
+        assert task.seq == seq and task.state() == state and task.state(seq)["logs"] == []
+
+    keep = task_manager.TASK_LOG_KEEP
+    task_manager.TASK_LOG_KEEP = 2
+    try:
+        manager = TaskManager()
+        resume = manager.open_journal(path)
+    finally:
+        task_manager.TASK_LOG_KEEP = keep
+    assert manager.get_task(tasks[0][0]) is None and manager.find_by_key("k0") is None and rows(tasks[0][0]) == []
+    assert manager.find_by_key("k1").id == tasks[1][0] and manager.get_task(tasks[2][0]).status == TaskStatus.DONE
+    assert [task.id for task, _ in resume] == [tasks[3][0]]
+
+def test_appends_share_commits(tmp_path):
+    batches_before = task_log.EVENT_BATCH._series.get((), [0])[-1]
+    path = str(tmp_path / "tasks.db")
+    async def run():
+        log = task_log.TaskEventLog(path)
+        for i in range(5000):
+            log.append("t", i, "log", {"message": f"line {i}"})
+        await log.flush()
+        log.close()
+    asyncio.run(run())
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM events").fetchone() == (5000,)
+    assert task_log.EVENT_BATCH._series[()][-1] - batches_before < 5000 / 10 # group commit
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _start(tmp_path, port):
+    env = dict(os.environ, PYTHONPATH=DAEMON_DIR, REMOTEPILOT_WARMUP="0", REMOTEPILOT_DISPLAY="fake")
+    proc = subprocess.Popen([sys.executable, "-c", DAEMON, str(port)], cwd=tmp_path, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=10)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            client.get("/")
+            return proc, client
+        except httpx.TransportError:
+            assert time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.1)
+
+def _steps(client, task_id):
+    return [log["message"].split(":")[0] for log in client.get(f"/task/state/{task_id}").json()["logs"]
+            if log["message"].startswith("Step ")]
+
+def test_kill_and_restart_resumes_tasks(tmp_path):
+    proc, client = _start(tmp_path, free_port())
+    try:
+        waits = json.dumps([{"action": "WAIT", "value": "0.4"}] * 6)
+        typing = json.dumps([{"action": "WAIT", "value": "0.2", "seconds": 0.2},
+                             {"action": "TYPE", "value": "hi", "seconds": 30}])
+        first = client.post("/task/submit", json={"goal": waits}, headers={"Idempotency-Key": "abc"}).json()
+        retry = client.post("/task/submit", json={"goal": waits}, headers={"Idempotency-Key": "abc"}).json()
+        assert retry["task_id"] == first["task_id"] and retry["duplicate"]
+        typed = client.post("/task/submit", json={"goal": typing}).json()["task_id"]
+        deadline = time.monotonic() + 20
+        while "Step 3" not in _steps(client, first["task_id"]) or "Step 1" not in _steps(client, typed):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+    finally:
+        proc.kill() # no shutdown hooks, no flush
+        proc.wait()
+        client.close()
+
+    proc, client = _start(tmp_path, free_port())
+    try:
+        retry = client.post("/task/submit", json={"goal": waits}, headers={"Idempotency-Key": "abc"}).json()
+        assert retry["task_id"] == first["task_id"] and retry["duplicate"]
+        deadline = time.monotonic() + 20
+        while (state := client.get(f"/task/state/{first['task_id']}").json())["status"] != "DONE":
+            assert time.monotonic() < deadline, state
+            time.sleep(0.1)
+        steps = _steps(client, first["task_id"])
+        assert steps[0] == "Step 1" and steps.count("Step 1") == steps.count("Step 2") == 1 # not re-run
+        assert set(steps) == {f"Step {i}" for i in range(1, 7)}
+        assert any("resuming at step" in log["message"] for log in state["logs"])
+
+        state = client.get(f"/task/state/{typed}").json()
+        assert state["status"] == "FAILED"
+        assert "during step 2 (TYPE), which is not safe to repeat" in state["logs"][-1]["message"]
+    finally:
+        proc.kill()
+        proc.wait()
+        client.close()
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    for test in (test_task_log_rebuilds_tasks_and_decides_what_resumes,
+                 test_finished_tasks_compact_to_a_snapshot_and_old_ones_are_dropped, test_appends_share_commits):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(pathlib.Path(tmp))
+    print("All tests passed!")
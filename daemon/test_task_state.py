@@ -0,0 +1,68 @@
+import asyncio
+
+from datetime import datetime
+
+from task_manager import TaskManager, TaskStatus, LogEntry, LEVELS
+
+def test_since_seq_returns_only_changes():
+    manager = TaskManager()
+    task = manager.create_task("goal")
+    task.plan = [{"action": "WAIT", "value": "1"}]
+    task.add_log("Planner", "planned")
+    full = task.state()
+    assert full["plan"] and len(full["logs"]) == 1
+
+    seq = full["seq"]
+    assert task.state(seq) == {"id": task.id, "status": "IDLE", "goal": "goal", "seq": seq,
+                               "since_seq": seq, "logs": []}
+
+    asyncio.run(manager.update_state(task.id, TaskStatus.ACT))
+    task.add_log("Action", "step 1")
+    delta = task.state(seq)
+    assert delta["status"] == "ACT" and delta["seq"] > seq
+    assert "plan" not in delta # unchanged plan is not resent
+    assert [l["message"] for l in delta["logs"]] == ["step 1"]
+
+    task.plan = [{"action": "WAIT", "value": "2"}]
+    assert task.state(delta["seq"])["plan"] == task.plan
+    assert task.state(0)["logs"] == task.logs
+
+def test_logs_are_stored_in_columns_and_serialized_as_before():
+    task = TaskManager().create_task("goal")
+    assert not hasattr(task, "__dict__")
+    before = datetime.now()
+    log = task.add_log("Planner", "planned", "WARNING")
+    task.add_log("Fleet", "remote line", "NOTICE") # a worker's own level
+    assert set(log) == {"timestamp", "agent", "message", "level"}
+    assert before <= datetime.fromisoformat(log["timestamp"]) <= datetime.now()
+    assert task.logs[0] == log and task.logs[-1]["level"] == "NOTICE" and len(task.logs) == 2
+    assert task.logs.levels[1] == LEVELS.code("NOTICE") # new names get a code once
+    # Journal replay parses the ISO string back without drifting
+    assert LogEntry.from_dict(log).to_dict() == log
+
+def test_timestamps_follow_the_wall_clock_across_a_suspend(monkeypatch):
+    import time
+    task = TaskManager().create_task("goal")
+    resumed = time.time() + 3600 # an hour asleep: the monotonic clock didn't move
+    monkeypatch.setattr(time, "time", lambda: resumed)
+    log = task.add_log("Action", "after resume")
+    assert datetime.fromisoformat(log["timestamp"]) == datetime.fromtimestamp(round(resumed, 6))
+    assert LogEntry.from_dict(log).timestamp == round(resumed, 6)
+
+def test_log_socket_releases_its_queue_when_the_client_leaves():
+    from fastapi.testclient import TestClient
+    import main
+    from task_manager import task_manager
+    before = len(task_manager.log_queues)
+    with TestClient(main.app).websocket_connect("/ws/logs") as ws:
+        assert len(task_manager.log_queues) == before + 1
+        task_manager.log_queues[-1].put_nowait({"task_id": "t", "type": "log", "data": {"message": "hi"}})
+        assert ws.receive_json()["data"]["message"] == "hi"
+    # Left while idle: nothing was sent that could have failed, the queue goes anyway
+    assert len(task_manager.log_queues) == before
+
+if __name__ == "__main__":
+    test_since_seq_returns_only_changes()
+    test_logs_are_stored_in_columns_and_serialized_as_before()
+    test_log_socket_releases_its_queue_when_the_client_leaves()
+    print("Task state tests passed.")
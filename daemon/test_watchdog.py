@@ -0,0 +1,171 @@
+import os
+import time
+import asyncio
+import tempfile
+
+import psutil
+import pytest
+
+from agents.base import Agent
+from agents.monitor import MonitorAgent
+from sandbox.local import ProcessSandbox
+from watchdog import watchdog
+
+@pytest.fixture
+def fast_watchdog(monkeypatch):
+    monkeypatch.setattr(watchdog, "hang_threshold", 0.3)
+    monkeypatch.setattr(watchdog, "check_interval", 0.05)
+    monkeypatch.setattr(watchdog, "phase_budgets", {"ACT": 0.6})
+    return watchdog
+
+class HungAgent(Agent):
+    """Never returns, like a stuck Ollama call or browser navigation."""
+    def __init__(self):
+        super().__init__(name="Hung")
+
+    async def execute(self, task):
+        await asyncio.sleep(3600)
+
+class SlowAgent(Agent):
+    """Slow but alive: each call finishes well inside the hang threshold."""
+    def __init__(self):
+        super().__init__(name="Slow")
+
+    async def execute(self, task):
+        await asyncio.sleep(0.1)
+        return {"status": "success"}
+
+async def run_watched(monitor, task_id, body):
+    """Mimics process_task: watch, run, report how it ended."""
+    monitor.watch(task_id)
+    start = time.monotonic()
+    try:
+        await body()
+        return "finished", None, time.monotonic() - start
+    except asyncio.CancelledError:
+        return "cancelled", monitor.abort_reason(task_id), time.monotonic() - start
+    finally:
+        monitor.unwatch(task_id)
+
+def test_hung_task_is_cancelled(fast_watchdog):
+    monitor = MonitorAgent()
+    outcome, reason, elapsed = asyncio.run(run_watched(monitor, "hung", lambda: HungAgent().execute({})))
+    assert outcome == "cancelled"
+    assert reason.startswith("hung")
+    assert elapsed < 2
+    assert "hung" not in fast_watchdog.watches
+
+def test_progress_keeps_task_alive(fast_watchdog):
+    async def body():
+        agent = SlowAgent()
+        for _ in range(8): # 0.8s total, > hang threshold, but progress every 0.1s
+            await agent.execute({})
+
+    outcome, reason, _ = asyncio.run(run_watched(MonitorAgent(), "slow", body))
+    assert outcome == "finished", reason
+
+def test_phase_budget_enforced_despite_progress(fast_watchdog):
+    async def body():
+        fast_watchdog.enter_phase("phase", "ACT")
+        agent = SlowAgent()
+        while True:
+            await agent.execute({})
+
+    outcome, reason, elapsed = asyncio.run(run_watched(MonitorAgent(), "phase", body))
+    assert outcome == "cancelled"
+    assert "ACT" in reason and "budget" in reason
+    assert elapsed < 2
+
+def test_explicit_abort(fast_watchdog):
+    monitor = MonitorAgent()
+
+    async def run():
+        task = asyncio.create_task(run_watched(monitor, "t1", lambda: asyncio.sleep(5)))
+        await asyncio.sleep(0.05)
+        missing = await monitor.execute({"action": "abort", "task_id": "nope"})
+        res = await monitor.execute({"action": "abort", "task_id": "t1", "reason": "cancelled by user"})
+        return missing, res, await task
+
+    missing, res, (outcome, reason, _) = asyncio.run(run())
+    assert missing["status"] == "error"
+    assert res["status"] == "abort_triggered"
+    assert (outcome, reason) == ("cancelled", "cancelled by user")
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX process groups")
+def test_cancel_kills_sandbox_process_group(fast_watchdog):
+    sandbox = ProcessSandbox()
+    pid_file = os.path.join(tempfile.mkdtemp(), "child.pid")
+    # The shell spawns a grandchild; killing only the shell would leak it
+    command = f"sleep 30 & echo $! > {pid_file}; wait"
+
+    async def run():
+        return await run_watched(MonitorAgent(), "sandbox",
+                                 lambda: sandbox.run_command(command, env={"PATH": os.environ["PATH"]}))
+
+    outcome, reason, elapsed = asyncio.run(run())
+    assert outcome == "cancelled"
+    assert elapsed < 5
+    assert sandbox.active_processes == []
+
+    child = int(open(pid_file).read())
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            if psutil.Process(child).status() == psutil.STATUS_ZOMBIE:
+                break
+        except psutil.NoSuchProcess:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("sandbox grandchild survived cancellation")
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIX process groups")
+def test_cancelled_task_kills_its_command_steps(monkeypatch):
+    import main
+    from coordinator import coordinator
+    from task_manager import task_manager, TaskStatus
+    from display.fake import FakeDisplay
+    from agents.action import ActionAgent
+    from agents.vision import VisionAgent
+
+    pid_file = os.path.join(tempfile.mkdtemp(), "child.pid")
+    plan = [{"action": "COMMAND", "value": f"sleep 30 & echo $! > {pid_file}; wait"},
+            {"action": "WAIT", "value": "30"}]
+
+    class Stub(Agent):
+        async def execute(self, task):
+            return {"status": "success", "plan": plan, "verified": True}
+
+    display = FakeDisplay(320, 240)
+    for agent in (Stub("Planner"), Stub("Security"), Stub("Verifier"), Stub("Memory"),
+                  ActionAgent(backend=display), VisionAgent("http://127.0.0.1:9", display=display)):
+        monkeypatch.setitem(coordinator.agents._agents, agent.name, agent)
+    monkeypatch.setenv("REMOTEPILOT_PIPELINE", "0")
+
+    async def run():
+        task = task_manager.create_task("launch the long job")
+        running = asyncio.create_task(main.process_task(task.id))
+        while task.next_step < 1: # the COMMAND returned; the WAIT is running
+            await asyncio.sleep(0.05)
+        await coordinator.monitor.execute({"action": "abort", "task_id": task.id, "reason": "cancelled by user"})
+        await running
+        return task
+
+    task = asyncio.run(run())
+    assert task.status == TaskStatus.CANCELLED
+    child = int(open(pid_file).read())
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        try:
+            if psutil.Process(child).status() == psutil.STATUS_ZOMBIE:
+                break
+        except psutil.NoSuchProcess:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("COMMAND step's process survived the task's cancellation")
+    assert task.id not in coordinator.action._commands
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(pytest.main([__file__, "-q"]))
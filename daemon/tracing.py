@@ -0,0 +1,174 @@
+import os
+import time
+import random
+import asyncio
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "category", "start_ns", "end_ns", "tid", "attrs")
+
+    def __init__(self, span_id, parent_id, name, category, start_ns, tid, attrs):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.category = category
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.tid = tid
+        self.attrs = attrs
+
+class TaskTrace:
+    """Spans and instant events recorded for one task."""
+    def __init__(self, task_id: str, max_spans: int):
+        self.task_id = task_id
+        self.trace_id = "%032x" % random.getrandbits(128)
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.events: List[tuple] = [] # (name, ts_ns, tid, attrs)
+        self.dropped = 0
+        self._next_id = 1
+        self._tids: Dict[int, int] = {}
+        # perf_counter is monotonic; anchor it to wall time once for export
+        self._wall_anchor = time.time_ns()
+        self._perf_anchor = time.perf_counter_ns()
+
+    def now(self) -> int:
+        return self._wall_anchor + (time.perf_counter_ns() - self._perf_anchor)
+
+    def tid(self) -> int:
+        # One track per asyncio task, so concurrent work doesn't mis-nest in viewers
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = 0
+        return self._tids.setdefault(key, len(self._tids) + 1)
+
+    def new_span(self, name, category, parent_id, attrs) -> Optional[Span]:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return None
+        span = Span(self._next_id, parent_id, name, category, self.now(), self.tid(), attrs)
+        self._next_id += 1
+        self.spans.append(span)
+        return span
+
+    # --- Export ---
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace-event format; open in Perfetto or chrome://tracing."""
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"task {self.task_id}"}}]
+        for s in self.spans:
+            end = s.end_ns if s.end_ns is not None else self.now()
+            events.append({
+                "name": s.name, "cat": s.category, "ph": "X", "pid": 1, "tid": s.tid,
+                "ts": s.start_ns / 1000, "dur": (end - s.start_ns) / 1000,
+                "args": dict(s.attrs, span_id=s.span_id, parent_id=s.parent_id)
+            })
+        for name, ts, tid, attrs in self.events:
+            events.append({"name": name, "cat": "event", "ph": "i", "s": "t", "pid": 1, "tid": tid,
+                           "ts": ts / 1000, "args": attrs})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"task_id": self.task_id, "dropped_spans": self.dropped}}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest body."""
+        def attributes(attrs):
+            out = []
+            for k, v in attrs.items():
+                if isinstance(v, bool):
+                    value = {"boolValue": v}
+                elif isinstance(v, int):
+                    value = {"intValue": str(v)}
+                elif isinstance(v, float):
+                    value = {"doubleValue": v}
+                else:
+                    value = {"stringValue": str(v)}
+                out.append({"key": k, "value": value})
+            return out
+
+        spans = []
+        for s in self.spans:
+            span = {
+                "traceId": self.trace_id,
+                "spanId": "%016x" % s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns if s.end_ns is not None else self.now()),
+                "attributes": attributes(dict(s.attrs, category=s.category)),
+                "events": [],
+            }
+            if s.parent_id:
+                span["parentSpanId"] = "%016x" % s.parent_id
+            spans.append(span)
+        if spans:
+            root = spans[0]
+            root["events"] = [{"name": name, "timeUnixNano": str(ts), "attributes": attributes(attrs)}
+                              for name, ts, tid, attrs in self.events]
+        return {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": "remotepilot", "task.id": self.task_id})},
+            "scopeSpans": [{"scope": {"name": "remotepilot.tracing"}, "spans": spans}]
+        }]}
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("remotepilot_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("remotepilot_span", default=None)
+
+class Tracer:
+    """
+    Keeps traces for the most recent `max_traces` tasks. Only a `sample_rate`
+    fraction of tasks is traced; for the rest every span() is a cheap no-op.
+    The active trace and parent span travel in contextvars, so agent and
+    Ollama calls made anywhere under process_task attach to the right task.
+    """
+    def __init__(self, sample_rate: float = 1.0, max_traces: int = 200, max_spans: int = 20000):
+        self.sample_rate = sample_rate
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self.traces: "OrderedDict[str, TaskTrace]" = OrderedDict()
+
+    def start_trace(self, task_id: str, force: bool = False) -> Optional[TaskTrace]:
+        """Binds a new trace for `task_id` to the current context, if sampled."""
+        if not force and random.random() >= self.sample_rate:
+            _current_trace.set(None)
+            return None
+        trace = TaskTrace(task_id, self.max_spans)
+        self.traces[task_id] = trace
+        while len(self.traces) > self.max_traces:
+            self.traces.popitem(last=False)
+        _current_trace.set(trace)
+        _current_span.set(None)
+        return trace
+
+    def get_trace(self, task_id: str) -> Optional[TaskTrace]:
+        return self.traces.get(task_id)
+
+    @contextmanager
+    def span(self, name: str, category: str = "task", **attrs):
+        trace = _current_trace.get()
+        if trace is None:
+            yield None
+            return
+        parent = _current_span.get()
+        span = trace.new_span(name, category, parent.span_id if parent else None, attrs)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = trace.now()
+            _current_span.reset(token)
+
+    def event(self, name: str, **attrs):
+        """Instant event on the active trace (e.g. a state transition)."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.events.append((name, trace.now(), trace.tid(), attrs))
+
+tracer = Tracer(sample_rate=float(os.environ.get("REMOTEPILOT_TRACE_SAMPLE_RATE", "1.0")))
@@ -0,0 +1,303 @@
+import os
+import json
+from array import array
+from typing import List, Tuple, Optional
+
+import numpy as np
+
+
+class ExactIndex:
+    """
+    Brute-force cosine index over L2-normalized float32 rows.
+    Row ids are dense and match insertion order, so callers can keep their
+    payloads in a plain list and use the id as the position.
+
+    Persistence (when `path` is given) is append-only and shared by all
+    backends, so switching backend keeps the stored vectors:
+      <path>.vectors.f32  raw float32 rows
+      <path>.index.json   {"backend": ..., "dim": ...}
+    """
+    backend = "exact"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.dim: Optional[int] = None
+        self._vecs = np.zeros((0, 0), dtype=np.float32)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vecs[:self._n]
+
+    @staticmethod
+    def _normalize(v) -> np.ndarray:
+        v = np.asarray(v, dtype=np.float32)
+        norm = np.linalg.norm(v, axis=-1, keepdims=True)
+        norm[norm == 0] = 1.0
+        return v / norm
+
+    def _reserve(self, extra: int):
+        need = self._n + extra
+        if need <= self._vecs.shape[0]:
+            return
+        cap = max(need, self._vecs.shape[0] * 2, 64)
+        grown = np.zeros((cap, self.dim), dtype=np.float32)
+        grown[:self._n] = self._vecs[:self._n]
+        self._vecs = grown
+
+    def add(self, vector) -> int:
+        return self.add_batch([vector])[0]
+
+    def add_batch(self, vectors) -> List[int]:
+        rows = self._normalize(np.atleast_2d(vectors))
+        if self.dim is None:
+            self.dim = rows.shape[1]
+            self._vecs = np.zeros((0, self.dim), dtype=np.float32)
+            self._write_meta()
+        elif rows.shape[1] != self.dim:
+            raise ValueError(f"Vector dim {rows.shape[1]} != index dim {self.dim}")
+
+        start = self._n
+        self._reserve(len(rows))
+        self._vecs[start:start + len(rows)] = rows
+        self._n += len(rows)
+        self._on_added(start, rows)
+        if self.path:
+            with open(f"{self.path}.vectors.f32", "ab") as f:
+                f.write(rows.tobytes())
+        return list(range(start, self._n))
+
+    def _on_added(self, start: int, rows: np.ndarray):
+        pass
+
+    def search(self, query, top_k: int = 2) -> List[Tuple[float, int]]:
+        if self._n == 0:
+            return []
+        q = self._normalize(query)
+        scores = self.vectors @ q
+        return self._top_k(scores, np.arange(self._n), top_k)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, ids: np.ndarray, top_k: int) -> List[Tuple[float, int]]:
+        if len(scores) > top_k:
+            part = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            part = np.arange(len(scores))
+        order = part[np.argsort(-scores[part])]
+        return [(float(scores[i]), int(ids[i])) for i in order]
+
+    # --- Persistence ---
+    def _write_meta(self, **extra):
+        if not self.path:
+            return
+        meta = {"backend": self.backend, "dim": self.dim}
+        meta.update(extra)
+        with open(f"{self.path}.index.json", "w") as f:
+            json.dump(meta, f)
+
+    def load(self) -> bool:
+        """Loads persisted rows. Returns False if nothing usable is on disk."""
+        if not self.path or not os.path.exists(f"{self.path}.index.json"):
+            return False
+        try:
+            with open(f"{self.path}.index.json", "r") as f:
+                meta = json.load(f)
+            if not meta.get("dim"):
+                return False
+            self.dim = int(meta["dim"])
+            raw = np.fromfile(f"{self.path}.vectors.f32", dtype=np.float32)
+        except (OSError, ValueError):
+            return False
+
+        # Drop a partially written trailing row left by a crash mid-append
+        rows = len(raw) // self.dim
+        self._vecs = raw[:rows * self.dim].reshape(rows, self.dim).copy()
+        self._n = rows
+        return self._load_extra(meta)
+
+    def _load_extra(self, meta) -> bool:
+        return True
+
+    def truncate(self, n: int):
+        """Drops every row from `n` on, in memory and on disk."""
+        if n >= self._n:
+            return
+        self._n = n
+        if self.path and os.path.exists(f"{self.path}.vectors.f32"):
+            os.truncate(f"{self.path}.vectors.f32", n * self.dim * 4)
+
+    def reset(self):
+        """Drops all rows in memory and on disk."""
+        self.dim = None
+        self._vecs = np.zeros((0, 0), dtype=np.float32)
+        self._n = 0
+        if self.path:
+            for suffix in self._files():
+                try:
+                    os.remove(f"{self.path}{suffix}")
+                except FileNotFoundError:
+                    pass
+
+    def _files(self):
+        # Every backend's files, so switching backends never leaves stale state
+        return [".index.json", ".vectors.f32", ".centroids.npy", ".assign.i32"]
+
+
+class IVFIndex(ExactIndex):
+    """
+    Inverted-file index: vectors are bucketed under k-means centroids and a
+    query only scans the `nprobe` closest buckets.
+
+    Until `train_threshold` rows exist the index answers with an exact scan.
+    It (re)trains once the row count grows `retrain_factor` times past the
+    last training size; in between, inserts are routed to the nearest
+    existing centroid.
+
+    Extra persisted files:
+      <path>.centroids.npy  trained centroids
+      <path>.assign.i32     bucket id per row (append-only between trainings)
+    """
+    backend = "ivf"
+
+    def __init__(self, path: Optional[str] = None, nlist: Optional[int] = None,
+                 nprobe: int = 8, train_threshold: int = 4096, retrain_factor: float = 4.0,
+                 kmeans_iters: int = 10, seed: int = 0):
+        super().__init__(path)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.retrain_factor = retrain_factor
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._trained_at = 0
+        self._lists: List[array] = []
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _on_added(self, start: int, rows: np.ndarray):
+        if not self.trained:
+            if self._n >= self.train_threshold:
+                self.train()
+            return
+        if self._n >= self._trained_at * self.retrain_factor:
+            self.train()
+            return
+
+        buckets = self._nearest_centroid(rows)
+        for offset, c in enumerate(buckets):
+            self._lists[c].append(start + offset)
+        if self.path:
+            with open(f"{self.path}.assign.i32", "ab") as f:
+                f.write(buckets.astype(np.int32).tobytes())
+
+    def _nearest_centroid(self, rows: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        out = np.empty(len(rows), dtype=np.int32)
+        for i in range(0, len(rows), chunk):
+            out[i:i + chunk] = np.argmax(rows[i:i + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def train(self):
+        """Runs spherical k-means over a sample and rebuilds every bucket."""
+        data = self.vectors
+        nlist = self.nlist or int(np.clip(4 * np.sqrt(self._n), 1, 65536))
+        nlist = min(nlist, self._n)
+        rng = np.random.default_rng(self.seed)
+
+        sample_size = min(self._n, nlist * 256)
+        sample = data[rng.choice(self._n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed dead centroids with random sample points
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = self._normalize(sums)
+
+        self.centroids = centroids.astype(np.float32)
+        self._trained_at = self._n
+        labels = self._nearest_centroid(data)
+        self._build_lists(labels)
+
+        if self.path:
+            np.save(f"{self.path}.centroids.npy", self.centroids)
+            labels.astype(np.int32).tofile(f"{self.path}.assign.i32")
+            self._write_meta(trained_at=self._trained_at)
+
+    def _build_lists(self, labels: np.ndarray):
+        order = np.argsort(labels, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(labels[order], np.arange(len(self.centroids) + 1))
+        self._lists = [array("i", order[bounds[c]:bounds[c + 1]].tobytes())
+                       for c in range(len(self.centroids))]
+
+    def search(self, query, top_k: int = 2) -> List[Tuple[float, int]]:
+        if not self.trained:
+            return super().search(query, top_k)
+        q = self._normalize(query)
+        nprobe = min(self.nprobe, len(self.centroids))
+        probe = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        ids = np.concatenate([np.frombuffer(self._lists[c], dtype=np.int32) for c in probe])
+        if len(ids) == 0:
+            return []
+        return self._top_k(self._vecs[ids] @ q, ids, top_k)
+
+    def _load_extra(self, meta) -> bool:
+        centroids_file = f"{self.path}.centroids.npy"
+        if not os.path.exists(centroids_file):
+            # Written by the exact backend or still in the warm-up phase
+            if self._n >= self.train_threshold:
+                self.train()
+            return True
+        try:
+            self.centroids = np.load(centroids_file)
+            labels = np.fromfile(f"{self.path}.assign.i32", dtype=np.int32)
+        except (OSError, ValueError):
+            self.centroids = None
+            return self._n == 0
+        self._trained_at = int(meta.get("trained_at", len(labels)))
+
+        # Rows appended after the last assignment write (crash) get routed now
+        labels = labels[:self._n]
+        if len(labels) < self._n:
+            missing = self._nearest_centroid(self.vectors[len(labels):])
+            labels = np.concatenate([labels, missing])
+            labels.astype(np.int32).tofile(f"{self.path}.assign.i32")
+        self._build_lists(labels)
+        return True
+
+    def truncate(self, n: int):
+        super().truncate(n)
+        if not self.trained:
+            return
+        self._lists = [array("i", (i for i in ids if i < n)) for ids in self._lists]
+        assign = f"{self.path}.assign.i32" if self.path else None
+        if assign and os.path.exists(assign) and os.path.getsize(assign) > n * 4:
+            os.truncate(assign, n * 4)
+
+    def reset(self):
+        super().reset()
+        self.centroids = None
+        self._trained_at = 0
+        self._lists = []
+
+
+INDEX_BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+}
+
+
+def create_index(backend: str = "exact", path: Optional[str] = None, **kwargs) -> ExactIndex:
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown vector index backend: {backend}")
+    return INDEX_BACKENDS[backend](path=path, **kwargs)
@@ -0,0 +1,113 @@
+import time
+import asyncio
+import contextvars
+from typing import Dict, Any, Optional
+
+# Task id of the process_task coroutine we are running under; lets agents and
+# the Ollama client report progress without being handed the task id.
+current_task_id: contextvars.ContextVar = contextvars.ContextVar("remotepilot_task_id", default=None)
+
+# Seconds a task may stay in one phase before it is cancelled
+DEFAULT_PHASE_BUDGETS = {
+    "PLANNING": 300.0,
+    "MODEL_CHECK": 60.0,
+    "SANDBOX_SETUP": 60.0,
+    "ACT": 300.0,
+    "VERIFY": 300.0,
+    "RESEARCH": 900.0,
+}
+
+class TaskWatch:
+    __slots__ = ("task_id", "aio_task", "last_progress", "phase", "phase_started", "abort_reason")
+
+    def __init__(self, task_id: str, aio_task: asyncio.Task):
+        now = time.monotonic()
+        self.task_id = task_id
+        self.aio_task = aio_task
+        self.last_progress = now
+        self.phase = None
+        self.phase_started = now
+        self.abort_reason: Optional[str] = None
+
+class Watchdog:
+    """
+    Tracks progress of every running task and cancels its asyncio task when
+    it makes no progress for `hang_threshold` seconds, overruns its current
+    phase budget, or is aborted explicitly.
+    """
+    def __init__(self, hang_threshold: float = 180.0, phase_budgets: Optional[Dict[str, float]] = None,
+                 check_interval: float = 1.0):
+        self.hang_threshold = hang_threshold
+        self.phase_budgets = dict(DEFAULT_PHASE_BUDGETS if phase_budgets is None else phase_budgets)
+        self.check_interval = check_interval
+        self.watches: Dict[str, TaskWatch] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def watch(self, task_id: str, aio_task: Optional[asyncio.Task] = None) -> TaskWatch:
+        watch = TaskWatch(task_id, aio_task or asyncio.current_task())
+        self.watches[task_id] = watch
+        current_task_id.set(task_id)
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run())
+        return watch
+
+    def unwatch(self, task_id: str):
+        self.watches.pop(task_id, None)
+
+    def touch(self, task_id: Optional[str] = None):
+        watch = self.watches.get(task_id or current_task_id.get())
+        if watch:
+            watch.last_progress = time.monotonic()
+
+    def enter_phase(self, task_id: str, phase: str):
+        watch = self.watches.get(task_id)
+        if watch:
+            watch.phase = phase
+            watch.phase_started = watch.last_progress = time.monotonic()
+
+    def cancel(self, task_id: str, reason: str) -> bool:
+        watch = self.watches.get(task_id)
+        if not watch or watch.aio_task.done():
+            return False
+        if watch.abort_reason is None:
+            watch.abort_reason = reason
+            print(f"[Watchdog] Cancelling {task_id}: {reason}")
+            watch.aio_task.cancel()
+        return True
+
+    def abort_reason(self, task_id: str) -> Optional[str]:
+        watch = self.watches.get(task_id)
+        return watch.abort_reason if watch else None
+
+    def check(self):
+        now = time.monotonic()
+        for watch in list(self.watches.values()):
+            if watch.abort_reason is not None:
+                continue
+            idle = now - watch.last_progress
+            if idle > self.hang_threshold:
+                self.cancel(watch.task_id, f"hung: no progress for {idle:.0f}s in {watch.phase}")
+                continue
+            budget = self.phase_budgets.get(watch.phase)
+            if budget is not None and now - watch.phase_started > budget:
+                self.cancel(watch.task_id, f"phase {watch.phase} exceeded its {budget:.0f}s budget")
+
+    async def _run(self):
+        while self.watches:
+            self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {tid: {
+            "phase": w.phase,
+            "idle_s": round(now - w.last_progress, 1),
+            "in_phase_s": round(now - w.phase_started, 1),
+            "abort_reason": w.abort_reason,
+        } for tid, w in self.watches.items()}
+
+def report_progress():
+    """Marks the task running in the current context as alive."""
+    watchdog.touch()
+
+watchdog = Watchdog()
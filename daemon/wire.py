@@ -0,0 +1,29 @@
+import json
+from typing import Any, Dict, Optional, Union
+
+from fastapi.responses import Response
+
+try:
+    import msgpack
+except ImportError: # Optional: clients fall back to JSON
+    msgpack = None
+
+# Response encodings for the mobile UI. JSON stays the default; clients that
+# send `Accept: application/msgpack` (HTTP) or connect with
+# `?encoding=msgpack` (WebSocket) get msgpack when it is installed.
+
+MSGPACK = "application/msgpack"
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    return msgpack is not None and bool(accept) and MSGPACK in accept
+
+def encode(payload: Any, binary: bool = False) -> Union[bytes, str]:
+    if binary:
+        return msgpack.packb(payload, use_bin_type=True)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+def response(payload: Any, accept: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    headers = dict(headers or {}, Vary="Accept")
+    if wants_msgpack(accept):
+        return Response(encode(payload, True), media_type=MSGPACK, headers=headers)
+    return Response(encode(payload), media_type="application/json", headers=headers)
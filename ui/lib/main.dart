@@ -11,7 +11,7 @@ void main() {
 }
 
 // --- Models ---
-enum TaskStatus { IDLE, PLANNING, MODEL_CHECK, SANDBOX_SETUP, OBSERVE, ACT, VERIFY, DONE, FAILED }
+enum TaskStatus { IDLE, PLANNING, MODEL_CHECK, SANDBOX_SETUP, OBSERVE, ACT, VERIFY, DONE, FAILED, CANCELLED }
 
 class LogEntry {
   final String timestamp;